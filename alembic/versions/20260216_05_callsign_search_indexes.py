@@ -0,0 +1,63 @@
+"""add callsign search indexes
+
+Revision ID: 20260216_05
+Revises: 20260215_04
+Create Date: 2026-02-16 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260216_05"
+down_revision: Union[str, None] = "20260215_04"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _index_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {index["name"] for index in inspector.get_indexes(table_name)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "qso_reports" not in inspector.get_table_names():
+        return
+
+    is_postgresql = bind.dialect.name == "postgresql"
+    qso_indexes = _index_names(inspector, "qso_reports")
+
+    if "ix_qso_reports_user_call_upper" not in qso_indexes:
+        if is_postgresql:
+            op.execute(
+                "CREATE INDEX ix_qso_reports_user_call_upper "
+                "ON qso_reports (user_id, upper(call) text_pattern_ops)"
+            )
+        else:
+            # SQLite does not reflect expression indexes, so guard in SQL.
+            op.execute(
+                "CREATE INDEX IF NOT EXISTS ix_qso_reports_user_call_upper "
+                "ON qso_reports (user_id, upper(call))"
+            )
+
+    if is_postgresql and "ix_qso_reports_call_trgm" not in qso_indexes:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX ix_qso_reports_call_trgm "
+            "ON qso_reports USING gin (call gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "qso_reports" not in inspector.get_table_names():
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_qso_reports_call_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_qso_reports_user_call_upper")
@@ -0,0 +1,69 @@
+"""add qso search composite indexes
+
+Revision ID: 20260217_06
+Revises: 20260216_05
+Create Date: 2026-02-17 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260217_06"
+down_revision: Union[str, None] = "20260216_05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _index_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {index["name"] for index in inspector.get_indexes(table_name)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "qso_reports" not in inspector.get_table_names():
+        return
+
+    qso_indexes = _index_names(inspector, "qso_reports")
+    if "ix_qso_reports_user_dxcc_band" not in qso_indexes:
+        op.create_index(
+            "ix_qso_reports_user_dxcc_band",
+            "qso_reports",
+            ["user_id", "dxcc", "band"],
+            unique=False,
+        )
+    if "ix_qso_reports_user_band_mode" not in qso_indexes:
+        op.create_index(
+            "ix_qso_reports_user_band_mode",
+            "qso_reports",
+            ["user_id", "band", "mode"],
+            unique=False,
+        )
+    if (
+        bind.dialect.name == "postgresql"
+        and "ix_qso_reports_user_rxqsl_id" not in qso_indexes
+    ):
+        op.execute(
+            "CREATE INDEX ix_qso_reports_user_rxqsl_id ON qso_reports "
+            "(user_id, app_lotw_rxqsl DESC NULLS LAST, id DESC)"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "qso_reports" not in inspector.get_table_names():
+        return
+
+    qso_indexes = _index_names(inspector, "qso_reports")
+    if "ix_qso_reports_user_rxqsl_id" in qso_indexes:
+        op.drop_index("ix_qso_reports_user_rxqsl_id", table_name="qso_reports")
+    if "ix_qso_reports_user_band_mode" in qso_indexes:
+        op.drop_index("ix_qso_reports_user_band_mode", table_name="qso_reports")
+    if "ix_qso_reports_user_dxcc_band" in qso_indexes:
+        op.drop_index("ix_qso_reports_user_dxcc_band", table_name="qso_reports")
@@ -0,0 +1,73 @@
+"""add next digest due time to notification preferences
+
+Revision ID: 20260218_07
+Revises: 20260217_06
+Create Date: 2026-02-18 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260218_07"
+down_revision: Union[str, None] = "20260217_06"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _index_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {index["name"] for index in inspector.get_indexes(table_name)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "notification_preferences" not in inspector.get_table_names():
+        return
+
+    existing_columns = {
+        column["name"] for column in inspector.get_columns("notification_preferences")
+    }
+    if "next_digest_due_at" not in existing_columns:
+        # Existing rows stay NULL and are scheduled on the next digest run.
+        with op.batch_alter_table("notification_preferences", schema=None) as batch_op:
+            batch_op.add_column(
+                sa.Column("next_digest_due_at", sa.DateTime(timezone=True), nullable=True)
+            )
+
+    inspector = sa.inspect(bind)
+    if "ix_notification_preferences_enabled_next_due" not in _index_names(
+        inspector, "notification_preferences"
+    ):
+        op.create_index(
+            "ix_notification_preferences_enabled_next_due",
+            "notification_preferences",
+            ["qsl_digest_enabled", "next_digest_due_at"],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "notification_preferences" not in inspector.get_table_names():
+        return
+
+    if "ix_notification_preferences_enabled_next_due" in _index_names(
+        inspector, "notification_preferences"
+    ):
+        op.drop_index(
+            "ix_notification_preferences_enabled_next_due",
+            table_name="notification_preferences",
+        )
+
+    existing_columns = {
+        column["name"] for column in inspector.get_columns("notification_preferences")
+    }
+    if "next_digest_due_at" in existing_columns:
+        with op.batch_alter_table("notification_preferences", schema=None) as batch_op:
+            batch_op.drop_column("next_digest_due_at")
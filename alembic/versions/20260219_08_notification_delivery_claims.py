@@ -0,0 +1,49 @@
+"""add dispatch claim timestamp to notification deliveries
+
+Revision ID: 20260219_08
+Revises: 20260218_07
+Create Date: 2026-02-19 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260219_08"
+down_revision: Union[str, None] = "20260218_07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "notification_deliveries" not in inspector.get_table_names():
+        return
+
+    existing_columns = {
+        column["name"] for column in inspector.get_columns("notification_deliveries")
+    }
+    if "claimed_at" not in existing_columns:
+        with op.batch_alter_table("notification_deliveries", schema=None) as batch_op:
+            batch_op.add_column(
+                sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=True)
+            )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "notification_deliveries" not in inspector.get_table_names():
+        return
+
+    existing_columns = {
+        column["name"] for column in inspector.get_columns("notification_deliveries")
+    }
+    if "claimed_at" in existing_columns:
+        with op.batch_alter_table("notification_deliveries", schema=None) as batch_op:
+            batch_op.drop_column("claimed_at")
@@ -0,0 +1,53 @@
+"""index digest rows by age for the retention purge
+
+Revision ID: 20260220_09
+Revises: 20260219_08
+Create Date: 2026-02-20 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260220_09"
+down_revision: Union[str, None] = "20260219_08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+_INDEXES = (
+    ("qsl_digest_batches", "ix_qsl_digest_batches_digest_date", ["digest_date"]),
+    ("notification_deliveries", "ix_notification_deliveries_created_at", ["created_at"]),
+)
+
+
+def _index_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {index["name"] for index in inspector.get_indexes(table_name)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    table_names = set(inspector.get_table_names())
+
+    for table_name, index_name, columns in _INDEXES:
+        if table_name not in table_names:
+            continue
+        if index_name not in _index_names(inspector, table_name):
+            op.create_index(index_name, table_name, columns, unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    table_names = set(inspector.get_table_names())
+
+    for table_name, index_name, _columns in _INDEXES:
+        if table_name not in table_names:
+            continue
+        if index_name in _index_names(inspector, table_name):
+            op.drop_index(index_name, table_name=table_name)
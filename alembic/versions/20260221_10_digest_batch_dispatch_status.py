@@ -0,0 +1,111 @@
+"""track dispatch status on digest batches
+
+Revision ID: 20260221_10
+Revises: 20260220_09
+Create Date: 2026-02-21 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260221_10"
+down_revision: Union[str, None] = "20260220_09"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+_PENDING_INDEX = "ix_qsl_digest_batches_pending"
+_PENDING_WHERE = sa.text("dispatch_status = 'pending'")
+
+
+def _index_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {index["name"] for index in inspector.get_indexes(table_name)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "qsl_digest_batches" not in inspector.get_table_names():
+        return
+
+    existing_columns = {
+        column["name"] for column in inspector.get_columns("qsl_digest_batches")
+    }
+    added_status = "dispatch_status" not in existing_columns
+    with op.batch_alter_table("qsl_digest_batches", schema=None) as batch_op:
+        if added_status:
+            batch_op.add_column(
+                sa.Column(
+                    "dispatch_status",
+                    sa.String(length=16),
+                    nullable=False,
+                    server_default="pending",
+                )
+            )
+        if "dispatched_at" not in existing_columns:
+            batch_op.add_column(
+                sa.Column("dispatched_at", sa.DateTime(timezone=True), nullable=True)
+            )
+
+    if added_status:
+        # Backfill from delivery history: what the old NOT EXISTS query derived.
+        op.execute(
+            """
+            UPDATE qsl_digest_batches
+            SET dispatch_status = 'sent',
+                dispatched_at = (
+                    SELECT MAX(notification_deliveries.sent_at)
+                    FROM notification_deliveries
+                    WHERE notification_deliveries.digest_batch_id = qsl_digest_batches.id
+                      AND notification_deliveries.status = 'sent'
+                )
+            WHERE EXISTS (
+                SELECT 1
+                FROM notification_deliveries
+                WHERE notification_deliveries.digest_batch_id = qsl_digest_batches.id
+                  AND notification_deliveries.status = 'sent'
+            )
+            """
+        )
+        op.execute(
+            """
+            UPDATE qsl_digest_batches
+            SET dispatch_status = 'empty'
+            WHERE dispatch_status = 'pending' AND qsl_count <= 0
+            """
+        )
+
+    inspector = sa.inspect(bind)
+    if _PENDING_INDEX not in _index_names(inspector, "qsl_digest_batches"):
+        op.create_index(
+            _PENDING_INDEX,
+            "qsl_digest_batches",
+            ["generated_at", "id", "user_id"],
+            unique=False,
+            postgresql_where=_PENDING_WHERE,
+            sqlite_where=_PENDING_WHERE,
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "qsl_digest_batches" not in inspector.get_table_names():
+        return
+
+    if _PENDING_INDEX in _index_names(inspector, "qsl_digest_batches"):
+        op.drop_index(_PENDING_INDEX, table_name="qsl_digest_batches")
+
+    existing_columns = {
+        column["name"] for column in inspector.get_columns("qsl_digest_batches")
+    }
+    with op.batch_alter_table("qsl_digest_batches", schema=None) as batch_op:
+        if "dispatched_at" in existing_columns:
+            batch_op.drop_column("dispatched_at")
+        if "dispatch_status" in existing_columns:
+            batch_op.drop_column("dispatch_status")
@@ -0,0 +1,50 @@
+"""add a precise qso sync cursor to users
+
+Revision ID: 20260222_11
+Revises: 20260221_10
+Create Date: 2026-02-22 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260222_11"
+down_revision: Union[str, None] = "20260221_10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "users" not in inspector.get_table_names():
+        return
+
+    existing_columns = {column["name"] for column in inspector.get_columns("users")}
+
+    # Left NULL: the next import falls back to qso_reports_last_update once.
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        if "qso_qsl_cursor" not in existing_columns:
+            batch_op.add_column(
+                sa.Column("qso_qsl_cursor", sa.DateTime(timezone=True), nullable=True)
+            )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "users" not in inspector.get_table_names():
+        return
+
+    existing_columns = {column["name"] for column in inspector.get_columns("users")}
+
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        if "qso_qsl_cursor" in existing_columns:
+            batch_op.drop_column("qso_qsl_cursor")
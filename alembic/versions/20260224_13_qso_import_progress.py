@@ -0,0 +1,64 @@
+"""track resumable qso import progress on users
+
+Revision ID: 20260224_13
+Revises: 20260223_12
+Create Date: 2026-02-24 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260224_13"
+down_revision: Union[str, None] = "20260223_12"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "users" not in inspector.get_table_names():
+        return
+
+    existing_columns = {column["name"] for column in inspector.get_columns("users")}
+
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        if "qso_sync_progress" not in existing_columns:
+            batch_op.add_column(
+                sa.Column(
+                    "qso_sync_progress",
+                    sa.Integer(),
+                    nullable=False,
+                    server_default="0",
+                )
+            )
+        if "qso_sync_total" not in existing_columns:
+            batch_op.add_column(sa.Column("qso_sync_total", sa.Integer(), nullable=True))
+        if "qso_import_spool" not in existing_columns:
+            batch_op.add_column(
+                sa.Column("qso_import_spool", sa.String(length=512), nullable=True)
+            )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "users" not in inspector.get_table_names():
+        return
+
+    existing_columns = {column["name"] for column in inspector.get_columns("users")}
+
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        if "qso_import_spool" in existing_columns:
+            batch_op.drop_column("qso_import_spool")
+        if "qso_sync_total" in existing_columns:
+            batch_op.drop_column("qso_sync_total")
+        if "qso_sync_progress" in existing_columns:
+            batch_op.drop_column("qso_sync_progress")
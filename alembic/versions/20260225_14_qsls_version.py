@@ -0,0 +1,54 @@
+"""version users' qsl lists for cheap revalidation
+
+Revision ID: 20260225_14
+Revises: 20260224_13
+Create Date: 2026-02-25 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260225_14"
+down_revision: Union[str, None] = "20260224_13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "users" not in inspector.get_table_names():
+        return
+
+    existing_columns = {column["name"] for column in inspector.get_columns("users")}
+
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        if "qsls_version" not in existing_columns:
+            batch_op.add_column(
+                sa.Column(
+                    "qsls_version",
+                    sa.Integer(),
+                    nullable=False,
+                    server_default="0",
+                )
+            )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "users" not in inspector.get_table_names():
+        return
+
+    existing_columns = {column["name"] for column in inspector.get_columns("users")}
+
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        if "qsls_version" in existing_columns:
+            batch_op.drop_column("qsls_version")
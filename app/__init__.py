@@ -16,6 +16,7 @@ from flask import (
     url_for,
 )
 
+from . import instrumentation
 from .blueprints import api, auth, awards, billing, map, search
 from .database import get_sessionmaker
 from .lotw import LotwAuthExpiredError, LotwTransientError
@@ -69,11 +70,43 @@ def create_app() -> Flask:
             if getenv("LOTW_REQUEST_TIMEOUT_SECONDS")
             else 20
         ),
+        LOTW_CONNECT_TIMEOUT_SECONDS=float(getenv("LOTW_CONNECT_TIMEOUT_SECONDS", "5")),
+        LOTW_ADIF_READ_TIMEOUT_SECONDS=float(
+            getenv("LOTW_ADIF_READ_TIMEOUT_SECONDS", "120")
+        ),
+        LOTW_ADIF_DEADLINE_SECONDS=float(getenv("LOTW_ADIF_DEADLINE_SECONDS", "900")),
+        LOTW_HEDGED_READS_ENABLED=_env_flag("LOTW_HEDGED_READS_ENABLED", True),
+        LOTW_HEDGE_MIN_SAMPLES=int(getenv("LOTW_HEDGE_MIN_SAMPLES", "20")),
+        LOTW_RATE_PER_SECOND=float(getenv("LOTW_RATE_PER_SECOND", "5")),
+        LOTW_RATE_BURST=float(getenv("LOTW_RATE_BURST", "10")),
+        LOTW_USER_RATE_PER_SECOND=float(getenv("LOTW_USER_RATE_PER_SECOND", "1")),
+        LOTW_USER_RATE_BURST=float(getenv("LOTW_USER_RATE_BURST", "6")),
+        LOTW_RATE_LIMIT_MAX_WAIT_SECONDS=float(
+            getenv("LOTW_RATE_LIMIT_MAX_WAIT_SECONDS", "10")
+        ),
+        LOTW_CIRCUIT_FAILURE_THRESHOLD=int(getenv("LOTW_CIRCUIT_FAILURE_THRESHOLD", "5")),
+        LOTW_CIRCUIT_RESET_SECONDS=float(getenv("LOTW_CIRCUIT_RESET_SECONDS", "30")),
         QSO_IMPORT_MAX_WORKERS=int(
             getenv("QSO_IMPORT_MAX_WORKERS")
             if getenv("QSO_IMPORT_MAX_WORKERS")
             else 2
         ),
+        QSO_IMPORT_SPOOL_DIR=getenv("QSO_IMPORT_SPOOL_DIR", ""),
+        QSO_IMPORT_CHECKPOINT_ROWS=int(getenv("QSO_IMPORT_CHECKPOINT_ROWS", "5000")),
+        QSO_IMPORT_SPOOL_REUSE_SECONDS=int(getenv("QSO_IMPORT_SPOOL_REUSE_SECONDS", "3600")),
+        QSO_IMPORT_SPOOL_RETENTION_HOURS=float(
+            getenv("QSO_IMPORT_SPOOL_RETENTION_HOURS", "24")
+        ),
+        QSO_SYNC_CURSOR_OVERLAP_SECONDS=int(
+            getenv("QSO_SYNC_CURSOR_OVERLAP_SECONDS", "300")
+        ),
+        QSO_SYNC_PROGRESS_INTERVAL_SECONDS=float(
+            getenv("QSO_SYNC_PROGRESS_INTERVAL_SECONDS", "1")
+        ),
+        QSO_SYNC_PROGRESS_STREAM_SECONDS=float(
+            getenv("QSO_SYNC_PROGRESS_STREAM_SECONDS", "30")
+        ),
+        QSLS_PAGE_SIZE=int(getenv("QSLS_PAGE_SIZE", "25")),
         SESSION_CACHE_EXPIRATION=int(getenv("SESSION_CACHE_EXPIRATION"))
         if getenv("SESSION_CACHE_EXPIRATION")
         else 30,
@@ -95,16 +128,44 @@ def create_app() -> Flask:
         DIGEST_SMTP_PASSWORD=getenv("DIGEST_SMTP_PASSWORD"),
         DIGEST_SMTP_FROM_EMAIL=getenv("DIGEST_SMTP_FROM_EMAIL", "info@mobilelotw.org"),
         DIGEST_SMTP_STARTTLS=_env_flag("DIGEST_SMTP_STARTTLS", True),
+        DIGEST_SMTP_MAX_MESSAGES_PER_CONNECTION=int(
+            getenv("DIGEST_SMTP_MAX_MESSAGES_PER_CONNECTION", "100")
+        ),
         DIGEST_NOTIFICATIONS_ENABLED=_env_flag("DIGEST_NOTIFICATIONS_ENABLED", True),
         WEB_PUSH_ENABLED=_env_flag("WEB_PUSH_ENABLED", True),
         DIGEST_EMAIL_ENABLED=_env_flag("DIGEST_EMAIL_ENABLED", True),
         DIGEST_DRY_RUN=_env_flag("DIGEST_DRY_RUN", False),
         DIGEST_RETENTION_DAYS=int(getenv("DIGEST_RETENTION_DAYS", "90")),
+        DIGEST_RETENTION_CHUNK_SIZE=int(getenv("DIGEST_RETENTION_CHUNK_SIZE", "1000")),
+        DIGEST_GENERATION_SHARDS=int(getenv("DIGEST_GENERATION_SHARDS", "1")),
+        DIGEST_GENERATION_MAX_WORKERS=int(
+            getenv("DIGEST_GENERATION_MAX_WORKERS", "4")
+        ),
+        DIGEST_GENERATION_CHUNK_SIZE=int(
+            getenv("DIGEST_GENERATION_CHUNK_SIZE", "500")
+        ),
+        DIGEST_PUSH_WORKERS=int(getenv("DIGEST_PUSH_WORKERS", "8")),
+        DIGEST_EMAIL_WORKERS=int(getenv("DIGEST_EMAIL_WORKERS", "4")),
+        WEB_PUSH_DEVICE_WORKERS=int(getenv("WEB_PUSH_DEVICE_WORKERS", "4")),
+        DIGEST_PUSH_HOST_RATE_PER_SECOND=float(
+            getenv("DIGEST_PUSH_HOST_RATE_PER_SECOND", "50")
+        ),
+        DIGEST_EMAIL_RATE_PER_SECOND=float(
+            getenv("DIGEST_EMAIL_RATE_PER_SECOND", "10")
+        ),
+        DIGEST_DISPATCH_CLAIM_TTL_SECONDS=int(
+            getenv("DIGEST_DISPATCH_CLAIM_TTL_SECONDS", "900")
+        ),
+        SQL_SLOW_QUERY_MS=float(getenv("SQL_SLOW_QUERY_MS", "200")),
+        SQL_STATEMENT_BUDGET=int(getenv("SQL_STATEMENT_BUDGET", "50")),
+        SERVER_TIMING_ENABLED=_env_flag("SERVER_TIMING_ENABLED", False),
     )
 
     # Logging level
     app.logger.level = INFO
 
+    instrumentation.init_app(app)
+
     # Primary routes
     @app.get("/")
     def home():
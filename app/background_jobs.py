@@ -1,12 +1,17 @@
 from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
+from time import time
 
 from flask import current_app
 
+from .instrumentation import track_queries
+from .metrics import REGISTRY, Gauge
 from .services.qso_import import import_qsos_for_user
 
 _lock = Lock()
 _running_ops: set[str] = set()
+# op -> the last progress reported by the import this process is running
+_import_progress: dict[str, dict] = {}
 _executor: ThreadPoolExecutor | None = None
 _digest_lock = Lock()
 _digest_running = False
@@ -26,12 +31,22 @@ def _get_executor() -> ThreadPoolExecutor:
 def _clear_running(op: str) -> None:
     with _lock:
         _running_ops.discard(op)
+        _import_progress.pop(op, None)
+
+
+def _record_import_progress(op: str, **fields) -> None:
+    with _lock:
+        # Each report describes its phase completely; nothing carries over.
+        _import_progress[op] = {**fields, "at": time()}
 
 
 def _run_import_job(app, op: str) -> None:
-    with app.app_context():
+    with app.app_context(), track_queries(label=f"job qso_import op={op}"):
         try:
-            import_qsos_for_user(op=op)
+            import_qsos_for_user(
+                op=op,
+                on_progress=lambda **fields: _record_import_progress(op, **fields),
+            )
         except Exception:
             current_app.logger.exception("Background QSO sync failed for %s", op)
 
@@ -42,6 +57,7 @@ def enqueue_qso_import(op: str) -> bool:
         if op in _running_ops:
             return False
         _running_ops.add(op)
+        _import_progress[op] = {"phase": "queued", "at": time()}
 
     future = _get_executor().submit(_run_import_job, app, op)
     future.add_done_callback(lambda _: _clear_running(op))
@@ -53,6 +69,17 @@ def is_qso_import_running(op: str) -> bool:
         return op in _running_ops
 
 
+def qso_import_progress(op: str) -> dict | None:
+    """The latest progress of ``op``'s import while this process runs it:
+    ``phase`` plus that phase's fields (see ``import_qsos_for_user``) and
+    ``at``, when it was reported. ``None`` once the job has finished."""
+    with _lock:
+        if op not in _running_ops:
+            return None
+        progress = _import_progress.get(op)
+        return dict(progress) if progress is not None else None
+
+
 def _set_digest_running(value: bool) -> None:
     global _digest_running
     with _digest_lock:
@@ -60,7 +87,7 @@ def _set_digest_running(value: bool) -> None:
 
 
 def _run_qsl_digest_job(app) -> None:
-    with app.app_context():
+    with app.app_context(), track_queries(label="job qsl_digest_generation"):
         from .services.qsl_digest import run_due_qsl_digest_generation
 
         try:
@@ -96,7 +123,7 @@ def _set_digest_delivery_running(value: bool) -> None:
 
 
 def _run_qsl_digest_delivery_job(app) -> None:
-    with app.app_context():
+    with app.app_context(), track_queries(label="job qsl_digest_delivery"):
         from .services.digest_notifications import dispatch_pending_digest_notifications
 
         try:
@@ -123,3 +150,36 @@ def enqueue_qsl_digest_delivery() -> bool:
 def is_qsl_digest_delivery_running() -> bool:
     with _digest_delivery_lock:
         return _digest_delivery_running
+
+
+def _queue_depth() -> dict[tuple[str, ...], float]:
+    executor = _executor
+    # ThreadPoolExecutor keeps submitted-but-unstarted work in _work_queue.
+    return {(): executor._work_queue.qsize() if executor is not None else 0}
+
+
+def _running_jobs() -> dict[tuple[str, ...], float]:
+    with _lock:
+        imports = len(_running_ops)
+    return {
+        ("qso_import",): imports,
+        ("qsl_digest_generation",): int(is_qsl_digest_generation_running()),
+        ("qsl_digest_delivery",): int(is_qsl_digest_delivery_running()),
+    }
+
+
+REGISTRY.register(
+    Gauge(
+        "mobile_lotw_background_queue_depth",
+        "Background jobs submitted but not yet started.",
+        collect=_queue_depth,
+    )
+)
+REGISTRY.register(
+    Gauge(
+        "mobile_lotw_background_jobs_running",
+        "Background jobs queued or running, by job.",
+        collect=_running_jobs,
+        labelnames=("job",),
+    )
+)
@@ -7,4 +7,7 @@ from .notifications import (
 )
 from .get_map_data import get_map_data
 from .import_qsos_data import import_qsos_data
+from .qso_sync import qso_sync_progress
 from .deploy import deploy
+from .metrics import metrics
+from .search import callsign_suggest, search_qsos_api
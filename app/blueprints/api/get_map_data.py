@@ -1,7 +1,7 @@
 import json
 from html import escape
 
-from flask import current_app, jsonify, request, session, url_for
+from flask import current_app, jsonify, make_response, request, session, url_for
 from sqlalchemy.orm import Session
 
 from ...database.queries import (
@@ -9,6 +9,7 @@ from ...database.queries import (
     get_user_qsos_for_map_by_rxqso,
     get_user_qsos_for_map_by_rxqso_count,
 )
+from ...http_cache import apply_validators, compute_etag, not_modified_response
 from ..auth.wrappers import login_required, paid_required
 from .base import bp
 
@@ -19,6 +20,9 @@ from .base import bp
 def get_map_data(as_json: bool = False):
     as_json = request.args.get("json", type=bool, default=False) or as_json
     force_reload = request.args.get("force_reload", type=bool, default=False)
+    # The map page embeds this data directly; only the API route itself
+    # answers with validators and 304s.
+    conditional = request.endpoint == "api.get_map_data"
 
     with current_app.config.get("SESSION_MAKER").begin() as session_:
         session_: Session
@@ -31,6 +35,20 @@ def get_map_data(as_json: bool = False):
             user=user, session=session_
         )
 
+        etag = compute_etag(
+            "map_data",
+            user.op,
+            count,
+            user.qso_reports_last_update_time,
+            as_json,
+        )
+        if conditional and not force_reload:
+            not_modified = not_modified_response(
+                etag, user.qso_reports_last_update_time
+            )
+            if not_modified is not None:
+                return not_modified
+
         marker_locations: dict[str, dict[str, str | float]] = {}
 
         if (
@@ -109,5 +127,14 @@ def get_map_data(as_json: bool = False):
         current_app.logger.info(f"Done getting marker locations for {user.op}")
 
         if as_json:
-            return jsonify(marker_locations)
-        return json.dumps(marker_locations)
+            response = jsonify(marker_locations)
+        elif conditional:
+            response = make_response(json.dumps(marker_locations))
+        else:
+            return json.dumps(marker_locations)
+
+        if not conditional:
+            return response
+        return apply_validators(
+            response, etag, user.qso_reports_last_update_time
+        )
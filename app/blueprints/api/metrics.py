@@ -0,0 +1,22 @@
+import hmac
+from os import getenv
+
+from flask import Response, jsonify, request
+
+from ...metrics import REGISTRY
+from .base import bp
+
+
+@bp.get("/api/v1/metrics")
+def metrics():
+    # A dedicated scrape key keeps the deploy API key off the monitoring host.
+    api_key = getenv("METRICS_API_KEY") or getenv("API_KEY")
+    api_key_header = request.headers.get("X-API-KEY", "")
+    if not api_key or not hmac.compare_digest(api_key_header, api_key):
+        return jsonify({"error": "unauthorized"}), 401
+
+    return Response(
+        REGISTRY.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+        headers={"Cache-Control": "no-store"},
+    )
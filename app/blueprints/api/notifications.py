@@ -64,6 +64,10 @@ def web_push_subscribe():
         )
         subscription.platform = payload.get("platform") or subscription.platform
         subscription.last_seen_at = now
+        # A new delivery channel; let the next digest run recompute when
+        # this user is due.
+        if user.notification_preference is not None:
+            user.notification_preference.next_digest_due_at = None
 
         session_.flush()
         return jsonify(
@@ -0,0 +1,70 @@
+import json
+from time import monotonic, sleep
+from typing import Iterator
+
+from flask import Response, current_app, jsonify, request, session, stream_with_context
+
+from ...background_jobs import qso_import_progress
+from ...database.queries import get_user
+from ..auth.wrappers import login_required
+from .base import bp
+
+
+def _progress_snapshot(op: str) -> dict:
+    """The persisted sync state, overlaid with the live progress of an import
+    run by this process (imports run by another worker only checkpoint
+    ``rows`` to the database)."""
+    with current_app.config.get("SESSION_MAKER").begin() as session_:
+        user = get_user(op=op, session=session_)
+        snapshot = {
+            "status": user.qso_sync_status or "idle",
+            "phase": None,
+            "rows": user.qso_sync_progress or 0,
+            "rows_total": user.qso_sync_total,
+            "error": user.qso_sync_last_error,
+        }
+    # Only while this process runs the job, so a finished run never masks
+    # newer state written by another worker.
+    live = qso_import_progress(op)
+    if live is not None:
+        live.pop("at", None)
+        snapshot.update(live, status="syncing")
+    return snapshot
+
+
+def _event_stream(op: str) -> Iterator[str]:
+    interval = current_app.config.get("QSO_SYNC_PROGRESS_INTERVAL_SECONDS", 1.0)
+    # Bounded so a stream never pins a worker; EventSource reconnects.
+    ends_at = monotonic() + current_app.config.get("QSO_SYNC_PROGRESS_STREAM_SECONDS", 30)
+    yield f"retry: {int(interval * 1000)}\n\n"
+    last = None
+    while True:
+        snapshot = _progress_snapshot(op)
+        if snapshot != last:
+            yield f"data: {json.dumps(snapshot)}\n\n"
+            last = snapshot
+        if snapshot["status"] != "syncing":
+            yield "event: end\ndata: {}\n\n"
+            return
+        if monotonic() >= ends_at:
+            return
+        sleep(interval)
+
+
+@bp.get("/api/v1/qso_sync/progress")
+@login_required()
+def qso_sync_progress():
+    op = session.get("op")
+    if (
+        request.args.get("stream", type=bool, default=False)
+        or request.accept_mimetypes.best == "text/event-stream"
+    ):
+        response = Response(
+            stream_with_context(_event_stream(op)), mimetype="text/event-stream"
+        )
+        # Reverse proxies must pass events through as they are written.
+        response.headers["X-Accel-Buffering"] = "no"
+    else:
+        response = jsonify(_progress_snapshot(op))
+    response.headers["Cache-Control"] = "no-store"
+    return response
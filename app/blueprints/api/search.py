@@ -0,0 +1,129 @@
+from datetime import date, datetime, timedelta
+
+from flask import current_app, jsonify, request, session
+
+from ...database.queries import (
+    QSOSearchFilters,
+    callsign_prefix,
+    decode_keyset_cursor,
+    encode_keyset_cursor,
+    get_user,
+    search_qsos,
+)
+from ..auth.wrappers import login_required
+from .base import bp
+
+
+class _InvalidFilter(ValueError):
+    def __init__(self, field: str):
+        super().__init__(field)
+        self.field = field
+
+
+def _datetime_arg(name: str, *, end: bool = False) -> datetime | None:
+    value = request.args.get(name, type=str, default="").strip()
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            # A bare date bounds the whole day, so an end date is inclusive.
+            day = date.fromisoformat(value)
+            if end:
+                day += timedelta(days=1)
+            return datetime(day.year, day.month, day.day)
+        return datetime.fromisoformat(value)
+    except ValueError as error:
+        raise _InvalidFilter(name) from error
+
+
+def _filters_from_request() -> QSOSearchFilters:
+    dxcc_raw = request.args.get("dxcc", type=str, default="").strip()
+    try:
+        dxcc = int(dxcc_raw) if dxcc_raw else None
+    except ValueError as error:
+        raise _InvalidFilter("dxcc") from error
+
+    return QSOSearchFilters(
+        call=request.args.get("call", type=str),
+        band=request.args.get("band", type=str),
+        mode=request.args.get("mode", type=str),
+        dxcc=dxcc,
+        state=request.args.get("state", type=str),
+        grid=request.args.get("grid", type=str),
+        qso_start=_datetime_arg("qso_from"),
+        qso_end=_datetime_arg("qso_to", end=True),
+        qsl_start=_datetime_arg("qsl_from"),
+        qsl_end=_datetime_arg("qsl_to", end=True),
+    )
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+@bp.get("/api/v1/search/qsos")
+@login_required()
+def search_qsos_api():
+    try:
+        filters = _filters_from_request()
+    except _InvalidFilter as error:
+        return jsonify({"error": "invalid_filter", "field": error.field}), 400
+
+    cursor_token = request.args.get("cursor", type=str, default="").strip()
+    try:
+        after = decode_keyset_cursor(cursor_token) if cursor_token else None
+    except ValueError:
+        return jsonify({"error": "invalid_cursor"}), 400
+
+    limit = min(max(request.args.get("limit", type=int, default=50), 1), 200)
+
+    with current_app.config.get("SESSION_MAKER").begin() as session_:
+        user = get_user(op=session.get("op"), session=session_)
+        rows, next_cursor = search_qsos(
+            user_id=user.id,
+            filters=filters,
+            session=session_,
+            after=after,
+            limit=limit,
+        )
+
+    return jsonify(
+        {
+            "items": [
+                {
+                    "id": row.id,
+                    "call": row.call,
+                    "band": row.band,
+                    "mode": row.mode,
+                    "dxcc": row.dxcc,
+                    "country": row.country,
+                    "state": row.state,
+                    "gridsquare": row.gridsquare,
+                    "qso_at": _isoformat(row.app_lotw_qso_timestamp),
+                    "qsl_at": _isoformat(row.app_lotw_rxqsl),
+                }
+                for row in rows
+            ],
+            "next_cursor": encode_keyset_cursor(*next_cursor) if next_cursor else None,
+        }
+    )
+
+
+@bp.get("/api/v1/search/callsign/suggest")
+@login_required()
+def callsign_suggest():
+    prefix = request.args.get("q", type=str, default="")
+    limit = min(max(request.args.get("limit", type=int, default=10), 1), 25)
+
+    with current_app.config.get("SESSION_MAKER").begin() as session_:
+        user = get_user(op=session.get("op"), session=session_)
+        suggestions = list(
+            callsign_prefix(
+                user=user,
+                prefix=prefix,
+                session=session_,
+                limit=limit,
+            )
+        )
+
+    return jsonify({"query": prefix, "suggestions": suggestions})
@@ -58,7 +58,7 @@ def login():
             login_response = post(
                 url=LOGIN_URL,
                 data=lotw_payload,
-                timeout=current_app.config.get("LOTW_REQUEST_TIMEOUT_SECONDS", 20),
+                timeout=lotw.request_profile(LOGIN_URL).timeout,
             )
         except RequestException:
             flash("LoTW is temporarily unavailable. Please try again.", "error")
@@ -98,6 +98,12 @@ def login():
             user = ensure_user(op=op, session=session_)
 
             user.lotw_cookies = dict_from_cookiejar(login_response.cookies)
+            # LoTW just accepted these credentials, so a digest skipped while
+            # they had expired is due again; let the next run recompute it.
+            user.lotw_auth_state = "ok"
+            user.lotw_fail_count = 0
+            if user.notification_preference is not None:
+                user.notification_preference.next_digest_due_at = None
 
             session_.add(user)
 
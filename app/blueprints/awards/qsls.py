@@ -1,16 +1,27 @@
 from datetime import datetime, timezone
 
-from flask import current_app, flash, render_template, request, session, url_for
+from flask import (
+    current_app,
+    flash,
+    make_response,
+    render_template,
+    request,
+    session,
+    url_for,
+)
 from sqlalchemy.orm import Session
 
 from ...background_jobs import enqueue_qso_import
 from ...cache import is_expired
 from ...database.queries import (
     check_unique_qsos_bulk,
-    get_25_most_recent_rxqsls,
+    decode_keyset_cursor,
+    encode_keyset_cursor,
+    get_recent_rxqsls,
     get_user,
+    mark_qsos_seen,
 )
-from ...database.table_declarations import QSOReport
+from ...http_cache import apply_validators, compute_etag, not_modified_response
 from ...urls import QSLS_PAGE_URL
 from ..auth.wrappers import login_required
 from .base import bp
@@ -22,6 +33,12 @@ def qsls():
     force_reload: bool = request.args.get(
         "force_reload", default=False, type=bool
     )
+    page_size: int = current_app.config.get("QSLS_PAGE_SIZE", 25)
+    before_token = request.args.get("before", default="", type=str)
+    try:
+        before = decode_keyset_cursor(before_token) if before_token else None
+    except ValueError:
+        before = None
 
     with current_app.config.get("SESSION_MAKER").begin() as session_:
         session_: Session
@@ -55,8 +72,40 @@ def qsls():
                     "info",
                 )
 
-        qsls: list[QSOReport] = get_25_most_recent_rxqsls(
-            user=user, session=session_
+        # Everything the page renders derives from these. qsls_version moves
+        # whenever rows are imported or marked seen, so a 304 never has to
+        # count the user's QSLs.
+        etag = compute_etag(
+            "qsls",
+            user.op,
+            user.qso_reports_last_update_time,
+            user.qsls_version,
+            user.qso_sync_status,
+            user.qso_sync_progress,
+            user.qso_sync_total,
+            user.qso_sync_started_at,
+            user.qso_sync_finished_at,
+            user.qso_sync_last_error,
+            user.lotw_auth_state,
+            user.lotw_last_ok_at,
+            user.lotw_last_fail_at,
+            user.lotw_fail_count,
+            user.lotw_last_fail_reason,
+            page_size,
+            before,
+        )
+        # No Last-Modified: the page also changes with sync status, the
+        # unseen count and LoTW health, which only the ETag covers.
+        if not force_reload:
+            not_modified = not_modified_response(etag)
+            if not_modified is not None:
+                return not_modified
+
+        qsls, next_cursor = get_recent_rxqsls(
+            user=user,
+            session=session_,
+            limit=page_size,
+            before=before,
         )
 
         # Bulk check uniqueness for all QSLs in one query
@@ -70,8 +119,11 @@ def qsls():
             for qsl in qsls
         ]
 
-        for qsl in qsls:
-            qsl.seen = True
+        mark_qsos_seen(
+            user_id=user.id,
+            qso_ids=[qsl.id for qsl in qsls if not qsl.seen],
+            session=session_,
+        )
 
         parsed_at = (
             user.qso_reports_last_update_time.strftime("%d/%m/%Y, %H:%M:%S")
@@ -98,16 +150,28 @@ def qsls():
             if user.qso_sync_finished_at
             else "N/A",
             "last_error": user.qso_sync_last_error,
+            "progress": user.qso_sync_progress or 0,
+            "total": user.qso_sync_total,
         }
 
-        return render_template(
-            "qsls.html",
-            qsl_tuples=qsl_tuples,
-            qsls_page_url=QSLS_PAGE_URL,
-            parsed_at=parsed_at,
-            user_op=user.op,
-            lotw_health=lotw_health,
-            qso_sync=qso_sync,
-            force_reload=url_for("awards.qsls", force_reload=True),
-            title="25 Most Recent QSLs",
+        response = make_response(
+            render_template(
+                "qsls.html",
+                qsl_tuples=qsl_tuples,
+                qsls_page_url=QSLS_PAGE_URL,
+                parsed_at=parsed_at,
+                user_op=user.op,
+                lotw_health=lotw_health,
+                qso_sync=qso_sync,
+                force_reload=url_for("awards.qsls", force_reload=True),
+                older_qsls_url=url_for(
+                    "awards.qsls", before=encode_keyset_cursor(*next_cursor)
+                )
+                if next_cursor
+                else None,
+                title=f"{page_size} Most Recent QSLs"
+                if before is None
+                else "Earlier QSLs",
+            )
         )
+        return apply_validators(response, etag)
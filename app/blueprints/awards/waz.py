@@ -1,6 +1,7 @@
 from flask import render_template, url_for
 
 from ...cache import get_award_details
+from ...http_cache import conditional_award
 from ...urls import WAZ_PAGE_URL
 from ..auth.wrappers import login_required
 from .base import bp
@@ -8,6 +9,7 @@ from .base import bp
 
 @bp.get("/waz")
 @login_required(next_page="awards.waz")
+@conditional_award("waz")
 def waz():
     waz_details, was_parsed_at = get_award_details(award="waz")
 
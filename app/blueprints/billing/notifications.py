@@ -109,6 +109,9 @@ def notification_settings():
                 preference.qsl_digest_enabled = bool(
                     request.form.get("qsl_digest_enabled")
                 )
+                # Timezone or delivery time may have moved; let the next
+                # digest run recompute when this user is due.
+                preference.next_digest_due_at = None
                 preference.fallback_to_email = bool(
                     request.form.get("fallback_to_email")
                 )
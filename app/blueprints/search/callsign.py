@@ -1,9 +1,11 @@
+from typing import Sequence
+
 from flask import current_app, render_template, request, session
+from sqlalchemy import Row
 from sqlalchemy.orm import Session
 
 from ...database.queries import callsign as search_callsign
 from ...database.queries import get_user
-from ...database.table_declarations import QSOReport
 from ..auth.wrappers import login_required
 from .base import bp
 
@@ -11,7 +13,7 @@ from .base import bp
 @bp.route("/search/callsign", methods=["POST", "GET"])
 @login_required("search.callsign")
 def callsign():
-    qsls: list[QSOReport] = None
+    qsls: Sequence[Row] | None = None
     query: str = ""
     if request.method == "POST":
         query = request.form.get("query", type=str, default="")
@@ -4,6 +4,7 @@ from cachetools import TTLCache
 from flask import current_app, request, session
 
 from .dataclasses import AwardsDetail, TripleDetail
+from .metrics import AWARD_CACHE_REQUESTS
 from .parser import parse_award
 
 # Server-side cache with 30-minute TTL (1800 seconds)
@@ -45,8 +46,12 @@ def get_award_details(
     force_reload: bool = request.args.get("force_reload", type=bool, default=False)
 
     # Check server-side cache first (unless force reload)
-    if not force_reload and cache_key in _award_cache:
-        return _award_cache[cache_key]
+    if not force_reload:
+        cached = _award_cache.get(cache_key)
+        if cached is not None:
+            AWARD_CACHE_REQUESTS.inc(award=award, result="hit")
+            return cached
+    AWARD_CACHE_REQUESTS.inc(award=award, result="miss")
 
     # Fetch and parse award data
     award_details = parse_award(award=award)
@@ -56,3 +61,17 @@ def get_award_details(
     _award_cache[cache_key] = (award_details, award_parsed_at)
 
     return award_details, award_parsed_at
+
+
+def peek_award_parsed_at(award: str) -> datetime | None:
+    """Return when the session user's cached award was parsed, without
+    fetching it. ``None`` means the next ``get_award_details`` call will hit
+    LoTW (nothing cached, or a force reload was requested).
+    """
+    if request.args.get("force_reload", type=bool, default=False):
+        return None
+
+    cached = _award_cache.get(f"{session.get('op')}:{award}")
+    if cached is None:
+        return None
+    return cached[1]
@@ -5,20 +5,37 @@ from .functional import (
     get_qso_report_by_timestamp,
     get_qso_reports_by_timestamps,
     get_user,
+    is_postgresql,
     is_unique_qso,
+    qso_report_key,
 )
 from .map import (
     get_user_qsos_for_map_by_rxqso,
     get_user_qsos_for_map_by_rxqso_count,
 )
 from .notifications import (
+    DigestWindow,
+    claim_digest_batch,
     ensure_notification_preference,
     get_active_web_push_subscriptions,
     get_delivery_for_batch_channel,
     get_digest_batch,
+    get_due_digest_user_ids,
     get_enabled_digest_users,
     get_notification_preference,
+    get_pending_digest_batches,
     get_qsls_for_digest_window,
+    get_qsls_for_digest_windows,
+    mark_sent_digest_batches,
+    set_digest_batch_dispatch_status,
+    upsert_digest_batches,
 )
-from .qso_page import get_25_most_recent_rxqsls
-from .search import callsign
+from .pagination import KeysetCursor, decode_keyset_cursor, encode_keyset_cursor
+from .qso_page import (
+    bump_qsls_version,
+    count_unseen_rxqsls,
+    get_25_most_recent_rxqsls,
+    get_recent_rxqsls,
+    mark_qsos_seen,
+)
+from .search import QSOSearchFilters, callsign, callsign_prefix, search_qsos
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
 from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import Session
@@ -15,6 +15,10 @@ def ensure_user(op: str, session: Session) -> User:
     return user
 
 
+def is_postgresql(session: Session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
 def get_object[T](type_: T, id: int, session: Session) -> T | None:
     return session.scalar(select(type_).where(type_.id == id))
 
@@ -180,10 +184,25 @@ def get_qso_report_by_timestamp(
     )
 
 
+def qso_report_key(
+    app_lotw_qso_timestamp: datetime | None, call: str | None
+) -> tuple[datetime | None, str | None]:
+    """The (timestamp, call) identity of a QSO, with the timestamp as stored:
+    naive UTC. adi_parser gives aware timestamps; the column returns naive."""
+    if app_lotw_qso_timestamp is not None and app_lotw_qso_timestamp.tzinfo:
+        app_lotw_qso_timestamp = app_lotw_qso_timestamp.astimezone(timezone.utc).replace(
+            tzinfo=None
+        )
+    return (app_lotw_qso_timestamp, call)
+
+
 def get_qso_reports_by_timestamps(
     timestamp_call_pairs: list[tuple[datetime, str]], user_id: int, session: Session
 ) -> dict[tuple[datetime, str], QSOReport]:
-    """Fetch multiple QSO reports by (timestamp, call) pairs in a single query."""
+    """Fetch multiple QSO reports by (timestamp, call) pairs in a single query.
+
+    The result is keyed by ``qso_report_key``, whatever tzinfo the pairs have.
+    """
     if not timestamp_call_pairs:
         return {}
 
@@ -192,12 +211,13 @@ def get_qso_reports_by_timestamps(
             QSOReport.app_lotw_qso_timestamp == ts,
             QSOReport.call == call,
         )
-        for ts, call in timestamp_call_pairs
+        for ts, call in (qso_report_key(*pair) for pair in timestamp_call_pairs)
     ]
 
     stmt = select(QSOReport).where(and_(QSOReport.user_id == user_id, or_(*conditions)))
     reports = session.scalars(stmt).all()
 
     return {
-        (report.app_lotw_qso_timestamp, report.call): report for report in reports
+        qso_report_key(report.app_lotw_qso_timestamp, report.call): report
+        for report in reports
     }
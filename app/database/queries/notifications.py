@@ -1,8 +1,25 @@
 from datetime import date, datetime, timezone
-from typing import Sequence
+from typing import Any, Collection, Sequence
 
-from sqlalchemy import and_, or_, select
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    Row,
+    and_,
+    case,
+    column,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+    union_all,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, contains_eager
 
 from ..table_declarations import (
     NotificationDelivery,
@@ -12,6 +29,19 @@ from ..table_declarations import (
     User,
     WebPushSubscription,
 )
+from .functional import is_postgresql
+
+# (user_id, window_start_utc, window_end_utc)
+DigestWindow = tuple[int, datetime, datetime]
+
+# Columns a digest payload is built from.
+DIGEST_PAYLOAD_COLUMNS = (
+    QSOReport.id,
+    QSOReport.call,
+    QSOReport.band,
+    QSOReport.mode,
+    QSOReport.app_lotw_rxqsl,
+)
 
 
 def ensure_notification_preference(
@@ -73,6 +103,188 @@ def get_qsls_for_digest_window(
     ).all()
 
 
+def _digest_windows_table(windows: Sequence[DigestWindow], session: Session):
+    if is_postgresql(session):
+        return values(
+            column("user_id", Integer),
+            column("window_start_utc", DateTime(timezone=True)),
+            column("window_end_utc", DateTime(timezone=True)),
+            name="digest_windows",
+        ).data(list(windows))
+
+    # SQLite cannot name the columns of a VALUES list; UNION ALL of literal
+    # rows gives the same derived table.
+    return union_all(
+        *(
+            select(
+                literal(user_id, Integer).label("user_id"),
+                literal(window_start, DateTime(timezone=True)).label("window_start_utc"),
+                literal(window_end, DateTime(timezone=True)).label("window_end_utc"),
+            )
+            for user_id, window_start, window_end in windows
+        )
+    ).subquery("digest_windows")
+
+
+def get_qsls_for_digest_windows(
+    windows: Sequence[DigestWindow],
+    session: Session,
+) -> Sequence[Row]:
+    """Payload columns of every QSL inside each user's digest window.
+
+    One query for all users: QSOs are joined against the list of windows.
+    Rows come back grouped by user, newest QSL first.
+    """
+    if not windows:
+        return []
+
+    digest_windows = _digest_windows_table(windows=windows, session=session)
+    return session.execute(
+        select(QSOReport.user_id, *DIGEST_PAYLOAD_COLUMNS)
+        .join(
+            digest_windows,
+            and_(
+                QSOReport.user_id == digest_windows.c.user_id,
+                QSOReport.app_lotw_rxqsl > digest_windows.c.window_start_utc,
+                QSOReport.app_lotw_rxqsl <= digest_windows.c.window_end_utc,
+            ),
+        )
+        .where(QSOReport.app_lotw_rxqsl.isnot(None))
+        .order_by(
+            QSOReport.user_id,
+            QSOReport.app_lotw_rxqsl.desc(),
+            QSOReport.id.desc(),
+        )
+    ).all()
+
+
+def upsert_digest_batches(
+    batches: Sequence[dict[str, Any]],
+    session: Session,
+) -> set[tuple[int, date]]:
+    """Insert or refresh digest batches in one statement.
+
+    ``batches`` are QSLDigestBatch column mappings. Conflicts on
+    (user_id, digest_date) update the existing row. Batches with QSLs are
+    queued for dispatch unless the existing row was already sent. Returns
+    the pairs that already existed beforehand.
+    """
+    if not batches:
+        return set()
+    batches = [
+        {
+            **batch,
+            "dispatch_status": "pending" if batch["qsl_count"] > 0 else "empty",
+        }
+        for batch in batches
+    ]
+
+    existing = {
+        (row.user_id, row.digest_date)
+        for row in session.execute(
+            select(QSLDigestBatch.user_id, QSLDigestBatch.digest_date).where(
+                QSLDigestBatch.user_id.in_({batch["user_id"] for batch in batches}),
+                QSLDigestBatch.digest_date.in_(
+                    {batch["digest_date"] for batch in batches}
+                ),
+            )
+        )
+    }
+
+    insert = postgresql_insert if is_postgresql(session) else sqlite_insert
+    stmt = insert(QSLDigestBatch).values(list(batches))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[QSLDigestBatch.user_id, QSLDigestBatch.digest_date],
+        set_={
+            "window_start_utc": stmt.excluded.window_start_utc,
+            "window_end_utc": stmt.excluded.window_end_utc,
+            "qsl_count": stmt.excluded.qsl_count,
+            "payload_json": stmt.excluded.payload_json,
+            "generated_at": stmt.excluded.generated_at,
+            "dispatch_status": case(
+                (QSLDigestBatch.dispatch_status == "sent", "sent"),
+                else_=stmt.excluded.dispatch_status,
+            ),
+        },
+    )
+    session.execute(stmt)
+    return existing
+
+
+def get_pending_digest_batches(
+    *,
+    limit: int,
+    session: Session,
+) -> list[tuple[int, int]]:
+    """(batch_id, user_id) of batches awaiting dispatch, oldest first.
+
+    Served from the partial index on pending batches.
+    """
+    return [
+        (row.id, row.user_id)
+        for row in session.execute(
+            select(QSLDigestBatch.id, QSLDigestBatch.user_id)
+            .where(QSLDigestBatch.dispatch_status == "pending")
+            .order_by(QSLDigestBatch.generated_at.asc(), QSLDigestBatch.id.asc())
+            .limit(limit)
+        )
+    ]
+
+
+def mark_sent_digest_batches(
+    *,
+    digest_batch_ids: Sequence[int],
+    session: Session,
+) -> int:
+    """Mark those of ``digest_batch_ids`` that have a sent delivery as sent.
+
+    Repairs batches left pending after their delivery was recorded.
+    """
+    sent_at = (
+        select(func.max(NotificationDelivery.sent_at))
+        .where(
+            NotificationDelivery.digest_batch_id == QSLDigestBatch.id,
+            NotificationDelivery.status == "sent",
+        )
+        .scalar_subquery()
+    )
+    result = session.execute(
+        update(QSLDigestBatch)
+        .where(
+            QSLDigestBatch.id.in_(digest_batch_ids),
+            QSLDigestBatch.dispatch_status == "pending",
+            exists().where(
+                NotificationDelivery.digest_batch_id == QSLDigestBatch.id,
+                NotificationDelivery.status == "sent",
+            ),
+        )
+        .values(dispatch_status="sent", dispatched_at=sent_at)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+def set_digest_batch_dispatch_status(
+    *,
+    digest_batch_id: int,
+    status: str,
+    session: Session,
+) -> None:
+    """Move a batch out of (or back into) the pending queue.
+
+    Called in the same transaction that records the delivery outcome.
+    """
+    session.execute(
+        update(QSLDigestBatch)
+        .where(QSLDigestBatch.id == digest_batch_id)
+        .values(
+            dispatch_status=status,
+            dispatched_at=datetime.now(tz=timezone.utc) if status == "sent" else None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
 def get_digest_batch(
     user_id: int, digest_date: date, session: Session
 ) -> QSLDigestBatch | None:
@@ -115,11 +327,61 @@ def get_delivery_for_batch_channel(
     )
 
 
-def get_enabled_digest_users(session: Session) -> Sequence[User]:
-    now_utc = datetime.now(tz=timezone.utc)
-    return session.scalars(
+def claim_digest_batch(
+    *,
+    user_id: int,
+    digest_batch_id: int,
+    now: datetime,
+    stale_before: datetime,
+    session: Session,
+) -> bool:
+    """Atomically take ownership of a batch for dispatch.
+
+    The claim is the batch's ``web_push`` delivery row set to ``claimed``.
+    Returns ``False`` if the batch was already sent or another dispatcher
+    holds a claim newer than ``stale_before``.
+    """
+    insert = postgresql_insert if is_postgresql(session) else sqlite_insert
+    inserted = session.execute(
+        insert(NotificationDelivery)
+        .values(
+            user_id=user_id,
+            digest_batch_id=digest_batch_id,
+            channel="web_push",
+            type="qsl_digest",
+            status="claimed",
+            claimed_at=now,
+            created_at=now,
+        )
+        .on_conflict_do_nothing()
+    )
+    if inserted.rowcount:
+        return True
+
+    updated = session.execute(
+        update(NotificationDelivery)
+        .where(
+            NotificationDelivery.user_id == user_id,
+            NotificationDelivery.digest_batch_id == digest_batch_id,
+            NotificationDelivery.channel == "web_push",
+            NotificationDelivery.status != "sent",
+            or_(
+                NotificationDelivery.status != "claimed",
+                NotificationDelivery.claimed_at.is_(None),
+                NotificationDelivery.claimed_at < stale_before,
+            ),
+        )
+        .values(status="claimed", claimed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return bool(updated.rowcount)
+
+
+def _enabled_digest_users(now_utc: datetime, due_at: datetime | None):
+    stmt = (
         select(User)
-        .join(NotificationPreference, NotificationPreference.user_id == User.id)
+        .join(User.notification_preference)
+        .options(contains_eager(User.notification_preference))
         .where(NotificationPreference.qsl_digest_enabled.is_(True))
         .where(
             or_(
@@ -127,4 +389,57 @@ def get_enabled_digest_users(session: Session) -> Sequence[User]:
                 User.entitlement_expires_at > now_utc,
             )
         )
-    ).all()
+    )
+    if due_at is not None:
+        stmt = stmt.where(
+            or_(
+                NotificationPreference.next_digest_due_at.is_(None),
+                NotificationPreference.next_digest_due_at <= due_at,
+            )
+        )
+    return stmt
+
+
+def get_enabled_digest_users(
+    session: Session,
+    *,
+    shard_count: int = 1,
+    shard_index: int = 0,
+    after_id: int | None = None,
+    limit: int | None = None,
+    due_at: datetime | None = None,
+    user_ids: Collection[int] | None = None,
+) -> Sequence[User]:
+    """Users with digests enabled and an active entitlement, in id order.
+
+    ``shard_count``/``shard_index`` partition users by ``id % shard_count``;
+    ``after_id`` and ``limit`` page through a shard in short chunks. With
+    ``due_at`` only users whose ``next_digest_due_at`` has passed (or was
+    never computed) are returned, and ``user_ids`` narrows to those users.
+    """
+    stmt = _enabled_digest_users(datetime.now(tz=timezone.utc), due_at)
+    if shard_count > 1:
+        stmt = stmt.where(User.id % shard_count == shard_index)
+    if user_ids is not None:
+        stmt = stmt.where(User.id.in_(user_ids))
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id)
+    stmt = stmt.order_by(User.id.asc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return session.scalars(stmt).all()
+
+
+def get_due_digest_user_ids(session: Session, *, due_at: datetime, limit: int) -> list[int]:
+    """Ids of up to ``limit`` users due a digest at ``due_at``, longest
+    overdue first, so a capped run never starves anyone."""
+    stmt = (
+        _enabled_digest_users(datetime.now(tz=timezone.utc), due_at)
+        .with_only_columns(User.id)
+        .order_by(
+            NotificationPreference.next_digest_due_at.asc().nulls_first(),
+            User.id.asc(),
+        )
+        .limit(limit)
+    )
+    return list(session.scalars(stmt))
@@ -0,0 +1,37 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+
+# A keyset cursor is the sort key of the last row on a page: the row's
+# (app_lotw_rxqsl, id). The next page seeks strictly past it.
+KeysetCursor = tuple[datetime | None, int]
+
+
+def encode_keyset_cursor(sort_value: datetime | None, row_id: int) -> str:
+    raw = json.dumps(
+        [sort_value.isoformat() if sort_value else None, row_id],
+        separators=(",", ":"),
+    )
+    return urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_keyset_cursor(token: str) -> KeysetCursor:
+    """Decode a cursor from :func:`encode_keyset_cursor`.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        sort_value, row_id = json.loads(urlsafe_b64decode(padded.encode("ascii")))
+    except (BinasciiError, UnicodeError, TypeError, json.JSONDecodeError) as error:
+        raise ValueError("Malformed pagination cursor.") from error
+
+    if not isinstance(row_id, int) or isinstance(row_id, bool):
+        raise ValueError("Malformed pagination cursor.")
+    if sort_value is None:
+        return None, row_id
+    if not isinstance(sort_value, str):
+        raise ValueError("Malformed pagination cursor.")
+    return datetime.fromisoformat(sort_value), row_id
@@ -1,30 +1,140 @@
-from sqlalchemy import Sequence, select
-from sqlalchemy.orm import Session
+from typing import Sequence
+
+from sqlalchemy import and_, exists, func, or_, select, update
+from sqlalchemy.orm import Session, aliased, load_only
 
 from ..table_declarations import QSOReport, User
+from .pagination import KeysetCursor
 
+# Columns the QSL table and check_unique_qsos_bulk read, plus the seen flag.
+RECENT_RXQSL_COLUMNS = (
+    QSOReport.call,
+    QSOReport.band,
+    QSOReport.mode,
+    QSOReport.dxcc,
+    QSOReport.seen,
+    QSOReport.app_lotw_qso_timestamp,
+    QSOReport.app_lotw_rxqsl,
+)
 
-def get_25_most_recent_rxqsls(
-    user: User, session: Session
-) -> Sequence[QSOReport]:
+
+def _newer_qsl_for_same_qso(user_id: int):
+    """True when another QSL of the user shares the row's
+    (app_lotw_qso_timestamp, call) and is newer, so the row is a stale copy."""
+    newer = aliased(QSOReport)
+    return exists().where(
+        newer.user_id == user_id,
+        newer.app_lotw_qso_timestamp == QSOReport.app_lotw_qso_timestamp,
+        newer.call == QSOReport.call,
+        newer.app_lotw_rxqsl.is_not(None),
+        or_(
+            newer.app_lotw_rxqsl > QSOReport.app_lotw_rxqsl,
+            and_(
+                newer.app_lotw_rxqsl == QSOReport.app_lotw_rxqsl,
+                newer.id > QSOReport.id,
+            ),
+        ),
+    )
+
+
+def get_recent_rxqsls(
+    user: User,
+    session: Session,
+    limit: int = 25,
+    before: KeysetCursor | None = None,
+) -> tuple[Sequence[QSOReport], KeysetCursor | None]:
+    """Return one page of a user's QSLs, newest first, without duplicates.
+
+    Rows sharing (app_lotw_qso_timestamp, call) collapse to the most recent
+    QSL in SQL, so every page is full. ``before`` is the cursor returned with
+    the previous page; the returned cursor is ``None`` on the last page.
+
+    The seek, the duplicate check and the limit are one query walking
+    ``ix_qso_reports_user_rxqsl``, so a page costs its size rather than the
+    user's whole QSL history.
+    """
     stmt = (
         select(QSOReport)
-        .join(User)
-        .where(User.id == user.id)
-        .where(QSOReport.app_lotw_rxqsl.is_not(None))
-        .order_by(QSOReport.app_lotw_rxqsl.desc(), QSOReport.id.desc())
-        .limit(250)
+        .options(load_only(*RECENT_RXQSL_COLUMNS))
+        .where(
+            QSOReport.user_id == user.id,
+            QSOReport.app_lotw_rxqsl.is_not(None),
+            ~_newer_qsl_for_same_qso(user_id=user.id),
+        )
     )
+    if before is not None:
+        before_rxqsl, before_id = before
+        stmt = stmt.where(
+            or_(
+                QSOReport.app_lotw_rxqsl < before_rxqsl,
+                and_(
+                    QSOReport.app_lotw_rxqsl == before_rxqsl,
+                    QSOReport.id < before_id,
+                ),
+            )
+        )
+    stmt = stmt.order_by(
+        QSOReport.app_lotw_rxqsl.desc(), QSOReport.id.desc()
+    ).limit(limit + 1)
+
     rows = session.scalars(stmt).all()
-    unique_rows: list[QSOReport] = []
-    seen_keys: set[tuple] = set()
-    for row in rows:
-        key = (row.app_lotw_qso_timestamp, row.call)
-        if key in seen_keys:
-            continue
-        seen_keys.add(key)
-        unique_rows.append(row)
-        if len(unique_rows) >= 25:
-            break
-
-    return unique_rows
+    if len(rows) <= limit:
+        return rows, None
+
+    page = rows[:limit]
+    return page, (page[-1].app_lotw_rxqsl, page[-1].id)
+
+
+def get_25_most_recent_rxqsls(
+    user: User, session: Session
+) -> Sequence[QSOReport]:
+    rows, _ = get_recent_rxqsls(user=user, session=session, limit=25)
+    return rows
+
+
+def mark_qsos_seen(user_id: int, qso_ids: list[int], session: Session) -> int:
+    """Flag QSOs as seen with a single UPDATE and return the rows changed.
+
+    Objects already loaded in ``session`` keep their old ``seen`` value, so
+    callers can still render which rows were new. ``users.qsls_version`` is
+    bumped when anything changed.
+    """
+    if not qso_ids:
+        return 0
+
+    result = session.execute(
+        update(QSOReport)
+        .where(
+            QSOReport.user_id == user_id,
+            QSOReport.id.in_(qso_ids),
+            QSOReport.seen.is_(False),
+        )
+        .values(seen=True)
+        .execution_options(synchronize_session=False)
+    )
+    changed = result.rowcount or 0
+    if changed:
+        bump_qsls_version(user_id=user_id, session=session)
+    return changed
+
+
+def bump_qsls_version(user_id: int, session: Session) -> None:
+    """Invalidate validators built from ``users.qsls_version``."""
+    session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(qsls_version=User.qsls_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def count_unseen_rxqsls(user_id: int, session: Session) -> int:
+    return session.scalar(
+        select(func.count())
+        .select_from(QSOReport)
+        .where(
+            QSOReport.user_id == user_id,
+            QSOReport.app_lotw_rxqsl.is_not(None),
+            QSOReport.seen.is_(False),
+        )
+    )
@@ -1,23 +1,202 @@
-from sqlalchemy import Sequence, and_, func, select
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import Row, and_, func, or_, select
 from sqlalchemy.orm import Session
 
 from ..table_declarations import QSOReport, User
+from .functional import is_postgresql
+from .pagination import KeysetCursor
+
+# Only the fields search.html renders through components/qsl_table.html.
+CALLSIGN_SEARCH_COLUMNS = (
+    QSOReport.id,
+    QSOReport.call,
+    QSOReport.band,
+    QSOReport.mode,
+    QSOReport.app_lotw_qso_timestamp,
+)
+
+# Lightweight projection for the JSON search API.
+QSO_SEARCH_COLUMNS = (
+    QSOReport.id,
+    QSOReport.call,
+    QSOReport.band,
+    QSOReport.mode,
+    QSOReport.dxcc,
+    QSOReport.country,
+    QSOReport.state,
+    QSOReport.gridsquare,
+    QSOReport.app_lotw_qso_timestamp,
+    QSOReport.app_lotw_rxqsl,
+)
+
+
+@dataclass(frozen=True)
+class QSOSearchFilters:
+    """Filters for :func:`search_qsos`. Date ranges are half-open [start, end)."""
+
+    call: str | None = None
+    band: str | None = None
+    mode: str | None = None
+    dxcc: int | None = None
+    state: str | None = None
+    grid: str | None = None
+    qso_start: datetime | None = None
+    qso_end: datetime | None = None
+    qsl_start: datetime | None = None
+    qsl_end: datetime | None = None
+
+
+def normalize_callsign_query(query: str | None) -> str:
+    return (query or "").strip().upper()
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
-def callsign(user: User, query: str, session: Session) -> Sequence[QSOReport]:
-    normalized = (query or "").strip()
-    wildcard_query = f"%{normalized}%"
+def _callsign_prefix_clause(prefix: str, session: Session):
+    call_upper = func.upper(QSOReport.call)
+    if is_postgresql(session):
+        # text_pattern_ops on ix_qso_reports_user_call_upper serves LIKE 'X%'.
+        return call_upper.like(f"{_escape_like(prefix)}%", escape="\\")
+
+    # SQLite compares with BINARY collation, so a half-open range on the
+    # expression index is an exact prefix match.
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(call_upper >= prefix, call_upper < upper_bound)
+
+
+def _callsign_contains_clause(normalized: str, session: Session):
+    wildcard_query = f"%{_escape_like(normalized)}%"
+    if is_postgresql(session):
+        # Served by the pg_trgm GIN index ix_qso_reports_call_trgm.
+        return QSOReport.call.ilike(wildcard_query, escape="\\")
+    return func.upper(QSOReport.call).like(wildcard_query, escape="\\")
+
+
+def callsign(
+    user: User,
+    query: str,
+    session: Session,
+    limit: int = 100,
+) -> Sequence[Row]:
+    normalized = normalize_callsign_query(query)
+    if not normalized:
+        return []
+
     stmt = (
-        select(QSOReport)
-        .join(User)
+        select(*CALLSIGN_SEARCH_COLUMNS)
         .where(
             and_(
-                User.id == user.id,
-                QSOReport.call.ilike(wildcard_query),
+                QSOReport.user_id == user.id,
+                _callsign_contains_clause(normalized, session),
             )
         )
         .order_by(QSOReport.app_lotw_rxqsl.desc())
-        .limit(100)
+        .limit(limit)
+    )
+
+    return session.execute(stmt).all()
+
+
+def callsign_prefix(
+    user: User,
+    prefix: str,
+    session: Session,
+    limit: int = 10,
+) -> Sequence[str]:
+    """Return distinct worked callsigns starting with ``prefix`` for typeahead."""
+    normalized = normalize_callsign_query(prefix)
+    if not normalized:
+        return []
+
+    call_upper = func.upper(QSOReport.call)
+    stmt = (
+        select(call_upper)
+        .where(
+            and_(
+                QSOReport.user_id == user.id,
+                _callsign_prefix_clause(normalized, session),
+            )
+        )
+        .group_by(call_upper)
+        .order_by(call_upper)
+        .limit(limit)
     )
 
     return session.scalars(stmt).all()
+
+
+def _qso_filter_clauses(filters: QSOSearchFilters, session: Session) -> list:
+    clauses = []
+    if filters.call and filters.call.strip():
+        clauses.append(
+            _callsign_contains_clause(normalize_callsign_query(filters.call), session)
+        )
+    if filters.band:
+        clauses.append(QSOReport.band == filters.band.strip().upper())
+    if filters.mode:
+        clauses.append(QSOReport.mode == filters.mode.strip().upper())
+    if filters.dxcc is not None:
+        clauses.append(QSOReport.dxcc == filters.dxcc)
+    if filters.state:
+        clauses.append(QSOReport.state == filters.state.strip().upper())
+    if filters.grid and filters.grid.strip():
+        grid = _escape_like(filters.grid.strip().upper())
+        clauses.append(func.upper(QSOReport.gridsquare).like(f"{grid}%", escape="\\"))
+    if filters.qso_start:
+        clauses.append(QSOReport.app_lotw_qso_timestamp >= filters.qso_start)
+    if filters.qso_end:
+        clauses.append(QSOReport.app_lotw_qso_timestamp < filters.qso_end)
+    if filters.qsl_start:
+        clauses.append(QSOReport.app_lotw_rxqsl >= filters.qsl_start)
+    if filters.qsl_end:
+        clauses.append(QSOReport.app_lotw_rxqsl < filters.qsl_end)
+    return clauses
+
+
+def _seek_after(cursor: KeysetCursor):
+    """Rows strictly after ``cursor`` in (rxqsl DESC NULLS LAST, id DESC) order."""
+    rxqsl, qso_id = cursor
+    if rxqsl is None:
+        return and_(QSOReport.app_lotw_rxqsl.is_(None), QSOReport.id < qso_id)
+    return or_(
+        QSOReport.app_lotw_rxqsl < rxqsl,
+        and_(QSOReport.app_lotw_rxqsl == rxqsl, QSOReport.id < qso_id),
+        QSOReport.app_lotw_rxqsl.is_(None),
+    )
+
+
+def search_qsos(
+    user_id: int,
+    filters: QSOSearchFilters,
+    session: Session,
+    after: KeysetCursor | None = None,
+    limit: int = 50,
+) -> tuple[Sequence[Row], KeysetCursor | None]:
+    """Search a user's whole log with keyset (seek) pagination.
+
+    Rows are ordered newest QSL first, with unconfirmed QSOs last, and the
+    returned cursor is ``None`` on the final page.
+    """
+    clauses = [QSOReport.user_id == user_id, *_qso_filter_clauses(filters, session)]
+    if after is not None:
+        clauses.append(_seek_after(after))
+
+    stmt = (
+        select(*QSO_SEARCH_COLUMNS)
+        .where(and_(*clauses))
+        .order_by(QSOReport.app_lotw_rxqsl.desc().nulls_last(), QSOReport.id.desc())
+        .limit(limit + 1)
+    )
+    rows = session.execute(stmt).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    page = rows[:limit]
+    last = page[-1]
+    return page, (last.app_lotw_rxqsl, last.id)
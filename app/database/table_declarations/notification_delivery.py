@@ -21,6 +21,7 @@ class NotificationDelivery(Base):
             "channel",
             unique=True,
         ),
+        Index("ix_notification_deliveries_created_at", "created_at"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -45,6 +46,11 @@ class NotificationDelivery(Base):
     )
     error_code: Mapped[str | None] = mapped_column(String(length=128), nullable=True)
     error_detail: Mapped[str | None] = mapped_column(Text(), nullable=True)
+    # Set while a dispatcher owns the batch; stale claims may be taken over.
+    claimed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
     sent_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True),
         nullable=True,
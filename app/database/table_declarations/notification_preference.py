@@ -1,7 +1,7 @@
 from datetime import datetime, time, timezone
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, String, Time
+from sqlalchemy import DateTime, ForeignKey, Index, String, Time
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -12,6 +12,13 @@ if TYPE_CHECKING:
 
 class NotificationPreference(Base):
     __tablename__ = "notification_preferences"
+    __table_args__ = (
+        Index(
+            "ix_notification_preferences_enabled_next_due",
+            "qsl_digest_enabled",
+            "next_digest_due_at",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(
@@ -48,6 +55,12 @@ class NotificationPreference(Base):
         DateTime(timezone=True),
         nullable=True,
     )
+    # When the digest scheduler should next look at this user. NULL means
+    # "unknown": the user is evaluated on the next run and the value refilled.
+    next_digest_due_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=lambda: datetime.now(tz=timezone.utc),
@@ -1,7 +1,7 @@
 from datetime import date, datetime, timezone
 from typing import TYPE_CHECKING, Any
 
-from sqlalchemy import DateTime, ForeignKey, Index
+from sqlalchemy import DateTime, ForeignKey, Index, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -20,6 +20,18 @@ class QSLDigestBatch(Base):
             "digest_date",
             unique=True,
         ),
+        # Retention purges by date across all users.
+        Index("ix_qsl_digest_batches_digest_date", "digest_date"),
+        # Only pending batches are indexed, so finding dispatch work stays an
+        # index-only lookup however much history accumulates.
+        Index(
+            "ix_qsl_digest_batches_pending",
+            "generated_at",
+            "id",
+            "user_id",
+            postgresql_where=text("dispatch_status = 'pending'"),
+            sqlite_where=text("dispatch_status = 'pending'"),
+        ),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -35,6 +47,12 @@ class QSLDigestBatch(Base):
         DateTime(timezone=True),
         default=lambda: datetime.now(tz=timezone.utc),
     )
+    # pending -> sent once any channel delivers; "empty" batches have no QSLs.
+    dispatch_status: Mapped[str] = mapped_column(String(length=16), default="pending")
+    dispatched_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
 
     deliveries: Mapped[list["NotificationDelivery"]] = relationship(
         back_populates="digest_batch"
@@ -4,7 +4,7 @@ from datetime import date, datetime
 from typing import TYPE_CHECKING, Any
 
 from adi_parser.dataclasses import QSOReport as QSOReportDC
-from sqlalchemy import ForeignKey, Index
+from sqlalchemy import DDL, ForeignKey, Index, event, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -20,6 +20,8 @@ class QSOReport(Base):
         Index("ix_qso_reports_user_call", "user_id", "call"),
         Index("ix_qso_reports_user_qso_timestamp", "user_id", "app_lotw_qso_timestamp"),
         Index("ix_qso_reports_user_lat_long", "user_id", "latitude", "longitude"),
+        Index("ix_qso_reports_user_dxcc_band", "user_id", "dxcc", "band"),
+        Index("ix_qso_reports_user_band_mode", "user_id", "band", "mode"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -165,3 +167,33 @@ class QSOReport(Base):
 
 
         return user_details, other_details
+
+
+# Callsign search: the upper-case expression index serves prefix lookups on
+# every backend, the trigram index serves substring ILIKE searches on Postgres.
+Index(
+    "ix_qso_reports_user_call_upper",
+    QSOReport.user_id,
+    func.upper(QSOReport.call).label("call_upper"),
+    postgresql_ops={"call_upper": "text_pattern_ops"},
+)
+Index(
+    "ix_qso_reports_call_trgm",
+    QSOReport.call,
+    postgresql_using="gin",
+    postgresql_ops={"call": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+
+# Keyset pagination for the QSO search API walks this index in order.
+Index(
+    "ix_qso_reports_user_rxqsl_id",
+    QSOReport.user_id,
+    QSOReport.app_lotw_rxqsl.desc().nulls_last(),
+    QSOReport.id.desc(),
+).ddl_if(dialect="postgresql")
+
+event.listen(
+    QSOReport.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -53,6 +53,25 @@ class User(Base):
         nullable=True,
     )
     qso_sync_last_error: Mapped[str | None]
+    # Records written so far out of the total fetched. A first import
+    # commits in checkpoints and resumes from qso_sync_progress using the
+    # report spooled at qso_import_spool.
+    qso_sync_progress: Mapped[int] = mapped_column(default=0)
+    qso_sync_total: Mapped[int | None]
+    qso_import_spool: Mapped[str | None] = mapped_column(String(length=512))
+    # Bumped whenever the user's QSL rows are imported or marked seen; the
+    # /qsls ETag uses it instead of counting unseen rows.
+    qsls_version: Mapped[int] = mapped_column(default=0)
+    # Latest APP_LoTW_RXQSL / APP_LoTW_RXQSO seen, in UTC: where the next
+    # import resumes its QSL and QSO streams.
+    qso_qsl_cursor: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    qso_rx_cursor: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
 
     plan_tier: Mapped[str] = mapped_column(default="free")
     stripe_customer_id: Mapped[str | None] = mapped_column(index=True)
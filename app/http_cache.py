@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+from functools import wraps
+from hashlib import sha256
+
+from flask import Response, make_response, request, session
+
+from .cache import peek_award_parsed_at
+
+
+def compute_etag(*parts: object) -> str:
+    """Hash the values a page is derived from into a strong ETag."""
+    digest = sha256("\x1f".join(repr(part) for part in parts).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def _http_datetime(value: datetime | None) -> datetime | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second resolution.
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def apply_validators(
+    response: Response,
+    etag: str,
+    last_modified: datetime | None = None,
+) -> Response:
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _http_datetime(last_modified)
+    # Pages are per user: let clients revalidate, but never share caches.
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add("Cookie")
+    return response
+
+
+def not_modified_response(
+    etag: str,
+    last_modified: datetime | None = None,
+) -> Response | None:
+    """Return a 304 if the request's validators still match, else ``None``.
+
+    Call before doing the expensive work for a page. Requests carrying
+    pending flash messages always get a full response so the flash renders.
+    """
+    if session.get("_flashes"):
+        return None
+
+    if request.if_none_match:
+        matched = request.if_none_match.contains(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = _http_datetime(last_modified) <= request.if_modified_since
+    else:
+        matched = False
+
+    if not matched:
+        return None
+    return apply_validators(Response(status=304), etag, last_modified)
+
+
+def conditional_award(award: str):
+    """Serve an award page with validators derived from its parse time.
+
+    A cached award short-circuits with 304 before the view runs, so neither
+    LoTW nor the template is touched for unchanged data.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def decorated_view(*args, **kwargs):
+            op = session.get("op")
+            parsed_at = peek_award_parsed_at(award=award)
+            if parsed_at is not None:
+                not_modified = not_modified_response(
+                    compute_etag(award, op, parsed_at), parsed_at
+                )
+                if not_modified is not None:
+                    return not_modified
+
+            response = make_response(view(*args, **kwargs))
+            parsed_at = peek_award_parsed_at(award=award)
+            if response.status_code != 200 or parsed_at is None:
+                return response
+            return apply_validators(
+                response, compute_etag(award, op, parsed_at), parsed_at
+            )
+
+        return decorated_view
+
+    return decorator
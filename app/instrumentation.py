@@ -0,0 +1,126 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging import DEBUG, INFO
+from time import perf_counter
+from typing import Iterator
+
+from flask import Flask, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_active_stats: ContextVar[tuple["QueryStats", ...]] = ContextVar(
+    "mobile_lotw_query_stats", default=()
+)
+_SLOW_STATEMENT_PREVIEW = 500
+
+
+@dataclass
+class QueryStats:
+    """SQL statements issued within one request, job or ``track_queries`` block."""
+
+    label: str | None = None
+    statements: int = 0
+    db_seconds: float = 0.0
+    slow_queries: list[tuple[float, str]] = field(default_factory=list)
+
+    @property
+    def db_ms(self) -> float:
+        return round(self.db_seconds * 1000, 1)
+
+    def record(self, statement: str, elapsed: float, slow: bool) -> None:
+        self.statements += 1
+        self.db_seconds += elapsed
+        if slow:
+            self.slow_queries.append((round(elapsed * 1000, 1), statement))
+
+
+@contextmanager
+def track_queries(label: str | None = None) -> Iterator[QueryStats]:
+    """Count the statements run in this context (and thread) while open.
+
+    Blocks nest: every enclosing request or block sees the statement too.
+    With a ``label`` the totals are logged on exit, which is how background
+    jobs report. Tests use the yielded stats to assert query budgets.
+    """
+    stats = QueryStats(label=label)
+    token = _active_stats.set(_active_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active_stats.reset(token)
+        if label is not None and has_app_context():
+            log_query_stats(stats)
+
+
+def log_query_stats(stats: QueryStats) -> None:
+    """Log a summary: INFO when over budget or slow, otherwise DEBUG."""
+    config = current_app.config
+    over_budget = stats.statements > config.get("SQL_STATEMENT_BUDGET", 50)
+    current_app.logger.log(
+        INFO if over_budget or stats.slow_queries else DEBUG,
+        "SQL %s: %s statements, %sms in DB, %s slow",
+        stats.label,
+        stats.statements,
+        stats.db_ms,
+        len(stats.slow_queries),
+    )
+
+
+def _before_cursor_execute(_conn, _cursor, _statement, _parameters, context, _executemany):
+    if context is not None:
+        context._query_started_at = perf_counter()
+
+
+def _after_cursor_execute(_conn, _cursor, statement, _parameters, context, _executemany):
+    started = getattr(context, "_query_started_at", None)
+    if started is None:
+        return
+    elapsed = perf_counter() - started
+    in_app = has_app_context()
+    slow_ms = current_app.config.get("SQL_SLOW_QUERY_MS", 200) if in_app else 200
+    slow = elapsed * 1000 >= slow_ms
+    active = _active_stats.get()
+    for stats in active:
+        stats.record(statement, elapsed, slow)
+    if slow and in_app:
+        current_app.logger.warning(
+            "Slow SQL (%.1fms) in %s: %s",
+            elapsed * 1000,
+            active[0].label if active else "unknown",
+            " ".join(statement.split())[:_SLOW_STATEMENT_PREVIEW],
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement on ``engine``; safe to call more than once."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def init_app(app: Flask) -> None:
+    """Track SQL per request and optionally report it in ``Server-Timing``."""
+    instrument_engine(app.config.get("SESSION_MAKER").kw["bind"])
+
+    @app.before_request
+    def _start_query_tracking():
+        g._query_tracking = track_queries(label=f"{request.method} {request.path}")
+        g.query_stats = g._query_tracking.__enter__()
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats: QueryStats | None = g.get("query_stats")
+        if stats is not None and app.config.get("SERVER_TIMING_ENABLED"):
+            response.headers.add(
+                "Server-Timing",
+                f'db;dur={stats.db_ms};desc="{stats.statements} queries"',
+            )
+        return response
+
+    @app.teardown_request
+    def _stop_query_tracking(_error=None):
+        tracking = g.pop("_query_tracking", None)
+        if tracking is not None:
+            tracking.__exit__(None, None, None)
@@ -1,5 +1,10 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
+from logging import Logger
+from threading import Lock
+from time import monotonic, perf_counter
+from typing import Callable
 
 from flask import current_app, session
 from requests import RequestException
@@ -8,6 +13,21 @@ from requests import get as r_get
 from requests import post as r_post
 
 from .database.queries import get_user
+from .metrics import (
+    LOTW_HEDGED_REQUESTS,
+    LOTW_REQUEST_SECONDS,
+    LOTW_REQUESTS_REJECTED,
+    lotw_outcome,
+    lotw_url_kind,
+)
+from .rate_limit import CircuitBreaker, KeyedRateLimiter, TokenBucket
+
+_guard_lock = Lock()
+# Small, idempotent pages worth a duplicate request when LoTW is slow.
+_HEDGED_KINDS = frozenset({"award_account", "account_credits", "qso_detail"})
+_STREAM_CHUNK_BYTES = 64 * 1024
+# LoTW answers an overload with a 200 carrying this page instead of a 429.
+_OVERLOAD_MARKER = b"Page Request Limit!"
 
 
 class LotwAuthExpiredError(RuntimeError):
@@ -20,6 +40,121 @@ class LotwTransientError(RuntimeError):
         self.status_code = status_code
 
 
+def _reject(reason: str, message: str, status_code: int) -> None:
+    LOTW_REQUESTS_REJECTED.inc(reason=reason)
+    raise LotwTransientError(message, status_code=status_code)
+
+
+class LotwGuard:
+    """Rate limits and a circuit breaker for every LoTW request this app makes.
+
+    Requests take a token from the caller's bucket and from the global one,
+    waiting up to ``LOTW_RATE_LIMIT_MAX_WAIT_SECONDS``. Consecutive 5xx, 429
+    and network failures open the breaker, after which requests fail fast
+    until a probe gets through.
+    """
+
+    def __init__(self, config, logger: Logger):
+        self.logger = logger
+        self.max_wait = config.get("LOTW_RATE_LIMIT_MAX_WAIT_SECONDS", 10)
+        self.bucket = TokenBucket(
+            rate=config.get("LOTW_RATE_PER_SECOND", 5),
+            capacity=config.get("LOTW_RATE_BURST", 10),
+        )
+        self.user_limiter = KeyedRateLimiter(
+            rate=config.get("LOTW_USER_RATE_PER_SECOND", 1),
+            capacity=config.get("LOTW_USER_RATE_BURST", 6),
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.get("LOTW_CIRCUIT_FAILURE_THRESHOLD", 5),
+            reset_timeout=config.get("LOTW_CIRCUIT_RESET_SECONDS", 30),
+        )
+
+    def admit(self, op: str) -> None:
+        """Wait for a request slot for ``op`` or raise ``LotwTransientError``."""
+        if self.breaker.state == CircuitBreaker.OPEN:
+            _reject("circuit_open", "LoTW is unavailable; requests are paused.", 503)
+        if not self.user_limiter.acquire(op, timeout=self.max_wait):
+            _reject("user_rate_limited", "Too many LoTW requests for this account.", 429)
+        if not self.bucket.acquire(timeout=self.max_wait):
+            _reject("rate_limited", "Too many LoTW requests; please retry.", 503)
+        if not self.breaker.allow():
+            _reject("circuit_open", "LoTW is unavailable; requests are paused.", 503)
+
+    def admit_hedge(self) -> bool:
+        """Whether a duplicate request may be sent right now, without waiting."""
+        return self.breaker.state == CircuitBreaker.CLOSED and self.bucket.try_acquire() == 0
+
+    def record(self, status_code: int | None) -> None:
+        """Feed a response status (``None`` for a network error) to the breaker."""
+        if status_code is None or status_code == 429 or status_code >= 500:
+            if self.breaker.record_failure():
+                self.logger.warning(
+                    "LoTW circuit opened after %s consecutive failures; pausing %ss",
+                    self.breaker.failure_threshold,
+                    self.breaker.reset_timeout,
+                )
+        elif self.breaker.record_success():
+            self.logger.info("LoTW circuit closed")
+
+
+def lotw_guard() -> LotwGuard:
+    """The current app's ``LotwGuard``, shared by all of its threads."""
+    app = current_app._get_current_object()
+    guard = app.extensions.get("lotw_guard")
+    if guard is None:
+        with _guard_lock:
+            guard = app.extensions.get("lotw_guard")
+            if guard is None:
+                guard = LotwGuard(app.config, app.logger)
+                app.extensions["lotw_guard"] = guard
+    return guard
+
+
+@dataclass(frozen=True)
+class RequestProfile:
+    """How long to wait on one kind of LoTW page."""
+
+    connect_timeout: float
+    read_timeout: float
+    # Stream the body and give up once it takes longer than this in total.
+    deadline: float | None = None
+    # Send a duplicate request if the first has not answered by then.
+    hedge_after: float | None = None
+
+    @property
+    def timeout(self) -> tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+def request_profile(url: str) -> RequestProfile:
+    """Timeouts for ``url``: ADIF reports get a long read timeout and an
+    overall deadline, award pages are hedged past their observed p95."""
+    config = current_app.config
+    kind = lotw_url_kind(url)
+    connect_timeout = config.get("LOTW_CONNECT_TIMEOUT_SECONDS", 5)
+    if kind == "adif_report":
+        return RequestProfile(
+            connect_timeout=connect_timeout,
+            read_timeout=config.get("LOTW_ADIF_READ_TIMEOUT_SECONDS", 120),
+            deadline=config.get("LOTW_ADIF_DEADLINE_SECONDS", 900) or None,
+        )
+
+    hedge_after = None
+    if kind in _HEDGED_KINDS and config.get("LOTW_HEDGED_READS_ENABLED", True):
+        hedge_after = LOTW_REQUEST_SECONDS.quantile(
+            0.95,
+            min_count=config.get("LOTW_HEDGE_MIN_SAMPLES", 20),
+            kind=kind,
+            outcome="2xx",
+        )
+    return RequestProfile(
+        connect_timeout=connect_timeout,
+        read_timeout=config.get("LOTW_REQUEST_TIMEOUT_SECONDS", 20),
+        hedge_after=hedge_after,
+    )
+
+
 def _record_lotw_success(op: str) -> None:
     with current_app.config.get("SESSION_MAKER").begin() as session_:
         try:
@@ -86,13 +221,12 @@ def _get_lotw_cookies(op: str) -> dict[str, str]:
 def _is_lotw_auth_expired(response: RResponse) -> bool:
     if response.status_code in {401, 403}:
         return True
+    if response.status_code == 429 or response.status_code >= 500:
+        # Outages are transient, not a logged-out session.
+        return False
     return not is_valid_response(response=response)
 
 
-def _request_timeout_seconds() -> int:
-    return current_app.config.get("LOTW_REQUEST_TIMEOUT_SECONDS", 20)
-
-
 def _raise_for_non_success_status(response: RResponse, op: str) -> None:
     if response.status_code == 429:
         _record_lotw_failure(op=op, reason="http_429", auth_expired=False)
@@ -122,19 +256,151 @@ def _raise_for_non_success_status(response: RResponse, op: str) -> None:
         )
 
 
-def get(url: str, op: str | None = None) -> RResponse:
+def _close_when_done(future) -> None:
+    """Release the connection of the response ``future`` ends with."""
+
+    def close(done) -> None:
+        if done.exception() is None:
+            done.result().close()
+
+    future.add_done_callback(close)
+
+
+def _send_hedged(send, url: str, *, guard: LotwGuard, hedge_after: float, **kwargs):
+    """Call ``send``; if it has not answered within ``hedge_after`` seconds and
+    the guard has a spare token, race a duplicate against it."""
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="lotw-hedge")
+    try:
+        primary = executor.submit(send, url=url, **kwargs)
+        done, _pending = wait([primary], timeout=hedge_after, return_when=FIRST_COMPLETED)
+        if done or not guard.admit_hedge():
+            return primary.result()
+
+        LOTW_HEDGED_REQUESTS.inc(result="sent")
+        hedge = executor.submit(send, url=url, **kwargs)
+        error: RequestException | None = None
+        for future in as_completed([primary, hedge]):
+            try:
+                response = future.result()
+            except RequestException as exc:
+                error = exc
+                continue
+            if future is hedge:
+                LOTW_HEDGED_REQUESTS.inc(result="won")
+            _close_when_done(primary if future is hedge else hedge)
+            return response
+        raise error
+    finally:
+        # The slower request is left to finish (or time out) on its own.
+        executor.shutdown(wait=False)
+
+
+def _read_body(
+    response: RResponse,
+    deadline: float,
+    on_progress: Callable[[int, int | None], None] | None = None,
+) -> None:
+    """Read a streamed body into ``response.content``, giving up at the
+    monotonic ``deadline``. ``on_progress(received, total)`` is called per
+    chunk; ``total`` is ``None`` without a ``Content-Length``."""
+    length = response.headers.get("Content-Length")
+    total = int(length) if length and length.isdigit() else None
+    received = 0
+    chunks = []
+    try:
+        for chunk in response.iter_content(chunk_size=_STREAM_CHUNK_BYTES):
+            if monotonic() > deadline:
+                raise LotwTransientError(
+                    "LoTW download took too long.",
+                    status_code=504,
+                )
+            chunks.append(chunk)
+            received += len(chunk)
+            if on_progress is not None:
+                on_progress(received, total)
+    finally:
+        response.close()
+    response._content = b"".join(chunks)
+
+
+def _timed_request(
+    send,
+    url: str,
+    *,
+    guard: LotwGuard,
+    op: str,
+    profile: RequestProfile,
+    on_progress: Callable[[int, int | None], None] | None = None,
+    **kwargs,
+) -> RResponse:
+    """Call ``send`` (requests' get/post) once ``guard`` admits it, with the
+    timeouts of ``profile``, and record its latency and outcome.
+    ``on_progress`` follows streamed (deadline-bound) downloads."""
+    guard.admit(op)
+    started = perf_counter()
+    deadline_at = None if profile.deadline is None else monotonic() + profile.deadline
+    status_code = None
+    try:
+        if profile.hedge_after is not None:
+            response = _send_hedged(
+                send,
+                url,
+                guard=guard,
+                hedge_after=profile.hedge_after,
+                timeout=profile.timeout,
+                **kwargs,
+            )
+        else:
+            response = send(
+                url=url,
+                timeout=profile.timeout,
+                stream=deadline_at is not None,
+                **kwargs,
+            )
+        if deadline_at is not None:
+            _read_body(response, deadline=deadline_at, on_progress=on_progress)
+        if response.status_code == 200 and _OVERLOAD_MARKER in response.content:
+            # Handled as the 429 it is: by the breaker and by the caller.
+            response.status_code = 429
+        # Set only once the body is in, so a download that passes its
+        # deadline or breaks mid-read counts as a failure.
+        status_code = response.status_code
+        return response
+    finally:
+        guard.record(status_code)
+        LOTW_REQUEST_SECONDS.observe(
+            perf_counter() - started,
+            kind=lotw_url_kind(url),
+            outcome=lotw_outcome(status_code),
+        )
+
+
+def get(
+    url: str,
+    op: str | None = None,
+    on_progress: Callable[[int, int | None], None] | None = None,
+) -> RResponse:
     active_op = _resolve_op(op=op)
     cookies = _get_lotw_cookies(op=active_op)
 
     try:
-        response = r_get(
-            url=url,
+        response = _timed_request(
+            r_get,
+            url,
+            guard=lotw_guard(),
+            op=active_op,
+            profile=request_profile(url),
+            on_progress=on_progress,
             cookies=cookies,
-            timeout=_request_timeout_seconds(),
         )
     except RequestException as error:
         _record_lotw_failure(op=active_op, reason="request_exception")
         raise LotwTransientError("Failed request to LoTW.") from error
+    except LotwTransientError as error:
+        # Guard rejections never reached LoTW; a download past its deadline did.
+        if error.status_code == 504:
+            _record_lotw_failure(op=active_op, reason="deadline_exceeded")
+        raise
 
     if _is_lotw_auth_expired(response=response):
         _record_lotw_failure(
@@ -155,11 +421,15 @@ def post(url: str, data: dict, op: str | None = None) -> RResponse:
     cookies = _get_lotw_cookies(op=active_op)
 
     try:
-        response = r_post(
-            url=url,
+        response = _timed_request(
+            r_post,
+            url,
+            guard=lotw_guard(),
+            op=active_op,
+            # Only idempotent GETs are hedged.
+            profile=replace(request_profile(url), hedge_after=None),
             data=data,
             cookies=cookies,
-            timeout=_request_timeout_seconds(),
         )
     except RequestException as error:
         _record_lotw_failure(op=active_op, reason="request_exception")
@@ -202,19 +472,25 @@ def get_multiple(urls: list[str], op: str | None = None) -> dict[str, RResponse]
     """
     active_op = _resolve_op(op=op)
     cookies = _get_lotw_cookies(op=active_op)
+    # Worker threads run outside the app context.
+    guard = lotw_guard()
+    profiles = {url: request_profile(url) for url in urls}
 
     def fetch_url(url: str) -> tuple[str, RResponse | None, bool]:
         try:
-            response = r_get(
-                url=url,
+            response = _timed_request(
+                r_get,
+                url,
+                guard=guard,
+                op=active_op,
+                profile=profiles[url],
                 cookies=cookies,
-                timeout=_request_timeout_seconds(),
             )
             if _is_lotw_auth_expired(response=response):
                 return url, None, True
             if response.status_code == 200 and is_valid_response(response=response):
                 return url, response, False
-        except RequestException:
+        except (RequestException, LotwTransientError):
             pass
         return url, None, False
 
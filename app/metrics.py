@@ -0,0 +1,306 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Values live in this process only; under a multi-process server each worker
+reports its own, distinguished by the scraper's instance label.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Iterator
+from urllib.parse import urlsplit
+
+_DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+type LabelValues = tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """A gauge read from ``collect`` at scrape time.
+
+    ``collect`` returns ``{label values: value}``; use ``()`` as the key for
+    an unlabelled gauge.
+    """
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], dict[LabelValues, float]],
+        labelnames: tuple[str, ...] = (),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.collect().items())
+        ]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = _DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum)
+        self._values: dict[LabelValues, tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            counts, _total = self._values.get(self._key(labels)) or ([0], 0.0)
+            return sum(counts)
+
+    def quantile(self, q: float, min_count: int = 1, **labels: str) -> float | None:
+        """Estimate the ``q`` quantile by interpolating within its bucket, as
+        Prometheus' ``histogram_quantile`` does. ``None`` with fewer than
+        ``min_count`` observations."""
+        with self._lock:
+            counts, _total = self._values.get(self._key(labels)) or ([0], 0.0)
+            counts = list(counts)
+        observed = sum(counts)
+        if observed == 0 or observed < min_count:
+            return None
+        rank = q * observed
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if count and cumulative + count >= rank:
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound
+        # In the +Inf bucket: the largest finite bound is the best estimate.
+        return self.buckets[-1]
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total)) for key, (counts, total) in self._values.items()
+            )
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = Lock()
+
+    def register[M: _Metric](self, metric: M) -> M:
+        with self._lock:
+            # Re-registering (e.g. a module reloaded in tests) replaces the old one.
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+LOTW_REQUEST_SECONDS = REGISTRY.register(
+    Histogram(
+        "mobile_lotw_lotw_request_duration_seconds",
+        "Latency of requests to LoTW by kind of page and outcome.",
+        labelnames=("kind", "outcome"),
+    )
+)
+LOTW_REQUESTS_REJECTED = REGISTRY.register(
+    Counter(
+        "mobile_lotw_lotw_requests_rejected_total",
+        "LoTW requests refused locally by the rate limiter or open circuit breaker.",
+        labelnames=("reason",),
+    )
+)
+LOTW_HEDGED_REQUESTS = REGISTRY.register(
+    Counter(
+        "mobile_lotw_lotw_hedged_requests_total",
+        "Duplicate LoTW page requests sent after a slow first attempt, and how many won.",
+        labelnames=("result",),
+    )
+)
+ADIF_DOWNLOAD_BYTES = REGISTRY.register(
+    Histogram(
+        "mobile_lotw_adif_download_bytes",
+        "Size of lotwreport.adi downloads.",
+        buckets=(1e3, 1e4, 1e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8),
+    )
+)
+ADIF_PARSE_SECONDS = REGISTRY.register(
+    Histogram(
+        "mobile_lotw_adif_parse_seconds",
+        "Time spent parsing lotwreport.adi downloads.",
+    )
+)
+QSO_IMPORT_ROWS_PER_SECOND = REGISTRY.register(
+    Histogram(
+        "mobile_lotw_qso_import_rows_per_second",
+        "Fetched QSO records written to the database per second of import.",
+        buckets=(10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000),
+    )
+)
+QSO_IMPORTS = REGISTRY.register(
+    Counter(
+        "mobile_lotw_qso_imports_total",
+        "QSO imports by outcome.",
+        labelnames=("outcome",),
+    )
+)
+AWARD_CACHE_REQUESTS = REGISTRY.register(
+    Counter(
+        "mobile_lotw_award_cache_requests_total",
+        "Award page lookups served from the award cache (hit) or LoTW (miss).",
+        labelnames=("award", "result"),
+    )
+)
+DIGEST_GENERATION_SECONDS = REGISTRY.register(
+    Histogram(
+        "mobile_lotw_digest_generation_duration_seconds",
+        "Duration of run_due_qsl_digest_generation runs.",
+    )
+)
+DIGEST_DISPATCH_SECONDS = REGISTRY.register(
+    Histogram(
+        "mobile_lotw_digest_dispatch_duration_seconds",
+        "Duration of dispatch_pending_digest_notifications runs.",
+    )
+)
+DIGEST_BATCHES_DISPATCHED = REGISTRY.register(
+    Counter(
+        "mobile_lotw_digest_batches_dispatched_total",
+        "Digest batches dispatched, by outcome.",
+        labelnames=("outcome",),
+    )
+)
+
+_LOTW_PAGE_KINDS = {
+    "lotwreport.adi": "adif_report",
+    "awardaccount": "award_account",
+    "accountcredits": "account_credits",
+    "qsos": "qsl_list",
+    "qsodetail": "qso_detail",
+    "act": "find",
+    "default": "login",
+}
+
+
+def lotw_url_kind(url: str) -> str:
+    """A low-cardinality label for a LoTW URL."""
+    page = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+    return _LOTW_PAGE_KINDS.get(page, "other")
+
+
+def lotw_outcome(status_code: int | None) -> str:
+    if status_code is None:
+        return "exception"
+    return f"{status_code // 100}xx"
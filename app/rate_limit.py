@@ -0,0 +1,143 @@
+from threading import Lock
+from time import monotonic, sleep
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._tokens = self.capacity
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` if available and return 0, otherwise return the
+        seconds to wait before they will be."""
+        with self._lock:
+            self._refill(monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: float | None = None) -> bool:
+        """Block until ``tokens`` are taken. Returns ``False`` if that would
+        take longer than ``timeout`` seconds."""
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None and monotonic() + wait > deadline:
+                return False
+            sleep(wait)
+
+
+class KeyedRateLimiter:
+    """One token bucket per key (e.g. per remote host), created on demand."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = Lock()
+
+    def bucket(self, key: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(rate=self.rate, capacity=self.capacity)
+                self._buckets[key] = bucket
+            return bucket
+
+    def acquire(self, key: str, tokens: float = 1.0, timeout: float | None = None) -> bool:
+        return self.bucket(key).acquire(tokens=tokens, timeout=timeout)
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker.
+
+    Closed until ``failure_threshold`` consecutive failures, then open:
+    ``allow`` refuses calls for ``reset_timeout`` seconds. After that it is
+    half-open and lets a single probe through; the probe's success closes
+    the circuit, its failure opens it again. A probe that never reports back
+    is given up on after another ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = float(reset_timeout)
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_started_at: float | None = None
+        self._lock = Lock()
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if now - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now."""
+        with self._lock:
+            now = monotonic()
+            state = self._state(now)
+            if state == self.CLOSED:
+                return True
+            if state == self.OPEN:
+                return False
+            if (
+                self._probe_started_at is not None
+                and now - self._probe_started_at < self.reset_timeout
+            ):
+                return False
+            self._probe_started_at = now
+            return True
+
+    def record_success(self) -> bool:
+        """Close the circuit. Returns ``True`` if it was not closed before."""
+        with self._lock:
+            was_tripped = self._opened_at is not None
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started_at = None
+            return was_tripped
+
+    def record_failure(self) -> bool:
+        """Count a failure. Returns ``True`` if this opened the circuit."""
+        with self._lock:
+            now = monotonic()
+            self._failures += 1
+            if self._opened_at is not None:
+                # A failed probe (or a straggler from before the trip)
+                # restarts the wait.
+                self._opened_at = now
+                self._probe_started_at = None
+                return False
+            if self._failures >= self.failure_threshold:
+                self._opened_at = now
+                return True
+            return False
@@ -0,0 +1,118 @@
+import gzip
+from hashlib import sha1, sha256
+import os
+from pathlib import Path
+from tempfile import NamedTemporaryFile, gettempdir
+from time import time
+from typing import IO
+
+from flask import current_app
+
+_SUFFIX = ".adi.gz"
+
+
+def spool_dir() -> Path:
+    """The spool directory, private to this process's user.
+
+    Spooled reports are users' whole logs, so the directory is created 0700
+    and one owned by someone else (say, planted in a shared temp dir) is
+    refused.
+    """
+    path = Path(
+        current_app.config.get("QSO_IMPORT_SPOOL_DIR")
+        or Path(gettempdir()) / "mobile_lotw_spool"
+    )
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if hasattr(os, "getuid"):
+        if path.stat().st_uid != os.getuid():
+            raise RuntimeError(f"QSO import spool {path} is owned by another user.")
+        if path.stat().st_mode & 0o077:
+            path.chmod(0o700)
+    return path
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    """Write ``content`` to ``path`` (mode 0600) so that only a complete
+    file ever appears under its name, whatever other writers do."""
+    with NamedTemporaryFile(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".partial", delete=False
+    ) as partial:
+        partial.write(content)
+    try:
+        Path(partial.name).replace(path)
+    except OSError:
+        Path(partial.name).unlink(missing_ok=True)
+        raise
+
+
+def _ref_path(user_id: int, url: str) -> Path:
+    return spool_dir() / f"{user_id}-{sha1(url.encode()).hexdigest()[:16]}.ref"
+
+
+def store(content: bytes) -> Path:
+    """Write ``content`` gzipped under its SHA-256 and return the path.
+
+    Identical payloads share one file; a file only appears under its final
+    name once completely written.
+    """
+    path = spool_dir() / f"{sha256(content).hexdigest()}{_SUFFIX}"
+    if path.exists():
+        # Restart its retention window.
+        path.touch()
+        return path
+    _write_atomic(path, gzip.compress(content, compresslevel=6))
+    return path
+
+
+def open_payload(path: Path) -> IO[bytes]:
+    """Open a spooled payload for (decompressed) reading."""
+    return gzip.open(path, "rb")
+
+
+def read(path: Path) -> bytes:
+    with open_payload(path) as payload:
+        return payload.read()
+
+
+def remember(*, user_id: int, url: str, path: Path) -> None:
+    """Note that ``url`` was downloaded for this user into ``path``."""
+    _write_atomic(_ref_path(user_id, url), path.name.encode())
+
+
+def recall(*, user_id: int, url: str) -> Path | None:
+    """The payload downloaded for this user and ``url`` within
+    ``QSO_IMPORT_SPOOL_REUSE_SECONDS``, if it is still spooled."""
+    ref = _ref_path(user_id, url)
+    max_age = current_app.config.get("QSO_IMPORT_SPOOL_REUSE_SECONDS", 3600)
+    try:
+        if time() - ref.stat().st_mtime > max_age:
+            return None
+        path = spool_dir() / ref.read_text().strip()
+    except OSError:
+        return None
+    return path if path.exists() else None
+
+
+def forget(user_id: int) -> None:
+    """Drop this user's download notes once an import has succeeded; the
+    payloads themselves stay until ``purge_expired`` removes them."""
+    for ref in spool_dir().glob(f"{user_id}-*.ref"):
+        ref.unlink(missing_ok=True)
+
+
+def purge_expired(retention_hours: float | None = None) -> int:
+    """Delete spool files older than ``QSO_IMPORT_SPOOL_RETENTION_HOURS``.
+    Returns how many were removed. Run on a schedule
+    (``scripts/purge_adif_spool.py``), not on every download."""
+    if retention_hours is None:
+        retention_hours = current_app.config.get("QSO_IMPORT_SPOOL_RETENTION_HOURS", 24)
+    cutoff = time() - retention_hours * 3600
+    removed = 0
+    for path in spool_dir().iterdir():
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
@@ -0,0 +1,195 @@
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+
+from ..database.queries import claim_digest_batch, mark_sent_digest_batches
+from ..rate_limit import KeyedRateLimiter
+from .digest_email import DigestEmailSendError, SMTPConnectionPool
+from .digest_notifications import (
+    DigestDispatchPlan,
+    email_skip_reason,
+    plan_digest_dispatch,
+    record_email_result,
+    record_push_result,
+    send_planned_email,
+)
+from .web_push import send_qsl_digest_web_push
+
+
+def claim_digest_batches(
+    *,
+    batches: list[tuple[int, int]],
+    now: datetime | None = None,
+) -> list[int]:
+    """Claim (batch_id, user_id) pairs for this dispatcher, in order.
+
+    Batches already sent, or claimed by another dispatcher within
+    ``DIGEST_DISPATCH_CLAIM_TTL_SECONDS``, are left out. Batches found to be
+    sent already are taken off the pending queue.
+    """
+    now = now or datetime.now(tz=timezone.utc)
+    stale_before = now - timedelta(
+        seconds=current_app.config.get("DIGEST_DISPATCH_CLAIM_TTL_SECONDS", 900)
+    )
+    claimed: list[int] = []
+    with current_app.config.get("SESSION_MAKER").begin() as session_:
+        for batch_id, user_id in batches:
+            if claim_digest_batch(
+                user_id=user_id,
+                digest_batch_id=batch_id,
+                now=now,
+                stale_before=stale_before,
+                session=session_,
+            ):
+                claimed.append(batch_id)
+        unclaimed = [batch_id for batch_id, _user_id in batches if batch_id not in claimed]
+        if unclaimed:
+            mark_sent_digest_batches(digest_batch_ids=unclaimed, session=session_)
+    return claimed
+
+
+class DigestDispatcher:
+    """Deliver many digest batches with one bounded worker pool per channel.
+
+    Each batch is planned and pushed on the web push pool; batches that need
+    the email fallback are then handed to the email pool. Sends to the same
+    push service host, and to the SMTP server, share a token bucket so large
+    fan-outs stay within provider rate limits. Every worker uses its own
+    short transactions.
+    """
+
+    def __init__(self, *, push_sender=None, email_sender=None):
+        config = current_app.config
+        self.app = current_app._get_current_object()
+        self.push_sender = push_sender
+        self.email_sender = email_sender
+        self.push_workers = max(1, config.get("DIGEST_PUSH_WORKERS", 8))
+        self.email_workers = max(1, config.get("DIGEST_EMAIL_WORKERS", 4))
+        self.push_limiter = KeyedRateLimiter(
+            rate=config.get("DIGEST_PUSH_HOST_RATE_PER_SECOND", 50)
+        )
+        self.email_limiter = KeyedRateLimiter(
+            rate=config.get("DIGEST_EMAIL_RATE_PER_SECOND", 10)
+        )
+
+    def _push_stage(self, batch_id: int) -> tuple[DigestDispatchPlan, str]:
+        with self.app.app_context():
+            session_maker = current_app.config.get("SESSION_MAKER")
+            with session_maker.begin() as session_:
+                plan = plan_digest_dispatch(batch_id=batch_id, session=session_)
+
+            if plan.push_status is not None:
+                return plan, plan.push_status
+
+            report = send_qsl_digest_web_push(
+                targets=plan.push_targets,
+                payload=plan.push_payload,
+                send_callable=self.push_sender,
+                rate_limiter=self.push_limiter,
+            )
+            with session_maker.begin() as session_:
+                push_status = record_push_result(
+                    plan=plan, report=report, session=session_
+                )
+            return plan, push_status
+
+    def _email_stage(self, plan: DigestDispatchPlan, push_status: str) -> str:
+        with self.app.app_context():
+            if plan.email_status is not None:
+                return plan.email_status
+
+            skip_reason = email_skip_reason(plan=plan, push_status=push_status)
+            if skip_reason:
+                email_status, delivery_fields = "skipped", {"error_code": skip_reason}
+            else:
+                self.email_limiter.acquire(
+                    current_app.config.get("DIGEST_SMTP_HOST") or "smtp"
+                )
+                email_status, delivery_fields = send_planned_email(
+                    plan=plan, email_sender=self.email_sender
+                )
+            with current_app.config.get("SESSION_MAKER").begin() as session_:
+                record_email_result(
+                    plan=plan, status=email_status, session=session_, **delivery_fields
+                )
+            return email_status
+
+    def _open_smtp_pool(self) -> SMTPConnectionPool | None:
+        """Share authenticated SMTP connections across the email workers,
+        unless a sender was injected or SMTP is not configured."""
+        if self.email_sender is not None:
+            return None
+        try:
+            pool = SMTPConnectionPool.from_config(
+                current_app.config, max_size=self.email_workers
+            )
+        except DigestEmailSendError:
+            return None
+        self.email_sender = pool.send
+        return pool
+
+    def dispatch(self, batch_ids: list[int]) -> list[dict[str, str | int]]:
+        """Dispatch claimed batches; one result dict per batch."""
+        smtp_pool = self._open_smtp_pool()
+        try:
+            return self._dispatch(batch_ids)
+        finally:
+            if smtp_pool is not None:
+                current_app.logger.info(
+                    "Digest email pool opened %s SMTP connections",
+                    smtp_pool.connections_opened,
+                )
+                smtp_pool.close()
+                self.email_sender = None
+
+    def _dispatch(self, batch_ids: list[int]) -> list[dict[str, str | int]]:
+        results: list[dict[str, str | int]] = []
+        with ThreadPoolExecutor(
+            max_workers=self.push_workers, thread_name_prefix="digest-push"
+        ) as push_pool, ThreadPoolExecutor(
+            max_workers=self.email_workers, thread_name_prefix="digest-email"
+        ) as email_pool:
+            push_futures = {
+                push_pool.submit(self._push_stage, batch_id): batch_id
+                for batch_id in batch_ids
+            }
+            email_futures: dict[Future, tuple[DigestDispatchPlan, str]] = {}
+            for future in as_completed(push_futures):
+                batch_id = push_futures[future]
+                try:
+                    plan, push_status = future.result()
+                except Exception:  # noqa: BLE001
+                    current_app.logger.exception(
+                        "Failed to dispatch notifications for digest batch %s", batch_id
+                    )
+                    results.append(
+                        {"batch_id": batch_id, "push_status": "error", "email_status": "error"}
+                    )
+                    continue
+                email_futures[
+                    email_pool.submit(self._email_stage, plan, push_status)
+                ] = (plan, push_status)
+
+            for future in as_completed(email_futures):
+                plan, push_status = email_futures[future]
+                try:
+                    email_status = future.result()
+                except Exception:  # noqa: BLE001
+                    current_app.logger.exception(
+                        "Failed to send digest email for batch %s", plan.batch_id
+                    )
+                    email_status = "error"
+                result = {
+                    "batch_id": plan.batch_id,
+                    "push_status": push_status,
+                    "email_status": email_status,
+                }
+                current_app.logger.info(
+                    "Digest dispatch summary op=%s batch=%s result=%s",
+                    plan.op,
+                    plan.batch_id,
+                    result,
+                )
+                results.append(result)
+        return results
@@ -1,47 +1,180 @@
 from datetime import datetime, timezone
 from email.message import EmailMessage
+from email.utils import make_msgid
 import smtplib
+from threading import BoundedSemaphore, Lock
 
 from flask import current_app
 
-from ..database.table_declarations import QSLDigestBatch, User
-
 
 class DigestEmailSendError(RuntimeError):
     pass
 
 
-def _default_send_callable(message: EmailMessage) -> str:
-    smtp_host = current_app.config.get("DIGEST_SMTP_HOST")
-    smtp_port = current_app.config.get("DIGEST_SMTP_PORT", 587)
-    smtp_user = current_app.config.get("DIGEST_SMTP_USERNAME")
-    smtp_password = current_app.config.get("DIGEST_SMTP_PASSWORD")
-    smtp_from = current_app.config.get("DIGEST_SMTP_FROM_EMAIL")
-    use_starttls = current_app.config.get("DIGEST_SMTP_STARTTLS", True)
+# Errors after which a connection cannot be trusted for another message.
+_RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class SMTPConnectionPool:
+    """Authenticated SMTP connections shared across a dispatch run.
+
+    Up to ``max_size`` connections are opened lazily (connect, STARTTLS,
+    login once each) and reused for every message. A connection that drops
+    is replaced and the message retried once; connections are recycled
+    after ``max_messages_per_connection`` to stay under server limits.
+    """
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int = 587,
+        username: str | None = None,
+        password: str | None = None,
+        use_starttls: bool = True,
+        timeout: float = 30,
+        max_size: int = 4,
+        max_messages_per_connection: int = 100,
+        smtp_factory=None,
+    ):
+        self.host = host
+        self.port = int(port)
+        self.username = username
+        self.password = password
+        self.use_starttls = use_starttls
+        self.timeout = timeout
+        self.max_messages_per_connection = max(1, max_messages_per_connection)
+        self.smtp_factory = smtp_factory or smtplib.SMTP
+        self._slots = BoundedSemaphore(max(1, max_size))
+        self._idle: list[list] = []  # [client, messages_sent]
+        self._lock = Lock()
+        self.connections_opened = 0
+
+    @classmethod
+    def from_config(cls, config, **overrides) -> "SMTPConnectionPool":
+        if not config.get("DIGEST_SMTP_HOST") or not config.get("DIGEST_SMTP_FROM_EMAIL"):
+            raise DigestEmailSendError("smtp_not_configured")
+        options = {
+            "host": config.get("DIGEST_SMTP_HOST"),
+            "port": config.get("DIGEST_SMTP_PORT", 587),
+            "username": config.get("DIGEST_SMTP_USERNAME"),
+            "password": config.get("DIGEST_SMTP_PASSWORD"),
+            "use_starttls": config.get("DIGEST_SMTP_STARTTLS", True),
+            "max_messages_per_connection": config.get(
+                "DIGEST_SMTP_MAX_MESSAGES_PER_CONNECTION", 100
+            ),
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    def _connect(self):
+        client = self.smtp_factory(host=self.host, port=self.port, timeout=self.timeout)
+        try:
+            if self.use_starttls:
+                client.starttls()
+            if self.username and self.password:
+                client.login(user=self.username, password=self.password)
+        except Exception:
+            self._discard(client)
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return client
+
+    @staticmethod
+    def _discard(client) -> None:
+        try:
+            client.quit()
+        except Exception:  # noqa: BLE001
+            try:
+                client.close()
+            except Exception:  # noqa: BLE001
+                pass
 
-    if not smtp_host or not smtp_from:
-        raise DigestEmailSendError("smtp_not_configured")
+    def _checkout(self) -> list:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return [self._connect(), 0]
 
-    with smtplib.SMTP(host=smtp_host, port=int(smtp_port), timeout=30) as client:
-        if use_starttls:
-            client.starttls()
-        if smtp_user and smtp_password:
-            client.login(user=smtp_user, password=smtp_password)
-        client.send_message(message)
+    def _checkin(self, entry: list) -> None:
+        if entry[1] >= self.max_messages_per_connection:
+            self._discard(entry[0])
+            return
+        with self._lock:
+            self._idle.append(entry)
 
-    # SMTP has no universal message id response, reuse generated Message-ID.
-    return message.get("Message-Id", "")
+    def send(self, message: EmailMessage) -> str:
+        """Send one message and return its Message-ID."""
+        if not message.get("Message-Id"):
+            message["Message-Id"] = make_msgid(domain=self.host)
+
+        with self._slots:
+            entry = self._checkout()
+            try:
+                refused = entry[0].send_message(message)
+            except _RECONNECT_ERRORS:
+                self._discard(entry[0])
+                entry = [self._connect(), 0]
+                try:
+                    refused = entry[0].send_message(message)
+                except BaseException:
+                    self._discard(entry[0])
+                    raise
+            except smtplib.SMTPRecipientsRefused as error:
+                entry[1] += 1
+                self._checkin(entry)
+                raise DigestEmailSendError(
+                    "smtp_recipients_refused:" + ",".join(sorted(error.recipients))
+                ) from error
+            except smtplib.SMTPResponseException as error:
+                # A rejected message leaves the session usable, unless the
+                # server is closing it (421).
+                if error.smtp_code == 421:
+                    self._discard(entry[0])
+                else:
+                    entry[1] += 1
+                    self._checkin(entry)
+                raise DigestEmailSendError(f"smtp_{error.smtp_code}") from error
+            except BaseException:
+                self._discard(entry[0])
+                raise
+            entry[1] += 1
+            self._checkin(entry)
+
+        if refused:
+            raise DigestEmailSendError(
+                "smtp_recipients_refused:" + ",".join(sorted(refused))
+            )
+        return message.get("Message-Id", "")
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for client, _ in idle:
+            self._discard(client)
+
+    def __enter__(self) -> "SMTPConnectionPool":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+
+def _default_send_callable(message: EmailMessage) -> str:
+    with SMTPConnectionPool.from_config(current_app.config, max_size=1) as pool:
+        return pool.send(message)
 
 
 def send_qsl_digest_email(
     *,
-    user: User,
-    batch: QSLDigestBatch,
+    op: str,
+    qsl_count: int,
     digest_url: str,
-    recipient_email: str | None = None,
+    recipient_email: str | None,
     send_callable=None,
 ) -> str:
-    to_email = (recipient_email or user.email or "").strip()
+    to_email = (recipient_email or "").strip()
     if not to_email:
         raise DigestEmailSendError("missing_recipient_email")
 
@@ -49,16 +182,16 @@ def send_qsl_digest_email(
     from_email = current_app.config.get("DIGEST_SMTP_FROM_EMAIL", "info@mobilelotw.org")
 
     msg = EmailMessage()
-    msg["Subject"] = f"Daily QSL Digest: {batch.qsl_count} new QSLs"
+    msg["Subject"] = f"Daily QSL Digest: {qsl_count} new QSLs"
     msg["From"] = from_email
     msg["To"] = to_email
     msg["Date"] = datetime.now(tz=timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
     msg.set_content(
         "\n".join(
             [
-                f"Hi {user.op},",
+                f"Hi {op},",
                 "",
-                f"You received {batch.qsl_count} new LoTW QSLs.",
+                f"You received {qsl_count} new LoTW QSLs.",
                 f"View your digest: {digest_url}",
                 "",
                 "73,",
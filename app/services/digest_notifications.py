@@ -1,19 +1,30 @@
-from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from time import perf_counter
 
 from flask import current_app
-from sqlalchemy import delete, exists, select
+from sqlalchemy import select
 
 from ..database.queries import (
     ensure_notification_preference,
     get_active_web_push_subscriptions,
     get_delivery_for_batch_channel,
+    get_pending_digest_batches,
+    set_digest_batch_dispatch_status,
 )
 from ..database.table_declarations import (
     NotificationDelivery,
     QSLDigestBatch,
 )
+from ..metrics import DIGEST_BATCHES_DISPATCHED, DIGEST_DISPATCH_SECONDS
 from .digest_email import send_qsl_digest_email
-from .web_push import send_qsl_digest_web_push
+from .web_push import (
+    WebPushDeliveryReport,
+    WebPushTarget,
+    qsl_digest_push_payload,
+    record_web_push_report,
+    send_qsl_digest_web_push,
+)
 
 
 def _digest_url(batch: QSLDigestBatch) -> str:
@@ -70,312 +81,290 @@ def _upsert_delivery(
     return delivery
 
 
-def dispatch_digest_notifications_for_batch(
-    *,
-    batch_id: int,
-    push_sender=None,
-    email_sender=None,
-) -> dict[str, str | int]:
-    with current_app.config.get("SESSION_MAKER").begin() as session_:
-        batch = session_.scalar(
-            select(QSLDigestBatch).where(QSLDigestBatch.id == batch_id)
-        )
-        if batch is None:
-            raise ValueError(f"Digest batch {batch_id} does not exist.")
-        user = batch.user
-        preference = ensure_notification_preference(user=user, session=session_)
-        recipient_email = _notification_recipient_email(
-            user=user,
-            preference=preference,
+@dataclass(frozen=True)
+class DigestDispatchPlan:
+    """Everything needed to deliver one digest batch without a session.
+
+    ``push_status``/``email_status`` are preset when the channel was already
+    settled while planning (sent earlier, or skipped and recorded).
+    """
+
+    batch_id: int
+    user_id: int
+    op: str
+    qsl_count: int
+    digest_url: str
+    recipient_email: str | None
+    fallback_to_email: bool
+    push_payload: dict
+    push_targets: tuple[WebPushTarget, ...] = ()
+    push_status: str | None = None
+    email_status: str | None = None
+    email_skip_reason: str | None = None
+
+
+def _skip_all_channels(*, batch: QSLDigestBatch, reason: str, session) -> None:
+    for channel in ("web_push", "email"):
+        _upsert_delivery(
+            user_id=batch.user_id,
+            digest_batch_id=batch.id,
+            channel=channel,
+            status="skipped",
+            session=session,
+            error_code=reason,
         )
-        digest_url = _digest_url(batch=batch)
-        digest_enabled = current_app.config.get("DIGEST_NOTIFICATIONS_ENABLED", True)
-        web_push_enabled = current_app.config.get("WEB_PUSH_ENABLED", True)
-        email_enabled = current_app.config.get("DIGEST_EMAIL_ENABLED", True)
-        dry_run = current_app.config.get("DIGEST_DRY_RUN", False)
-
-        if not digest_enabled:
-            _upsert_delivery(
-                user_id=user.id,
-                digest_batch_id=batch.id,
-                channel="web_push",
-                status="skipped",
-                session=session_,
-                error_code="digest_disabled",
-            )
-            _upsert_delivery(
-                user_id=user.id,
-                digest_batch_id=batch.id,
-                channel="email",
-                status="skipped",
-                session=session_,
-                error_code="digest_disabled",
-            )
-            return {
-                "batch_id": batch.id,
-                "push_status": "skipped",
-                "email_status": "skipped",
-            }
-
-        if batch.qsl_count <= 0:
-            _upsert_delivery(
-                user_id=user.id,
-                digest_batch_id=batch.id,
-                channel="web_push",
-                status="skipped",
-                session=session_,
-                error_code="empty_digest",
-            )
-            _upsert_delivery(
-                user_id=user.id,
-                digest_batch_id=batch.id,
-                channel="email",
-                status="skipped",
-                session=session_,
-                error_code="empty_digest",
-            )
-            return {
-                "batch_id": batch.id,
-                "push_status": "skipped",
-                "email_status": "skipped",
-            }
-
-        subscriptions = list(
-            get_active_web_push_subscriptions(user_id=user.id, session=session_)
+
+
+def plan_digest_dispatch(*, batch_id: int, session) -> DigestDispatchPlan:
+    """Load a batch, record the channels that are skipped outright and return
+    what is left to send."""
+    batch = session.scalar(select(QSLDigestBatch).where(QSLDigestBatch.id == batch_id))
+    if batch is None:
+        raise ValueError(f"Digest batch {batch_id} does not exist.")
+    user = batch.user
+    preference = ensure_notification_preference(user=user, session=session)
+    digest_url = _digest_url(batch=batch)
+    dry_run = current_app.config.get("DIGEST_DRY_RUN", False)
+
+    plan = DigestDispatchPlan(
+        batch_id=batch.id,
+        user_id=user.id,
+        op=user.op,
+        qsl_count=batch.qsl_count,
+        digest_url=digest_url,
+        recipient_email=_notification_recipient_email(user=user, preference=preference)
+        or (user.email or "").strip()
+        or None,
+        fallback_to_email=preference.fallback_to_email,
+        push_payload=qsl_digest_push_payload(
+            op=user.op,
+            qsl_count=batch.qsl_count,
+            digest_date=batch.digest_date,
+            digest_url=digest_url,
+        ),
+    )
+
+    if not current_app.config.get("DIGEST_NOTIFICATIONS_ENABLED", True):
+        _skip_all_channels(batch=batch, reason="digest_disabled", session=session)
+        return replace(plan, push_status="skipped", email_status="skipped")
+
+    if batch.qsl_count <= 0:
+        _skip_all_channels(batch=batch, reason="empty_digest", session=session)
+        set_digest_batch_dispatch_status(
+            digest_batch_id=batch.id, status="empty", session=session
         )
+        return replace(plan, push_status="skipped", email_status="skipped")
 
-        existing_push = get_delivery_for_batch_channel(
-            user_id=user.id,
-            digest_batch_id=batch.id,
-            channel="web_push",
-            session=session_,
+    existing_push = get_delivery_for_batch_channel(
+        user_id=user.id,
+        digest_batch_id=batch.id,
+        channel="web_push",
+        session=session,
+    )
+    push_skip_reason = None
+    if existing_push and existing_push.status == "sent":
+        set_digest_batch_dispatch_status(
+            digest_batch_id=batch.id, status="sent", session=session
         )
-        push_status = "skipped"
-        push_sent_count = 0
-        if existing_push and existing_push.status == "sent":
-            push_status = "sent"
-            push_sent_count = 1
-        elif not web_push_enabled:
-            push_status = "skipped"
-            _upsert_delivery(
-                user_id=user.id,
-                digest_batch_id=batch.id,
-                channel="web_push",
-                status="skipped",
-                session=session_,
-                error_code="web_push_disabled",
-            )
-        elif dry_run:
-            push_status = "skipped"
-            _upsert_delivery(
-                user_id=user.id,
-                digest_batch_id=batch.id,
-                channel="web_push",
-                status="skipped",
-                session=session_,
-                error_code="dry_run",
-            )
-        elif subscriptions:
-            report = send_qsl_digest_web_push(
-                user=user,
-                batch=batch,
-                subscriptions=subscriptions,
-                digest_url=digest_url,
-                send_callable=push_sender,
-            )
-            push_sent_count = report.sent
-            push_status = "sent" if report.sent > 0 else "failed"
-            _upsert_delivery(
-                user_id=user.id,
-                digest_batch_id=batch.id,
-                channel="web_push",
-                status=push_status,
-                session=session_,
-                error_code=None if report.sent > 0 else "push_failed",
-                error_detail=None
-                if report.sent > 0
-                else ",".join(report.errors[-3:]) or "no_push_success",
+        plan = replace(plan, push_status="sent")
+    elif not current_app.config.get("WEB_PUSH_ENABLED", True):
+        push_skip_reason = "web_push_disabled"
+    elif dry_run:
+        push_skip_reason = "dry_run"
+    else:
+        subscriptions = get_active_web_push_subscriptions(
+            user_id=user.id, session=session
+        )
+        if subscriptions:
+            plan = replace(
+                plan,
+                push_targets=tuple(
+                    WebPushTarget.from_subscription(subscription)
+                    for subscription in subscriptions
+                ),
             )
         else:
-            push_status = "skipped"
-            _upsert_delivery(
-                user_id=user.id,
-                digest_batch_id=batch.id,
-                channel="web_push",
-                status="skipped",
-                session=session_,
-                error_code="no_active_subscriptions",
-            )
+            push_skip_reason = "no_active_subscriptions"
 
-        email_needed = preference.fallback_to_email and push_sent_count == 0
-        existing_email = get_delivery_for_batch_channel(
+    if push_skip_reason:
+        _upsert_delivery(
             user_id=user.id,
             digest_batch_id=batch.id,
-            channel="email",
-            session=session_,
+            channel="web_push",
+            status="skipped",
+            session=session,
+            error_code=push_skip_reason,
         )
-        email_status = "skipped"
-        if existing_email and existing_email.status == "sent":
-            email_status = "sent"
-        elif not email_needed:
-            email_status = "skipped"
-            _upsert_delivery(
-                user_id=user.id,
-                digest_batch_id=batch.id,
-                channel="email",
-                status="skipped",
-                session=session_,
-                error_code="push_succeeded",
-            )
-        elif not email_enabled:
-            email_status = "skipped"
-            _upsert_delivery(
-                user_id=user.id,
-                digest_batch_id=batch.id,
-                channel="email",
-                status="skipped",
-                session=session_,
-                error_code="email_disabled",
-            )
-        elif dry_run:
-            email_status = "skipped"
-            _upsert_delivery(
-                user_id=user.id,
-                digest_batch_id=batch.id,
-                channel="email",
-                status="skipped",
-                session=session_,
-                error_code="dry_run",
-            )
-        elif email_needed:
-            try:
-                provider_message_id = send_qsl_digest_email(
-                    user=user,
-                    batch=batch,
-                    digest_url=digest_url,
-                    recipient_email=recipient_email,
-                    send_callable=email_sender,
-                )
-                email_status = "sent"
-                _upsert_delivery(
-                    user_id=user.id,
-                    digest_batch_id=batch.id,
-                    channel="email",
-                    status="sent",
-                    session=session_,
-                    provider_message_id=provider_message_id,
-                )
-            except Exception as error:  # noqa: BLE001
-                email_status = "failed"
-                _upsert_delivery(
-                    user_id=user.id,
-                    digest_batch_id=batch.id,
-                    channel="email",
-                    status="failed",
-                    session=session_,
-                    error_code="email_failed",
-                    error_detail=str(error),
-                )
-        result = {
-            "batch_id": batch.id,
-            "push_status": push_status,
-            "email_status": email_status,
-        }
-        current_app.logger.info(
-            "Digest dispatch summary op=%s batch=%s result=%s",
-            user.op,
-            batch.id,
-            result,
+        plan = replace(plan, push_status="skipped")
+
+    existing_email = get_delivery_for_batch_channel(
+        user_id=user.id,
+        digest_batch_id=batch.id,
+        channel="email",
+        session=session,
+    )
+    if existing_email and existing_email.status == "sent":
+        return replace(plan, email_status="sent")
+    if not current_app.config.get("DIGEST_EMAIL_ENABLED", True):
+        return replace(plan, email_skip_reason="email_disabled")
+    if dry_run:
+        return replace(plan, email_skip_reason="dry_run")
+    return plan
+
+
+def record_push_result(
+    *,
+    plan: DigestDispatchPlan,
+    report: WebPushDeliveryReport,
+    session,
+) -> str:
+    record_web_push_report(report=report, session=session)
+    push_status = "sent" if report.sent > 0 else "failed"
+    _upsert_delivery(
+        user_id=plan.user_id,
+        digest_batch_id=plan.batch_id,
+        channel="web_push",
+        status=push_status,
+        session=session,
+        error_code=None if report.sent > 0 else "push_failed",
+        error_detail=None
+        if report.sent > 0
+        else ",".join(report.errors[-3:]) or "no_push_success",
+    )
+    if push_status == "sent":
+        set_digest_batch_dispatch_status(
+            digest_batch_id=plan.batch_id, status="sent", session=session
         )
-        return result
+    return push_status
 
 
-def purge_old_digest_data(*, retention_days: int) -> dict[str, int]:
-    if retention_days <= 0:
-        return {"deleted_batches": 0, "deleted_deliveries": 0}
+def email_skip_reason(*, plan: DigestDispatchPlan, push_status: str) -> str | None:
+    """Why the email fallback is not sent for this batch, or ``None``."""
+    if not plan.fallback_to_email or push_status == "sent":
+        return "push_succeeded"
+    return plan.email_skip_reason
 
-    cutoff_date = (datetime.now(tz=timezone.utc) - timedelta(days=retention_days)).date()
-    cutoff_dt = datetime.now(tz=timezone.utc) - timedelta(days=retention_days)
 
-    with current_app.config.get("SESSION_MAKER").begin() as session_:
-        old_batch_ids = select(QSLDigestBatch.id).where(
-            QSLDigestBatch.digest_date < cutoff_date
+def send_planned_email(*, plan: DigestDispatchPlan, email_sender=None) -> tuple[str, dict]:
+    """Send the fallback email. Returns (status, delivery fields)."""
+    try:
+        provider_message_id = send_qsl_digest_email(
+            op=plan.op,
+            qsl_count=plan.qsl_count,
+            digest_url=plan.digest_url,
+            recipient_email=plan.recipient_email,
+            send_callable=email_sender,
         )
-        deleted_deliveries_for_batches = session_.execute(
-            delete(NotificationDelivery).where(
-                NotificationDelivery.digest_batch_id.in_(old_batch_ids)
-            )
+    except Exception as error:  # noqa: BLE001
+        return "failed", {"error_code": "email_failed", "error_detail": str(error)}
+    return "sent", {"provider_message_id": provider_message_id}
+
+
+def record_email_result(
+    *,
+    plan: DigestDispatchPlan,
+    status: str,
+    session,
+    **delivery_fields,
+) -> None:
+    _upsert_delivery(
+        user_id=plan.user_id,
+        digest_batch_id=plan.batch_id,
+        channel="email",
+        status=status,
+        session=session,
+        **delivery_fields,
+    )
+    if status == "sent":
+        set_digest_batch_dispatch_status(
+            digest_batch_id=plan.batch_id, status="sent", session=session
         )
-        deleted_batches = session_.execute(
-            delete(QSLDigestBatch).where(QSLDigestBatch.digest_date < cutoff_date)
+
+
+def dispatch_digest_notifications_for_batch(
+    *,
+    batch_id: int,
+    push_sender=None,
+    email_sender=None,
+) -> dict[str, str | int]:
+    session_maker = current_app.config.get("SESSION_MAKER")
+    with session_maker.begin() as session_:
+        plan = plan_digest_dispatch(batch_id=batch_id, session=session_)
+
+    push_status = plan.push_status
+    if push_status is None:
+        report = send_qsl_digest_web_push(
+            targets=plan.push_targets,
+            payload=plan.push_payload,
+            send_callable=push_sender,
         )
-        deleted_standalone_deliveries = session_.execute(
-            delete(NotificationDelivery).where(
-                NotificationDelivery.digest_batch_id.is_(None),
-                NotificationDelivery.created_at < cutoff_dt,
+        with session_maker.begin() as session_:
+            push_status = record_push_result(plan=plan, report=report, session=session_)
+
+    email_status = plan.email_status
+    if email_status is None:
+        skip_reason = email_skip_reason(plan=plan, push_status=push_status)
+        if skip_reason:
+            email_status, delivery_fields = "skipped", {"error_code": skip_reason}
+        else:
+            email_status, delivery_fields = send_planned_email(
+                plan=plan, email_sender=email_sender
+            )
+        with session_maker.begin() as session_:
+            record_email_result(
+                plan=plan, status=email_status, session=session_, **delivery_fields
             )
-        )
 
-    deleted_deliveries = (
-        (deleted_deliveries_for_batches.rowcount or 0)
-        + (deleted_standalone_deliveries.rowcount or 0)
-    )
-    deleted_batch_count = deleted_batches.rowcount or 0
-    if deleted_batch_count or deleted_deliveries:
-        current_app.logger.info(
-            "Digest cleanup removed %s batches and %s deliveries (retention_days=%s)",
-            deleted_batch_count,
-            deleted_deliveries,
-            retention_days,
-        )
-    return {
-        "deleted_batches": deleted_batch_count,
-        "deleted_deliveries": deleted_deliveries,
+    result = {
+        "batch_id": plan.batch_id,
+        "push_status": push_status,
+        "email_status": email_status,
     }
+    current_app.logger.info(
+        "Digest dispatch summary op=%s batch=%s result=%s",
+        plan.op,
+        plan.batch_id,
+        result,
+    )
+    return result
+
 
+def dispatch_pending_digest_notifications(
+    *,
+    limit: int = 100,
+    push_sender=None,
+    email_sender=None,
+) -> dict[str, int]:
+    """Claim up to ``limit`` pending batches and deliver them concurrently."""
+    from .digest_dispatch import DigestDispatcher, claim_digest_batches
 
-def dispatch_pending_digest_notifications(*, limit: int = 100) -> dict[str, int]:
     if not current_app.config.get("DIGEST_NOTIFICATIONS_ENABLED", True):
         current_app.logger.info("Digest dispatch skipped: DIGEST_NOTIFICATIONS_ENABLED=0")
         return {"processed": 0, "sent": 0, "failed": 0, "skipped": 0}
 
-    retention_days = int(current_app.config.get("DIGEST_RETENTION_DAYS", 90) or 0)
-    purge_old_digest_data(retention_days=retention_days)
-
+    started = perf_counter()
     with current_app.config.get("SESSION_MAKER").begin() as session_:
-        sent_delivery_exists = exists(
-            select(NotificationDelivery.id).where(
-                NotificationDelivery.digest_batch_id == QSLDigestBatch.id,
-                NotificationDelivery.status == "sent",
-            )
-        )
-        batch_ids = list(
-            session_.scalars(
-                select(QSLDigestBatch.id)
-                .where(QSLDigestBatch.qsl_count > 0)
-                .where(~sent_delivery_exists)
-                .order_by(QSLDigestBatch.generated_at.asc())
-                .limit(limit)
-            )
-        )
+        pending = get_pending_digest_batches(limit=limit, session=session_)
+
+    batch_ids = claim_digest_batches(batches=pending)
+    results = DigestDispatcher(
+        push_sender=push_sender,
+        email_sender=email_sender,
+    ).dispatch(batch_ids)
 
     sent = 0
     failed = 0
     skipped = 0
-    for batch_id in batch_ids:
-        try:
-            result = dispatch_digest_notifications_for_batch(batch_id=batch_id)
-            if result["push_status"] == "sent" or result["email_status"] == "sent":
-                sent += 1
-            elif result["push_status"] == "failed" and result["email_status"] == "failed":
-                failed += 1
-            else:
-                skipped += 1
-        except Exception:  # noqa: BLE001
-            current_app.logger.exception(
-                "Failed to dispatch notifications for digest batch %s", batch_id
-            )
+    for result in results:
+        if result["push_status"] == "sent" or result["email_status"] == "sent":
+            sent += 1
+        elif result["push_status"] in {"failed", "error"} and result["email_status"] in {
+            "failed",
+            "error",
+        }:
             failed += 1
+        else:
+            skipped += 1
 
     result = {
         "processed": len(batch_ids),
@@ -383,5 +372,9 @@ def dispatch_pending_digest_notifications(*, limit: int = 100) -> dict[str, int]
         "failed": failed,
         "skipped": skipped,
     }
+    for outcome in ("sent", "failed", "skipped"):
+        if result[outcome]:
+            DIGEST_BATCHES_DISPATCHED.inc(result[outcome], outcome=outcome)
+    DIGEST_DISPATCH_SECONDS.observe(perf_counter() - started)
     current_app.logger.info("Digest pending dispatch summary: %s", result)
     return result
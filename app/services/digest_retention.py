@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+
+from flask import current_app
+from sqlalchemy import delete, select
+
+from ..database.table_declarations import NotificationDelivery, QSLDigestBatch
+
+
+def _purge_batches(*, cutoff_date, chunk_size: int) -> tuple[int, int]:
+    """Delete expired batches and their deliveries, one id range per
+    transaction. Returns (batches, deliveries) deleted."""
+    session_maker = current_app.config.get("SESSION_MAKER")
+    deleted_batches = 0
+    deleted_deliveries = 0
+    after_id = 0
+
+    while True:
+        with session_maker.begin() as session_:
+            batch_ids = list(
+                session_.scalars(
+                    select(QSLDigestBatch.id)
+                    .where(
+                        QSLDigestBatch.digest_date < cutoff_date,
+                        QSLDigestBatch.id > after_id,
+                    )
+                    .order_by(QSLDigestBatch.id.asc())
+                    .limit(chunk_size)
+                )
+            )
+            if not batch_ids:
+                break
+
+            deleted_deliveries += (
+                session_.execute(
+                    delete(NotificationDelivery).where(
+                        NotificationDelivery.digest_batch_id.in_(batch_ids)
+                    )
+                ).rowcount
+                or 0
+            )
+            deleted_batches += (
+                session_.execute(
+                    delete(QSLDigestBatch).where(
+                        QSLDigestBatch.id >= batch_ids[0],
+                        QSLDigestBatch.id <= batch_ids[-1],
+                        QSLDigestBatch.digest_date < cutoff_date,
+                    )
+                ).rowcount
+                or 0
+            )
+        after_id = batch_ids[-1]
+
+    return deleted_batches, deleted_deliveries
+
+
+def _purge_standalone_deliveries(*, cutoff_at: datetime, chunk_size: int) -> int:
+    """Delete expired deliveries that belong to no batch, one id range per
+    transaction."""
+    session_maker = current_app.config.get("SESSION_MAKER")
+    deleted = 0
+    after_id = 0
+
+    while True:
+        with session_maker.begin() as session_:
+            delivery_ids = list(
+                session_.scalars(
+                    select(NotificationDelivery.id)
+                    .where(
+                        NotificationDelivery.digest_batch_id.is_(None),
+                        NotificationDelivery.created_at < cutoff_at,
+                        NotificationDelivery.id > after_id,
+                    )
+                    .order_by(NotificationDelivery.id.asc())
+                    .limit(chunk_size)
+                )
+            )
+            if not delivery_ids:
+                break
+
+            deleted += (
+                session_.execute(
+                    delete(NotificationDelivery).where(
+                        NotificationDelivery.id >= delivery_ids[0],
+                        NotificationDelivery.id <= delivery_ids[-1],
+                        NotificationDelivery.digest_batch_id.is_(None),
+                        NotificationDelivery.created_at < cutoff_at,
+                    )
+                ).rowcount
+                or 0
+            )
+        after_id = delivery_ids[-1]
+
+    return deleted
+
+
+def run_digest_retention(
+    *,
+    retention_days: int | None = None,
+    chunk_size: int | None = None,
+    now_utc: datetime | None = None,
+) -> dict[str, int | float]:
+    """Delete digest batches and deliveries older than the retention window.
+
+    Rows are removed in primary-key ordered chunks of ``chunk_size``
+    (``DIGEST_RETENTION_CHUNK_SIZE``), each in its own short transaction, so
+    the purge never holds long locks. Meant to run on its own schedule
+    (``scripts/run_digest_retention.py``), not on every dispatch.
+    """
+    if retention_days is None:
+        retention_days = int(current_app.config.get("DIGEST_RETENTION_DAYS", 90) or 0)
+    if retention_days <= 0:
+        return {
+            "deleted_batches": 0,
+            "deleted_deliveries": 0,
+            "elapsed_seconds": 0.0,
+            "rows_per_second": 0.0,
+        }
+    chunk_size = max(
+        1, chunk_size or current_app.config.get("DIGEST_RETENTION_CHUNK_SIZE", 1000)
+    )
+
+    now = now_utc or datetime.now(tz=timezone.utc)
+    cutoff_at = now - timedelta(days=retention_days)
+
+    started = perf_counter()
+    deleted_batches, deleted_batch_deliveries = _purge_batches(
+        cutoff_date=cutoff_at.date(),
+        chunk_size=chunk_size,
+    )
+    deleted_deliveries = deleted_batch_deliveries + _purge_standalone_deliveries(
+        cutoff_at=cutoff_at,
+        chunk_size=chunk_size,
+    )
+    elapsed = perf_counter() - started
+    deleted_rows = deleted_batches + deleted_deliveries
+
+    result = {
+        "deleted_batches": deleted_batches,
+        "deleted_deliveries": deleted_deliveries,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(deleted_rows / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    current_app.logger.info(
+        "Digest retention (retention_days=%s, chunk_size=%s): %s",
+        retention_days,
+        chunk_size,
+        result,
+    )
+    return result
@@ -1,17 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import date, datetime, time, timedelta, timezone
+from time import perf_counter
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from flask import current_app
 from sqlalchemy.orm import Session
 
 from ..database.queries import (
-    ensure_notification_preference,
-    get_digest_batch,
+    get_due_digest_user_ids,
     get_enabled_digest_users,
-    get_qsls_for_digest_window,
+    get_qsls_for_digest_windows,
+    upsert_digest_batches,
 )
-from ..database.table_declarations import QSLDigestBatch, User
+from ..database.table_declarations import User
+from ..metrics import DIGEST_GENERATION_SECONDS
 from .digest_eligibility import evaluate_digest_eligibility
 
 
@@ -94,106 +97,266 @@ def compute_digest_schedule(
     )
 
 
-def _upsert_digest_batch(
+def compute_next_digest_due_at(
     *,
-    user: User,
-    schedule: DigestSchedule,
+    after_utc: datetime,
+    timezone_name: str | None,
+    digest_time_local: time,
+) -> datetime:
+    """First scheduled digest time strictly after ``after_utc``, in UTC."""
+    tz = _resolve_timezone(timezone_name)
+    local_after = after_utc.astimezone(tz=tz)
+    scheduled = datetime.combine(local_after.date(), digest_time_local, tzinfo=tz)
+    if scheduled <= local_after:
+        scheduled = datetime.combine(
+            local_after.date() + timedelta(days=1),
+            digest_time_local,
+            tzinfo=tz,
+        )
+    return scheduled.astimezone(timezone.utc)
+
+
+def _build_digest_batches(
+    *,
+    schedules: dict[int, DigestSchedule],
     session: Session,
-) -> tuple[QSLDigestBatch, bool]:
-    existing = get_digest_batch(
-        user_id=user.id,
-        digest_date=schedule.digest_date,
+) -> tuple[int, int]:
+    """Build and upsert the digest batches for many users at once.
+
+    QSLs for every window come from one query and batches are written with
+    one INSERT .. ON CONFLICT. Returns (created, updated).
+    """
+    if not schedules:
+        return 0, 0
+
+    rows_by_user: dict[int, list] = {user_id: [] for user_id in schedules}
+    for row in get_qsls_for_digest_windows(
+        windows=[
+            (user_id, schedule.window_start_utc, schedule.window_end_utc)
+            for user_id, schedule in schedules.items()
+        ],
         session=session,
-    )
-    qso_rows = get_qsls_for_digest_window(
-        user_id=user.id,
-        window_start_utc=schedule.window_start_utc,
-        window_end_utc=schedule.window_end_utc,
+    ):
+        rows_by_user[row.user_id].append(row)
+
+    generated_at = datetime.now(tz=timezone.utc)
+    existing = upsert_digest_batches(
+        batches=[
+            {
+                "user_id": user_id,
+                "digest_date": schedule.digest_date,
+                "window_start_utc": schedule.window_start_utc,
+                "window_end_utc": schedule.window_end_utc,
+                "qsl_count": len(rows_by_user[user_id]),
+                "payload_json": _digest_payload(batch=rows_by_user[user_id]),
+                "generated_at": generated_at,
+            }
+            for user_id, schedule in schedules.items()
+        ],
         session=session,
     )
-    payload = _digest_payload(batch=list(qso_rows))
-
-    if existing:
-        existing.window_start_utc = schedule.window_start_utc
-        existing.window_end_utc = schedule.window_end_utc
-        existing.qsl_count = len(qso_rows)
-        existing.payload_json = payload
-        existing.generated_at = datetime.now(tz=timezone.utc)
-        return existing, False
-
-    created = QSLDigestBatch(
-        user_id=user.id,
-        digest_date=schedule.digest_date,
-        window_start_utc=schedule.window_start_utc,
-        window_end_utc=schedule.window_end_utc,
-        qsl_count=len(qso_rows),
-        payload_json=payload,
+    updated = sum(
+        1
+        for user_id, schedule in schedules.items()
+        if (user_id, schedule.digest_date) in existing
     )
-    session.add(created)
-    return created, True
+    return len(schedules) - updated, updated
+
+
+def _schedule_digest_for_user(
+    *,
+    user: User,
+    now: datetime,
+) -> DigestSchedule | None:
+    """Decide whether a user's digest should be built now.
+
+    Refreshes ``next_digest_due_at`` and returns the schedule to build, or
+    ``None`` when the user is skipped.
+    """
+    preference = user.notification_preference
+    eligibility = evaluate_digest_eligibility(
+        user=user,
+        preference=preference,
+        now_utc=now,
+    )
+    if preference is None:
+        return None
+
+    next_scheduled_at = compute_next_digest_due_at(
+        after_utc=now,
+        timezone_name=user.timezone,
+        digest_time_local=preference.qsl_digest_time_local,
+    )
+    if not eligibility.eligible:
+        current_app.logger.info(
+            "Skipping digest generation for %s: %s",
+            user.op,
+            eligibility.reason,
+        )
+        preference.next_digest_due_at = eligibility.retry_at or next_scheduled_at
+        return None
+
+    schedule = compute_digest_schedule(
+        now_utc=now,
+        timezone_name=user.timezone,
+        digest_time_local=preference.qsl_digest_time_local,
+        last_digest_cursor_at=preference.last_digest_cursor_at,
+    )
+    if now < schedule.window_end_utc:
+        preference.next_digest_due_at = schedule.window_end_utc
+        return None
+
+    preference.last_digest_cursor_at = schedule.window_end_utc
+    preference.next_digest_due_at = next_scheduled_at
+    return schedule
+
+
+def _run_digest_shard(
+    *,
+    shard_index: int,
+    shard_count: int,
+    now: datetime,
+    chunk_size: int,
+    user_ids: list[int] | None = None,
+) -> dict[str, int | float]:
+    """Walk one shard in id order, committing after every chunk of users.
+    ``user_ids``, when given, is the shard's share of a capped run."""
+    started = perf_counter()
+    counts = {"created": 0, "updated": 0, "skipped": 0}
+    users_seen = 0
+    chunks = 0
+    after_id = None
+
+    while user_ids is None or user_ids:
+        with current_app.config.get("SESSION_MAKER").begin() as session_:
+            users = get_enabled_digest_users(
+                session=session_,
+                shard_count=shard_count,
+                shard_index=shard_index,
+                after_id=after_id,
+                limit=chunk_size,
+                due_at=now,
+                user_ids=user_ids,
+            )
+            schedules: dict[int, DigestSchedule] = {}
+            for user in users:
+                schedule = _schedule_digest_for_user(user=user, now=now)
+                if schedule is None:
+                    counts["skipped"] += 1
+                else:
+                    schedules[user.id] = schedule
+
+            created, updated = _build_digest_batches(
+                schedules=schedules,
+                session=session_,
+            )
+            counts["created"] += created
+            counts["updated"] += updated
+            fetched = len(users)
+            if fetched:
+                after_id = users[-1].id
+
+        if not fetched:
+            break
+        chunks += 1
+        users_seen += fetched
+        if fetched < chunk_size:
+            break
+
+    return {
+        "shard": shard_index,
+        "users": users_seen,
+        "chunks": chunks,
+        **counts,
+        "elapsed_seconds": round(perf_counter() - started, 3),
+    }
+
+
+def _run_digest_shard_in_app(app, **kwargs) -> dict[str, int | float]:
+    with app.app_context():
+        return _run_digest_shard(**kwargs)
 
 
 def run_due_qsl_digest_generation(
     *,
     now_utc: datetime | None = None,
     limit: int | None = None,
-) -> dict[str, int]:
+    shard_count: int | None = None,
+) -> dict[str, object]:
+    """Generate due digest batches.
+
+    Users are partitioned into ``shard_count`` shards by ``id % shard_count``
+    and shards run in parallel (up to ``DIGEST_GENERATION_MAX_WORKERS``).
+    Each shard commits every ``DIGEST_GENERATION_CHUNK_SIZE`` users so no
+    transaction spans the whole run. ``limit`` caps the users evaluated by the
+    whole run, across all shards: the longest-overdue users are picked once
+    up front and each shard gets its own share, so repeated capped runs work
+    through everyone who is due.
+    Only users whose ``next_digest_due_at`` has passed are loaded; the
+    value is refreshed for every user evaluated.
+    """
     if not current_app.config.get("DIGEST_NOTIFICATIONS_ENABLED", True):
         current_app.logger.info("Digest generation skipped: DIGEST_NOTIFICATIONS_ENABLED=0")
         return {"created": 0, "updated": 0, "skipped": 0}
 
+    started = perf_counter()
     now = now_utc or datetime.now(tz=timezone.utc)
-    created = 0
-    updated = 0
-    skipped = 0
-
-    with current_app.config.get("SESSION_MAKER").begin() as session_:
-        users = list(get_enabled_digest_users(session=session_))
-        if limit is not None:
-            users = users[:limit]
-
-        for user in users:
-            preference = ensure_notification_preference(user=user, session=session_)
-            eligibility = evaluate_digest_eligibility(
-                user=user,
-                preference=preference,
-                now_utc=now,
-            )
-            if not eligibility.eligible:
-                skipped += 1
-                current_app.logger.info(
-                    "Skipping digest generation for %s: %s",
-                    user.op,
-                    eligibility.reason,
-                )
-                continue
-
-            schedule = compute_digest_schedule(
-                now_utc=now,
-                timezone_name=user.timezone,
-                digest_time_local=preference.qsl_digest_time_local,
-                last_digest_cursor_at=preference.last_digest_cursor_at,
-            )
-            if now < schedule.window_end_utc:
-                skipped += 1
-                continue
+    shard_count = max(
+        1,
+        shard_count or current_app.config.get("DIGEST_GENERATION_SHARDS", 1),
+    )
+    shard_kwargs = {
+        "shard_count": shard_count,
+        "now": now,
+        "chunk_size": max(1, current_app.config.get("DIGEST_GENERATION_CHUNK_SIZE", 500)),
+    }
+    shard_user_ids: list[list[int] | None] = [None] * shard_count
+    if limit is not None:
+        with current_app.config.get("SESSION_MAKER").begin() as session_:
+            due_ids = get_due_digest_user_ids(session=session_, due_at=now, limit=limit)
+        shard_user_ids = [
+            sorted(user_id for user_id in due_ids if user_id % shard_count == shard_index)
+            for shard_index in range(shard_count)
+        ]
 
-            _, was_created = _upsert_digest_batch(
-                user=user,
-                schedule=schedule,
-                session=session_,
-            )
-            preference.last_digest_cursor_at = schedule.window_end_utc
+    if shard_count == 1:
+        shards = [
+            _run_digest_shard(shard_index=0, user_ids=shard_user_ids[0], **shard_kwargs)
+        ]
+    else:
+        app = current_app._get_current_object()
+        max_workers = min(
+            shard_count,
+            max(1, current_app.config.get("DIGEST_GENERATION_MAX_WORKERS", 4)),
+        )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    _run_digest_shard_in_app,
+                    app,
+                    shard_index=shard_index,
+                    user_ids=shard_user_ids[shard_index],
+                    **shard_kwargs,
+                )
+                for shard_index in range(shard_count)
+            ]
+            shards = [future.result() for future in futures]
 
-            if was_created:
-                created += 1
-            else:
-                updated += 1
+    for shard in shards:
+        current_app.logger.info("Digest generation shard summary: %s", shard)
 
     result = {
-        "created": created,
-        "updated": updated,
-        "skipped": skipped,
+        "created": sum(shard["created"] for shard in shards),
+        "updated": sum(shard["updated"] for shard in shards),
+        "skipped": sum(shard["skipped"] for shard in shards),
+        "shards": shards,
     }
-    current_app.logger.info("Digest generation summary: %s", result)
+    current_app.logger.info(
+        "Digest generation summary: created=%s updated=%s skipped=%s shards=%s",
+        result["created"],
+        result["updated"],
+        result["skipped"],
+        shard_count,
+    )
+    DIGEST_GENERATION_SECONDS.observe(perf_counter() - started)
     return result
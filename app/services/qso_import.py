@@ -1,8 +1,12 @@
-from datetime import datetime, timezone
-from io import BytesIO
+from datetime import date, datetime, timedelta, timezone
 from itertools import batched
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+from urllib.parse import quote_plus
 
 from adi_parser import parse_adi
+from adi_parser.dataclasses import Header
 from adi_parser.dataclasses import QSOReport as DCQSOReport
 from flask import current_app
 from sqlalchemy.orm import Session
@@ -11,13 +15,29 @@ from .. import lotw
 from ..database.queries import (
     get_qso_reports_by_timestamps,
     get_user,
+    qso_report_key,
 )
 from ..database.table_declarations import QSOReport
-from ..urls import QSOS_URL
+from ..metrics import (
+    ADIF_DOWNLOAD_BYTES,
+    ADIF_PARSE_SECONDS,
+    QSO_IMPORT_ROWS_PER_SECOND,
+    QSO_IMPORTS,
+)
+from ..urls import QSOS_RECEIVED_URL, QSOS_URL
+from . import adif_spool
+
+
+# Called with the fields of the sync phase reached; see import_qsos_for_user.
+type ImportProgress = Callable[..., None]
+
+
+def _ignore_progress(**_fields) -> None:
+    pass
 
 
 def _report_key(qso_report: DCQSOReport) -> tuple[datetime | None, str | None]:
-    return (qso_report.app_lotw_qso_timestamp, qso_report.call)
+    return qso_report_key(qso_report.app_lotw_qso_timestamp, qso_report.call)
 
 
 def _prefer_incoming_report(existing: DCQSOReport, incoming: DCQSOReport) -> bool:
@@ -32,6 +52,146 @@ def _prefer_incoming_report(existing: DCQSOReport, incoming: DCQSOReport) -> boo
     return incoming_score > existing_score
 
 
+def _as_utc(value: datetime) -> datetime:
+    """LoTW timestamps are UTC, but the database hands them back naive."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _since(*, cursor: datetime | None, last_update: date) -> str:
+    """A ``qso_qslsince``/``qso_qsorxsince`` argument for the next import.
+
+    Resumes from the cursor less ``QSO_SYNC_CURSOR_OVERLAP_SECONDS``; records
+    seen twice match their stored rows by ``qso_report_key`` in
+    ``_add_reports_to_db`` and update them in place. Users last synced
+    before the cursor existed start from the day of their last import.
+    """
+    if cursor is None:
+        return last_update.strftime("%Y-%m-%d")
+    overlap = timedelta(
+        seconds=current_app.config.get("QSO_SYNC_CURSOR_OVERLAP_SECONDS", 300)
+    )
+    return quote_plus((_as_utc(cursor) - overlap).strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def _advance_cursor(cursor: datetime | None, seen: list[datetime | None]) -> datetime | None:
+    """The latest of ``seen`` and ``cursor``: a cursor never moves backwards."""
+    candidates = [value for value in seen if value is not None]
+    if cursor is not None:
+        candidates.append(cursor)
+    return max((_as_utc(value) for value in candidates), default=None)
+
+
+def _download_report(
+    *, url: str, op: str, user_id: int, stream: str, on_progress: ImportProgress
+) -> Path:
+    """Spool the report at ``url``. A report this user downloaded recently,
+    for an import that then failed, is reused instead of fetched again."""
+    on_progress(phase="downloading", stream=stream, bytes=0, bytes_total=None)
+    path = adif_spool.recall(user_id=user_id, url=url)
+    if path is not None:
+        current_app.logger.info("Reusing spooled LoTW report %s for %s", path.name, op)
+        return path
+
+    response = lotw.get(
+        url=url,
+        op=op,
+        on_progress=lambda received, total: on_progress(
+            phase="downloading", stream=stream, bytes=received, bytes_total=total
+        ),
+    )
+
+    ADIF_DOWNLOAD_BYTES.observe(len(response.content))
+    path = adif_spool.store(response.content)
+    adif_spool.remember(user_id=user_id, url=url, path=path)
+    return path
+
+
+def _parse_report(
+    path: Path, *, stream: str, on_progress: ImportProgress
+) -> tuple[Header, list[DCQSOReport]]:
+    on_progress(phase="parsing", stream=stream)
+    with ADIF_PARSE_SECONDS.time(), adif_spool.open_payload(path) as payload:
+        return parse_adi(file=payload)
+
+
+def _save_import_progress(op: str, **fields) -> None:
+    with current_app.config.get("SESSION_MAKER").begin() as session_:
+        user = get_user(op=op, session=session_)
+        for name, value in fields.items():
+            setattr(user, name, value)
+
+
+def _checkpointed_first_import(
+    *,
+    op: str,
+    user_id: int,
+    url: str,
+    spool_path: str | None,
+    progress: int,
+    on_progress: ImportProgress,
+) -> tuple[list[DCQSOReport], int]:
+    """Write a user's whole log in checkpoints that survive a failed attempt.
+
+    The report is spooled to disk before anything is written, and every
+    ``QSO_IMPORT_CHECKPOINT_ROWS`` records are committed together with the
+    offset reached (``users.qso_sync_progress``). A retry re-reads the same
+    spool file and carries on after the last checkpoint. Returns the
+    records and the number inserted.
+    """
+    spool = Path(spool_path) if spool_path else None
+    dedupe = False
+    if spool is None or not spool.exists():
+        if progress:
+            # Rows from the lost download are already committed; a new
+            # download may differ, so start over and match against them.
+            current_app.logger.warning(
+                "QSO import spool for %s is gone; restarting from the first record", op
+            )
+            dedupe = True
+            progress = 0
+        spool = _download_report(
+            url=url, op=op, user_id=user_id, stream="qsos", on_progress=on_progress
+        )
+        _save_import_progress(op, qso_import_spool=str(spool), qso_sync_progress=0)
+    else:
+        current_app.logger.info("Resuming %s's first import at record %s", op, progress)
+
+    _, qso_reports = _parse_report(spool, stream="qsos", on_progress=on_progress)
+    _save_import_progress(op, qso_sync_total=len(qso_reports))
+
+    checkpoint_rows = max(1, current_app.config.get("QSO_IMPORT_CHECKPOINT_ROWS", 5000))
+    inserted_total = 0
+    on_progress(
+        phase="writing", rows=progress, rows_total=len(qso_reports), inserted=0, updated=0
+    )
+    write_started = perf_counter()
+    for start in range(progress, len(qso_reports), checkpoint_rows):
+        checkpoint = qso_reports[start:start + checkpoint_rows]
+        with current_app.config.get("SESSION_MAKER").begin() as session_:
+            for qso_reports_subset in batched(checkpoint, 200):
+                inserted, _ = _add_reports_to_db(
+                    qso_reports=qso_reports_subset,
+                    user_id=user_id,
+                    has_imported=dedupe,
+                    session_=session_,
+                )
+                inserted_total += inserted
+            user = get_user(op=op, session=session_)
+            user.qso_sync_progress = start + len(checkpoint)
+            user.qsls_version += 1
+        on_progress(
+            phase="writing",
+            rows=start + len(checkpoint),
+            rows_total=len(qso_reports),
+            inserted=inserted_total,
+            updated=0,
+        )
+    write_seconds = perf_counter() - write_started
+    if len(qso_reports) > progress and write_seconds > 0:
+        QSO_IMPORT_ROWS_PER_SECOND.observe((len(qso_reports) - progress) / write_seconds)
+    return qso_reports, inserted_total
+
+
 def _set_qso_sync_state(
     op: str,
     status: str,
@@ -116,69 +276,151 @@ def _add_reports_to_db(
     return inserted, updated
 
 
-def import_qsos_for_user(op: str) -> dict[str, int]:
+def import_qsos_for_user(op: str, on_progress: ImportProgress | None = None) -> dict[str, int]:
+    """Bring ``op``'s QSOs up to date with LoTW.
+
+    ``on_progress`` is called as the import moves through its phases:
+    ``downloading`` (``stream``, ``bytes``, ``bytes_total``), ``parsing``
+    (``stream``), ``writing`` (``rows``, ``rows_total``, ``inserted``,
+    ``updated``), then ``done`` (the returned counts) or ``failed``
+    (``error``). ``stream`` is ``qsos`` or ``qsls``.
+    """
+    on_progress = on_progress or _ignore_progress
     _set_qso_sync_state(op, "syncing", started=True)
 
     try:
         user_op: str
-        qso_reports_last_update: datetime
+        qso_reports_last_update: date
+        qsl_cursor: datetime | None
+        qso_rx_cursor: datetime | None
         has_imported: bool
         user_id: int
+        spool_path: str | None
+        progress: int
 
         with current_app.config.get("SESSION_MAKER").begin() as session_:
             user = get_user(op=op, session=session_)
             user_op = user.op
             user_id = user.id
             qso_reports_last_update = user.qso_reports_last_update
+            qsl_cursor = user.qso_qsl_cursor
+            qso_rx_cursor = user.qso_rx_cursor
             has_imported = user.has_imported
+            spool_path = user.qso_import_spool
+            progress = user.qso_sync_progress or 0
 
         current_app.logger.info("Updating %s's QSOs", user_op)
 
-        url = QSOS_URL.format(qso_reports_last_update.strftime("%Y-%m-%d"))
-        current_app.logger.info("Getting %s's QSOs from LoTW", user_op)
-        response = lotw.get(url=url, op=op)
-
-        if "Page Request Limit!" in response.text:
-            raise RuntimeError("LoTW page request limit reached.")
-
-        current_app.logger.info("Got %s's QSOs from LoTW", user_op)
-        adi_file = BytesIO(response.content)
-
-        current_app.logger.info("Parsing %s's QSOs", user_op)
-        _, qso_reports = parse_adi(file=adi_file)
-        current_app.logger.info("Parsed %s QSOs for %s", len(qso_reports), user_op)
-
+        # New and changed QSOs, confirmed or not. On a first import this is
+        # the whole log, QSLs included, so the QSL stream is skipped.
+        qsos_url = QSOS_RECEIVED_URL.format(
+            _since(cursor=qso_rx_cursor, last_update=qso_reports_last_update)
+        )
+        last_qsl = None
         inserted_total = 0
         updated_total = 0
-        with current_app.config.get("SESSION_MAKER").begin() as session_:
-            for qso_reports_subset in batched(qso_reports, 200):
-                inserted, updated = _add_reports_to_db(
-                    qso_reports=qso_reports_subset,
+        if not has_imported:
+            current_app.logger.info("Getting %s's QSOs from LoTW", user_op)
+            qso_reports, inserted_total = _checkpointed_first_import(
+                op=op,
+                user_id=user_id,
+                url=qsos_url,
+                spool_path=spool_path,
+                progress=progress,
+                on_progress=on_progress,
+            )
+        else:
+            current_app.logger.info("Getting %s's new QSOs from LoTW", user_op)
+            _, qso_reports = _parse_report(
+                _download_report(
+                    url=qsos_url,
+                    op=op,
                     user_id=user_id,
-                    has_imported=has_imported,
-                    session_=session_,
-                )
-                inserted_total += inserted
-                updated_total += updated
+                    stream="qsos",
+                    on_progress=on_progress,
+                ),
+                stream="qsos",
+                on_progress=on_progress,
+            )
+            current_app.logger.info("Getting %s's new QSLs from LoTW", user_op)
+            header, qsl_reports = _parse_report(
+                _download_report(
+                    url=QSOS_URL.format(
+                        _since(cursor=qsl_cursor, last_update=qso_reports_last_update)
+                    ),
+                    op=op,
+                    user_id=user_id,
+                    stream="qsls",
+                    on_progress=on_progress,
+                ),
+                stream="qsls",
+                on_progress=on_progress,
+            )
+            last_qsl = header.app_lotw_lastqsl
+            qso_reports += qsl_reports
+        current_app.logger.info("Got %s QSO records for %s", len(qso_reports), user_op)
+
+        write_started = perf_counter()
+        written = 0
+        with current_app.config.get("SESSION_MAKER").begin() as session_:
+            if has_imported:
+                for qso_reports_subset in batched(qso_reports, 200):
+                    inserted, updated = _add_reports_to_db(
+                        qso_reports=qso_reports_subset,
+                        user_id=user_id,
+                        has_imported=has_imported,
+                        session_=session_,
+                    )
+                    inserted_total += inserted
+                    updated_total += updated
+                    written += len(qso_reports_subset)
+                    on_progress(
+                        phase="writing",
+                        rows=written,
+                        rows_total=len(qso_reports),
+                        inserted=inserted_total,
+                        updated=updated_total,
+                    )
 
             user = get_user(op=op, session=session_)
             now = datetime.now(tz=timezone.utc)
             user.qso_reports_last_update = now.date()
             user.qso_reports_last_update_time = now
+            user.qso_qsl_cursor = _advance_cursor(
+                qsl_cursor,
+                [last_qsl, *(report.app_lotw_rxqsl for report in qso_reports)],
+            )
+            user.qso_rx_cursor = _advance_cursor(
+                qso_rx_cursor,
+                [report.app_lotw_rxqso for report in qso_reports],
+            )
+            user.qso_sync_progress = len(qso_reports)
+            user.qso_sync_total = len(qso_reports)
+            user.qso_import_spool = None
             user.has_imported = True
+            user.qsls_version += 1
+        adif_spool.forget(user_id)
+        write_seconds = perf_counter() - write_started
+        if has_imported and qso_reports and write_seconds > 0:
+            QSO_IMPORT_ROWS_PER_SECOND.observe(len(qso_reports) / write_seconds)
 
         _set_qso_sync_state(op, "idle", finished=True)
+        QSO_IMPORTS.inc(outcome="ok")
         current_app.logger.info("Done updating QSOs for %s", user_op)
-        return {
+        result = {
             "fetched": len(qso_reports),
             "inserted": inserted_total,
             "updated": updated_total,
         }
+        on_progress(phase="done", **result)
+        return result
     except Exception as error:
+        QSO_IMPORTS.inc(outcome="failed")
         _set_qso_sync_state(
             op,
             "failed",
             error=str(error),
             finished=True,
         )
+        on_progress(phase="failed", error=str(error))
         raise
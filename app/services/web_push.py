@@ -1,10 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
 import json
+import os
 from dataclasses import dataclass, field
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
+from threading import Lock
+import time
+from typing import Sequence
+from urllib.parse import urlsplit
 
 from flask import current_app
+from sqlalchemy import case, func, null, update
+from sqlalchemy.orm import Session
 
-from ..database.table_declarations import QSLDigestBatch, User, WebPushSubscription
+from ..database.table_declarations import WebPushSubscription
+from ..rate_limit import KeyedRateLimiter
 
 
 class WebPushPermanentError(RuntimeError):
@@ -15,88 +24,321 @@ class WebPushTemporaryError(RuntimeError):
     pass
 
 
+@dataclass(frozen=True)
+class WebPushTarget:
+    """The parts of a WebPushSubscription needed to send to it, safe to hand
+    to worker threads outside the session."""
+
+    id: int
+    endpoint: str
+    p256dh_key: str
+    auth_key: str
+
+    @classmethod
+    def from_subscription(cls, subscription: WebPushSubscription) -> "WebPushTarget":
+        return cls(
+            id=subscription.id,
+            endpoint=subscription.endpoint,
+            p256dh_key=subscription.p256dh_key,
+            auth_key=subscription.auth_key,
+        )
+
+
 @dataclass
 class WebPushDeliveryReport:
     attempted: int = 0
     sent: int = 0
     failed: int = 0
     errors: list[str] = field(default_factory=list)
+    succeeded_ids: list[int] = field(default_factory=list)
+    failed_ids: list[int] = field(default_factory=list)
+    invalid_ids: list[int] = field(default_factory=list)
 
 
-def _default_send_callable(subscription: WebPushSubscription, payload: dict) -> None:
-    try:
-        from pywebpush import WebPushException, webpush  # type: ignore
-    except ImportError as error:
-        raise WebPushTemporaryError("pywebpush_not_installed") from error
-
-    vapid_private_key = current_app.config.get("WEB_PUSH_VAPID_PRIVATE_KEY")
-    vapid_subject = current_app.config.get("WEB_PUSH_VAPID_SUBJECT")
-    if not vapid_private_key or not vapid_subject:
-        raise WebPushTemporaryError("web_push_vapid_not_configured")
-
-    subscription_info = {
-        "endpoint": subscription.endpoint,
-        "keys": {
-            "p256dh": subscription.p256dh_key,
-            "auth": subscription.auth_key,
-        },
+def _raise_for_push_status(status_code: int | None) -> None:
+    if status_code in {404, 410}:
+        raise WebPushPermanentError(f"endpoint_gone_{status_code}")
+    raise WebPushTemporaryError(
+        f"web_push_error_{status_code if status_code else 'unknown'}"
+    )
+
+
+class WebPushSender:
+    """Reusable web push sender for mass delivery.
+
+    The VAPID private key is parsed once, the signed VAPID header for each
+    push service origin (the JWT ``aud``) is reused until shortly before it
+    expires, and each origin gets a pooled HTTP session so connections and
+    TLS handshakes are reused. Instances are thread-safe and callable with
+    the ``(subscription, payload)`` send-callable signature.
+    """
+
+    def __init__(
+        self,
+        *,
+        vapid_private_key: str,
+        vapid_subject: str,
+        ttl: int = 0,
+        timeout: float = 10,
+        jwt_lifetime_seconds: int = 12 * 60 * 60,
+        jwt_refresh_margin_seconds: int = 10 * 60,
+        pool_maxsize: int = 10,
+        session_factory=None,
+    ):
+        try:
+            from py_vapid import Vapid  # type: ignore
+            from pywebpush import WebPusher  # type: ignore
+        except ImportError as error:
+            raise WebPushTemporaryError("pywebpush_not_installed") from error
+        if not vapid_private_key or not vapid_subject:
+            raise WebPushTemporaryError("web_push_vapid_not_configured")
+
+        if os.path.isfile(vapid_private_key):
+            self._vapid = Vapid.from_file(private_key_file=vapid_private_key)
+        else:
+            self._vapid = Vapid.from_string(private_key=vapid_private_key)
+        self._web_pusher = WebPusher
+        self.vapid_subject = vapid_subject
+        self.ttl = ttl
+        self.timeout = timeout
+        self.jwt_lifetime_seconds = jwt_lifetime_seconds
+        self.jwt_refresh_margin_seconds = jwt_refresh_margin_seconds
+        self.pool_maxsize = pool_maxsize
+        self._session_factory = session_factory or self._pooled_session
+        self._headers: dict[str, tuple[dict[str, str], int]] = {}
+        self._sessions: dict[str, object] = {}
+        self._lock = Lock()
+
+    @classmethod
+    def from_config(cls, config, **overrides) -> "WebPushSender":
+        options = {
+            "vapid_private_key": config.get("WEB_PUSH_VAPID_PRIVATE_KEY"),
+            "vapid_subject": config.get("WEB_PUSH_VAPID_SUBJECT"),
+            "pool_maxsize": config.get("DIGEST_PUSH_WORKERS", 8),
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    def _pooled_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_maxsize,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def vapid_headers(self, audience: str) -> dict[str, str]:
+        """Signed VAPID headers for a push service origin, cached until
+        ``jwt_refresh_margin_seconds`` before the JWT expires."""
+        now = int(time.time())
+        with self._lock:
+            cached = self._headers.get(audience)
+            if cached and cached[1] - self.jwt_refresh_margin_seconds > now:
+                return cached[0]
+
+        expires_at = now + self.jwt_lifetime_seconds
+        headers = self._vapid.sign(
+            {"sub": self.vapid_subject, "aud": audience, "exp": expires_at}
+        )
+        with self._lock:
+            self._headers[audience] = (headers, expires_at)
+        return headers
+
+    def session_for(self, audience: str):
+        with self._lock:
+            session = self._sessions.get(audience)
+            if session is None:
+                session = self._session_factory()
+                self._sessions[audience] = session
+            return session
+
+    def __call__(self, subscription: WebPushTarget, payload: dict | str | bytes) -> None:
+        endpoint = urlsplit(subscription.endpoint)
+        audience = f"{endpoint.scheme}://{endpoint.netloc}"
+        data = payload if isinstance(payload, (str, bytes)) else json.dumps(payload)
+        subscription_info = {
+            "endpoint": subscription.endpoint,
+            "keys": {
+                "p256dh": subscription.p256dh_key,
+                "auth": subscription.auth_key,
+            },
+        }
+        try:
+            response = self._web_pusher(
+                subscription_info,
+                requests_session=self.session_for(audience),
+            ).send(
+                data,
+                dict(self.vapid_headers(audience)),
+                ttl=self.ttl,
+                timeout=self.timeout,
+            )
+        except (WebPushPermanentError, WebPushTemporaryError):
+            raise
+        except Exception as error:  # noqa: BLE001
+            raise WebPushTemporaryError(f"web_push_error_{type(error).__name__}") from error
+
+        if response.status_code > 202:
+            _raise_for_push_status(response.status_code)
+
+    def close(self) -> None:
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            close = getattr(session, "close", None)
+            if close:
+                close()
+
+
+_shared_senders: dict[tuple[str, str], WebPushSender] = {}
+_shared_senders_lock = Lock()
+
+
+def get_web_push_sender() -> WebPushSender:
+    """The process-wide sender for the configured VAPID key."""
+    key = (
+        current_app.config.get("WEB_PUSH_VAPID_PRIVATE_KEY") or "",
+        current_app.config.get("WEB_PUSH_VAPID_SUBJECT") or "",
+    )
+    with _shared_senders_lock:
+        sender = _shared_senders.get(key)
+        if sender is None:
+            sender = WebPushSender.from_config(current_app.config)
+            _shared_senders[key] = sender
+        return sender
+
+
+def _default_send_callable(subscription: WebPushTarget, payload: dict) -> None:
+    get_web_push_sender()(subscription, payload)
+
+
+def qsl_digest_push_payload(
+    *,
+    op: str,
+    qsl_count: int,
+    digest_date: date,
+    digest_url: str,
+) -> dict[str, object]:
+    return {
+        "title": "New LoTW QSLs",
+        "body": f"You received {qsl_count} new QSLs.",
+        "url": digest_url,
+        "digest_date": digest_date.isoformat(),
+        "qsl_count": qsl_count,
+        "op": op,
     }
+
+
+def endpoint_host(endpoint: str) -> str:
+    return urlsplit(endpoint).netloc.lower()
+
+
+def _push_to_target(
+    *,
+    target: WebPushTarget,
+    data: str,
+    sender,
+    rate_limiter: KeyedRateLimiter | None,
+) -> Exception | None:
+    if rate_limiter is not None:
+        rate_limiter.acquire(endpoint_host(target.endpoint))
     try:
-        webpush(
-            subscription_info=subscription_info,
-            data=json.dumps(payload),
-            vapid_private_key=vapid_private_key,
-            vapid_claims={"sub": vapid_subject},
-        )
-    except WebPushException as error:
-        response = getattr(error, "response", None)
-        status_code = getattr(response, "status_code", None)
-        if status_code in {404, 410}:
-            raise WebPushPermanentError(f"endpoint_gone_{status_code}") from error
-        raise WebPushTemporaryError(
-            f"web_push_error_{status_code if status_code else 'unknown'}"
-        ) from error
+        sender(target, data)
+    except Exception as error:  # noqa: BLE001
+        return error
+    return None
 
 
 def send_qsl_digest_web_push(
     *,
-    user: User,
-    batch: QSLDigestBatch,
-    subscriptions: list[WebPushSubscription],
-    digest_url: str,
+    targets: Sequence[WebPushTarget],
+    payload: dict,
     send_callable=None,
+    rate_limiter: KeyedRateLimiter | None = None,
+    max_workers: int | None = None,
 ) -> WebPushDeliveryReport:
+    """Push ``payload`` to every target. Touches no database state; apply the
+    returned report with ``record_web_push_report``.
+
+    The payload is serialized once and the send callable receives the JSON
+    string. With several devices, encryption and sending run concurrently
+    on up to ``max_workers`` threads (``WEB_PUSH_DEVICE_WORKERS``).
+    """
     report = WebPushDeliveryReport()
     sender = send_callable or _default_send_callable
-    now = datetime.now(tz=timezone.utc)
+    data = json.dumps(payload)
+    if max_workers is None:
+        max_workers = current_app.config.get("WEB_PUSH_DEVICE_WORKERS", 4)
+    max_workers = max(1, min(max_workers, len(targets)))
 
-    payload = {
-        "title": "New LoTW QSLs",
-        "body": f"You received {batch.qsl_count} new QSLs.",
-        "url": digest_url,
-        "digest_date": batch.digest_date.isoformat(),
-        "qsl_count": batch.qsl_count,
-        "op": user.op,
-    }
+    def push(target: WebPushTarget) -> Exception | None:
+        return _push_to_target(
+            target=target,
+            data=data,
+            sender=sender,
+            rate_limiter=rate_limiter,
+        )
+
+    if max_workers == 1:
+        outcomes = [push(target) for target in targets]
+    else:
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="web-push-device"
+        ) as executor:
+            outcomes = list(executor.map(push, targets))
 
-    for subscription in subscriptions:
+    for target, error in zip(targets, outcomes):
         report.attempted += 1
-        try:
-            sender(subscription, payload)
-            subscription.last_success_at = now
-            subscription.last_failure_at = None
-            subscription.failure_count = 0
+        if error is None:
             report.sent += 1
-        except WebPushPermanentError as error:
-            subscription.last_failure_at = now
-            subscription.failure_count = (subscription.failure_count or 0) + 1
-            subscription.status = "invalid"
+            report.succeeded_ids.append(target.id)
+        elif isinstance(error, WebPushPermanentError):
             report.failed += 1
+            report.invalid_ids.append(target.id)
             report.errors.append(str(error))
-        except Exception as error:  # noqa: BLE001
-            subscription.last_failure_at = now
-            subscription.failure_count = (subscription.failure_count or 0) + 1
+        else:
             report.failed += 1
+            report.failed_ids.append(target.id)
             report.errors.append(str(error))
 
     return report
+
+
+def record_web_push_report(
+    *,
+    report: WebPushDeliveryReport,
+    session: Session,
+    now: datetime | None = None,
+) -> None:
+    """Write per-subscription success/failure bookkeeping for a report in a
+    single UPDATE."""
+    attempted_ids = report.succeeded_ids + report.failed_ids + report.invalid_ids
+    if not attempted_ids:
+        return
+
+    now = now or datetime.now(tz=timezone.utc)
+    succeeded = WebPushSubscription.id.in_(report.succeeded_ids)
+    session.execute(
+        update(WebPushSubscription)
+        .where(WebPushSubscription.id.in_(attempted_ids))
+        .values(
+            last_success_at=case(
+                (succeeded, now), else_=WebPushSubscription.last_success_at
+            ),
+            last_failure_at=case((succeeded, null()), else_=now),
+            failure_count=case(
+                (succeeded, 0),
+                else_=func.coalesce(WebPushSubscription.failure_count, 0) + 1,
+            ),
+            status=case(
+                (WebPushSubscription.id.in_(report.invalid_ids), "invalid"),
+                else_=WebPushSubscription.status,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
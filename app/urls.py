@@ -10,3 +10,4 @@ DETAILS_PAGE_URL = "https://lotw.arrl.org/lotwuser/qsodetail?qso="  # noqa
 FIND_PAGE_URL = "https://lotw.arrl.org/lotwuser/act"  # noqa
 ACCOUNT_CREDITS_URL = "https://lotw.arrl.org/lotwuser/accountcredits?"  # noqa
 QSOS_URL = "https://lotw.arrl.org/lotwuser/lotwreport.adi?qso_query=1&qso_withown=yes&qso_qslsince={}&qso_qsldetail=yes&qso_mydetail=yes&qso_owncall=&download_rpt_btn=Download+report"  # noqa
+QSOS_RECEIVED_URL = "https://lotw.arrl.org/lotwuser/lotwreport.adi?qso_query=1&qso_qsl=no&qso_withown=yes&qso_qsorxsince={}&qso_qsldetail=yes&qso_mydetail=yes&qso_owncall=&download_rpt_btn=Download+report"  # noqa
@@ -0,0 +1,292 @@
+"""Benchmark digest generation and dispatch over synthetic users.
+
+Seeds ``--users`` users with digests enabled, spread over ``--timezones``,
+each with ``--qsos-per-user`` QSOs of which ``--qsls-per-user`` were
+confirmed inside the user's current digest window. Then times
+``run_due_qsl_digest_generation`` and ``dispatch_pending_digest_notifications``
+with stub push/email senders, so only our own code and the database are
+measured.
+
+    python -m benchmarks.digest --users 5000 --qsls-per-user 5
+    python -m benchmarks.digest --db-url postgresql+psycopg://... --json
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, time, timedelta, timezone
+from itertools import cycle
+import random
+from threading import Lock
+from time import sleep
+
+from sqlalchemy import insert
+
+from app.database.table_declarations import (
+    NotificationPreference,
+    QSOReport,
+    User,
+    WebPushSubscription,
+)
+from app.services.digest_notifications import dispatch_pending_digest_notifications
+from app.services.qsl_digest import compute_digest_schedule, run_due_qsl_digest_generation
+
+from .harness import benchmark_app, engine_for, measure, print_reports
+
+DEFAULT_TIMEZONES = (
+    "UTC",
+    "America/New_York",
+    "America/Chicago",
+    "America/Los_Angeles",
+    "Europe/Berlin",
+    "Asia/Tokyo",
+    "Australia/Sydney",
+)
+_SEED_CHUNK = 1000
+
+
+def seed_digest_users(
+    app,
+    *,
+    users: int,
+    qsos_per_user: int,
+    qsls_per_user: int,
+    timezones: tuple[str, ...] = DEFAULT_TIMEZONES,
+    push_ratio: float = 0.5,
+    digest_times: tuple[time, ...] = (time(7, 0), time(8, 0), time(18, 30)),
+    now_utc: datetime,
+    seed: int = 0,
+) -> None:
+    """Bulk insert synthetic users, preferences, subscriptions and QSOs."""
+    rng = random.Random(seed)
+    session_maker = app.config.get("SESSION_MAKER")
+    tz_cycle = cycle(timezones)
+    time_cycle = cycle(digest_times)
+
+    for chunk_start in range(0, users, _SEED_CHUNK):
+        chunk = range(chunk_start, min(users, chunk_start + _SEED_CHUNK))
+        profiles = [(index, next(tz_cycle), next(time_cycle)) for index in chunk]
+        with session_maker.begin() as session_:
+            user_ids = session_.scalars(
+                insert(User).returning(User.id),
+                [
+                    {
+                        "op": f"bm{index}x",
+                        "email": f"bm{index}x@example.com",
+                        "timezone": tz_name,
+                        "subscription_status": "active",
+                        "lotw_auth_state": "ok",
+                        "lotw_cookies_b": b"benchmark-cookie",
+                        "qso_reports_last_update": now_utc.date(),
+                        "qso_reports_last_update_time": now_utc,
+                    }
+                    for index, tz_name, _digest_time in profiles
+                ],
+            ).all()
+
+            session_.execute(
+                insert(NotificationPreference),
+                [
+                    {
+                        "user_id": user_id,
+                        "qsl_digest_enabled": True,
+                        "qsl_digest_time_local": digest_time,
+                        "fallback_to_email": True,
+                    }
+                    for user_id, (_index, _tz_name, digest_time) in zip(user_ids, profiles)
+                ],
+            )
+
+            subscriptions = [
+                {
+                    "user_id": user_id,
+                    "endpoint": f"https://push.example.com/{user_id}",
+                    "p256dh_key": "p256dh",
+                    "auth_key": "auth",
+                }
+                for user_id in user_ids
+                if rng.random() < push_ratio
+            ]
+            if subscriptions:
+                session_.execute(insert(WebPushSubscription), subscriptions)
+
+            reports = []
+            for user_id, (_index, tz_name, digest_time) in zip(user_ids, profiles):
+                schedule = compute_digest_schedule(
+                    now_utc=now_utc,
+                    timezone_name=tz_name,
+                    digest_time_local=digest_time,
+                )
+                window = schedule.window_end_utc - schedule.window_start_utc
+                for qso_index in range(qsos_per_user):
+                    qso_at = now_utc - timedelta(days=rng.randint(2, 3650))
+                    rxqsl = None
+                    if qso_index < qsls_per_user:
+                        rxqsl = schedule.window_start_utc + window * rng.random()
+                    reports.append(
+                        {
+                            "user_id": user_id,
+                            "call": f"W{rng.randint(0, 9)}{rng.choice('ABCDEFXYZ')}"
+                            f"{rng.choice('ABCDEFXYZ')}",
+                            "band": rng.choice(("20M", "40M", "15M", "10M")),
+                            "mode": rng.choice(("FT8", "CW", "SSB")),
+                            "qsl_rcvd": "Y" if rxqsl else "N",
+                            "app_lotw_qso_timestamp": qso_at,
+                            "app_lotw_rxqsl": rxqsl,
+                        }
+                    )
+            if reports:
+                session_.execute(insert(QSOReport), reports)
+
+
+class _StubSenders:
+    """Thread-safe stand-ins for the web push and SMTP senders."""
+
+    def __init__(self, *, push_latency: float = 0.0, email_latency: float = 0.0):
+        self.push_latency = push_latency
+        self.email_latency = email_latency
+        self.pushes = 0
+        self.emails = 0
+        self._lock = Lock()
+
+    def push(self, _target, _payload) -> None:
+        if self.push_latency:
+            sleep(self.push_latency)
+        with self._lock:
+            self.pushes += 1
+
+    def email(self, _message) -> str:
+        if self.email_latency:
+            sleep(self.email_latency)
+        with self._lock:
+            self.emails += 1
+            return f"benchmark-{self.emails}"
+
+
+def run_digest_benchmark(
+    *,
+    users: int,
+    qsos_per_user: int,
+    qsls_per_user: int,
+    timezones: tuple[str, ...] = DEFAULT_TIMEZONES,
+    push_ratio: float = 0.5,
+    shards: int | None = None,
+    push_latency: float = 0.0,
+    email_latency: float = 0.0,
+    db_url: str | None = None,
+) -> list[dict]:
+    now_utc = datetime.now(tz=timezone.utc).replace(microsecond=0)
+    reports = []
+    # Every stub endpoint shares one host, so lift the per-host send rates
+    # and let the stub latencies model the providers instead.
+    with benchmark_app(
+        db_url,
+        DIGEST_PUSH_HOST_RATE_PER_SECOND=1_000_000,
+        DIGEST_EMAIL_RATE_PER_SECOND=1_000_000,
+    ) as app:
+        engine = engine_for(app)
+        with app.app_context():
+            reports.append(
+                measure(
+                    "seed",
+                    lambda: seed_digest_users(
+                        app,
+                        users=users,
+                        qsos_per_user=qsos_per_user,
+                        qsls_per_user=qsls_per_user,
+                        timezones=timezones,
+                        push_ratio=push_ratio,
+                        now_utc=now_utc,
+                    ),
+                    engine=engine,
+                    units=users,
+                    unit_name="users",
+                )
+            )
+            reports.append(
+                measure(
+                    "run_due_qsl_digest_generation",
+                    lambda: run_due_qsl_digest_generation(
+                        now_utc=now_utc, shard_count=shards
+                    ),
+                    engine=engine,
+                    units=users,
+                    unit_name="users",
+                )
+            )
+            generation = reports[-1]["result"]
+            # Per-shard detail is noise in a summary report.
+            generation.pop("shards", None)
+
+            senders = _StubSenders(push_latency=push_latency, email_latency=email_latency)
+            reports.append(
+                measure(
+                    "dispatch_pending_digest_notifications",
+                    lambda: dispatch_pending_digest_notifications(
+                        limit=max(users, 1),
+                        push_sender=senders.push,
+                        email_sender=senders.email,
+                    ),
+                    engine=engine,
+                    units=generation["created"] + generation["updated"],
+                    unit_name="batches",
+                )
+            )
+            reports[-1]["pushes"] = senders.pushes
+            reports[-1]["emails"] = senders.emails
+    return reports
+
+
+def main(argv: list[str] | None = None) -> list[dict]:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--qsos-per-user", type=int, default=50)
+    parser.add_argument("--qsls-per-user", type=int, default=3)
+    parser.add_argument(
+        "--timezones",
+        default=",".join(DEFAULT_TIMEZONES),
+        help="Comma-separated IANA zones assigned to users round-robin.",
+    )
+    parser.add_argument(
+        "--push-ratio",
+        type=float,
+        default=0.5,
+        help="Share of users with a web push subscription; the rest get email.",
+    )
+    parser.add_argument("--shards", type=int, default=None)
+    parser.add_argument(
+        "--push-latency",
+        type=float,
+        default=0.0,
+        help="Seconds each stub web push takes, to model the push service.",
+    )
+    parser.add_argument(
+        "--email-latency",
+        type=float,
+        default=0.0,
+        help="Seconds each stub email send takes, to model SMTP.",
+    )
+    parser.add_argument(
+        "--db-url",
+        default=None,
+        help="Benchmark against this database instead of a temporary SQLite file. "
+        "It should be empty: the benchmark creates its own users.",
+    )
+    parser.add_argument("--json", action="store_true", help="Print reports as JSON.")
+    args = parser.parse_args(argv)
+
+    reports = run_digest_benchmark(
+        users=args.users,
+        qsos_per_user=args.qsos_per_user,
+        qsls_per_user=min(args.qsls_per_user, args.qsos_per_user),
+        timezones=tuple(zone.strip() for zone in args.timezones.split(",") if zone.strip()),
+        push_ratio=args.push_ratio,
+        shards=args.shards,
+        push_latency=args.push_latency,
+        email_latency=args.email_latency,
+        db_url=args.db_url,
+    )
+    print_reports(reports, as_json=args.json)
+    return reports
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Shared plumbing for the benchmark scripts in this package.
+
+Each benchmark builds the real app against a throwaway database (or the
+``--db-url`` it is given), seeds synthetic data, and measures the code under
+test with :func:`measure`.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import json
+import os
+from pathlib import Path
+import sys
+import tempfile
+from time import perf_counter
+import tracemalloc
+from typing import Callable, Iterator
+
+from sqlalchemy import event
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app  # noqa: E402
+
+_BENCHMARK_ENV = {
+    "MOBILE_LOTW_SECRET_KEY": "benchmark-secret-key",
+    "MOBILE_LOTW_DB_KEY": "abcdefghijklmnop",
+    "API_KEY": "benchmark-api-key",
+    "DEPLOY_SCRIPT_PATH": "/tmp/deploy.sh",
+    "SESSION_CACHE_EXPIRATION": "30",
+    "MOBILE_LOTW_SECURE_COOKIES": "0",
+}
+
+
+@contextmanager
+def benchmark_app(db_url: str | None = None, **config) -> Iterator:
+    """Yield an app bound to ``db_url``, or to a temporary SQLite file."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = {
+            **_BENCHMARK_ENV,
+            "DB_URL": db_url or f"sqlite:///{Path(temp_dir) / 'benchmark.db'}",
+        }
+        previous = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        app = None
+        try:
+            app = create_app()
+            app.config.update(
+                TESTING=True,
+                QSO_IMPORT_SPOOL_DIR=str(Path(temp_dir) / "spool"),
+                **config,
+            )
+            yield app
+        finally:
+            if app is not None:
+                engine_for(app).dispose()
+            for key, value in previous.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+def engine_for(app):
+    return app.config.get("SESSION_MAKER").kw["bind"]
+
+
+@dataclass
+class QueryCounter:
+    """Count the SQL statements an engine executes, by leading keyword."""
+
+    statements: int = 0
+    by_verb: dict[str, int] = field(default_factory=dict)
+
+    def _on_execute(self, _conn, _cursor, statement, _parameters, _context, executemany):
+        self.statements += 1
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+        self.by_verb[verb] = self.by_verb.get(verb, 0) + 1
+
+    @contextmanager
+    def listening(self, engine) -> Iterator["QueryCounter"]:
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        try:
+            yield self
+        finally:
+            event.remove(engine, "before_cursor_execute", self._on_execute)
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process so far, in MiB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def measure(
+    label: str,
+    fn: Callable[[], object],
+    *,
+    engine=None,
+    units: int | None = None,
+    unit_name: str = "items",
+) -> dict:
+    """Run ``fn`` once and report wall time, statements and memory.
+
+    ``units`` is the amount of work done (users, QSOs, ...) and turns the
+    timing into a throughput figure.
+    """
+    counter = QueryCounter()
+    tracemalloc.start()
+    started = perf_counter()
+    try:
+        if engine is not None:
+            with counter.listening(engine):
+                result = fn()
+        else:
+            result = fn()
+        elapsed = perf_counter() - started
+        _current, peak_traced = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    report = {
+        "benchmark": label,
+        "elapsed_seconds": round(elapsed, 3),
+        "statements": counter.statements,
+        "statements_by_verb": counter.by_verb,
+        "peak_python_mb": round(peak_traced / (1024 * 1024), 1),
+        "peak_rss_mb": peak_rss_mb(),
+        "result": result,
+    }
+    if units is not None:
+        report[unit_name] = units
+        report[f"{unit_name}_per_second"] = (
+            round(units / elapsed, 1) if elapsed > 0 else None
+        )
+    return report
+
+
+def print_reports(reports: list[dict], *, as_json: bool = False) -> None:
+    if as_json:
+        print(json.dumps(reports, indent=2, default=str))
+        return
+    for report in reports:
+        print(f"== {report['benchmark']}")
+        for key, value in report.items():
+            if key != "benchmark":
+                print(f"   {key}: {value}")
+
+
+def run_isolated(fn: Callable, /, *args, **kwargs):
+    """Run ``fn`` in a fresh interpreter so its peak RSS is its own.
+
+    ``fn`` must be importable (module level) and return picklable data.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return pool.submit(fn, *args, **kwargs).result()
@@ -0,0 +1,376 @@
+"""Benchmark QSO import over synthetic LoTW ADIF reports.
+
+For every size in ``--sizes`` a synthetic ``lotwreport.adi`` is generated
+(with ``--duplicate-rate`` of records repeated the way LoTW repeats them),
+served from a local HTTP stand-in for LoTW, and imported with
+``import_qsos_for_user``. A second, incremental import then gets
+``--growth`` new QSOs on the QSO stream, and ``--overlap`` of the old ones
+(``--new-qsl-rate`` of them newly confirmed) on the QSL stream. Each import
+reports wall time, SQL statements and peak memory; by default every size
+runs in its own process so peak RSS is per size.
+
+``--replay`` instead imports a real report kept in the QSO import spool
+(``QSO_IMPORT_SPOOL_DIR``) as a first import.
+
+    python -m benchmarks.qso_import --sizes 1000,10000,100000,500000
+    python -m benchmarks.qso_import --sizes 10000 --db-url postgresql+psycopg://...
+    python -m benchmarks.qso_import --replay /tmp/mobile_lotw_spool/<sha256>.adi.gz
+"""
+
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import random
+from threading import Thread
+from typing import Iterator
+from unittest.mock import patch
+
+from app.database.queries import ensure_user
+from app.services import adif_spool, qso_import
+
+from .harness import benchmark_app, engine_for, measure, print_reports, run_isolated
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 500_000)
+_BANDS = (("20M", 14.074), ("40M", 7.074), ("15M", 21.074), ("10M", 28.074), ("80M", 3.573))
+_MODES = ("FT8", "CW", "SSB", "FT4", "RTTY")
+_PREFIXES = ("W", "K", "N", "VE", "G", "DL", "JA", "VK", "F", "EA", "I", "PY")
+
+
+@dataclass(frozen=True)
+class SyntheticQSO:
+    call: str
+    timestamp: datetime
+    band: str
+    freq: float
+    mode: str
+    gridsquare: str
+    rxqso: datetime
+    rxqsl: datetime | None = None
+
+
+def _tag(name: str, value: object) -> str:
+    text = str(value)
+    return f"<{name}:{len(text)}>{text}\n"
+
+
+def _lotw_datetime(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def adif_record(qso: SyntheticQSO) -> str:
+    parts = [
+        _tag("APP_LoTW_OWNCALL", "BM1BM"),
+        _tag("STATION_CALLSIGN", "BM1BM"),
+        _tag("CALL", qso.call),
+        _tag("BAND", qso.band),
+        _tag("FREQ", f"{qso.freq:.5f}"),
+        _tag("MODE", qso.mode),
+        _tag("APP_LoTW_QSO_TIMESTAMP", qso.timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")),
+        _tag("QSO_DATE", qso.timestamp.strftime("%Y%m%d")),
+        _tag("TIME_ON", qso.timestamp.strftime("%H%M%S")),
+        _tag("APP_LoTW_RXQSO", _lotw_datetime(qso.rxqso)),
+        _tag("GRIDSQUARE", qso.gridsquare),
+    ]
+    if qso.rxqsl is not None:
+        parts += [
+            _tag("QSL_RCVD", "Y"),
+            _tag("QSLRDATE", qso.rxqsl.strftime("%Y%m%d")),
+            _tag("APP_LoTW_RXQSL", _lotw_datetime(qso.rxqsl)),
+        ]
+    else:
+        parts.append(_tag("QSL_RCVD", "N"))
+    return "".join(parts) + "<eor>\n\n"
+
+
+def adif_report(qsos: list[SyntheticQSO], *, last_qsl: datetime) -> bytes:
+    header = (
+        "ARRL Logbook of the World Status Report\n"
+        + _tag("PROGRAMID", "LoTW")
+        + _tag("APP_LoTW_LASTQSL", _lotw_datetime(last_qsl))
+        + _tag("APP_LoTW_NUMREC", len(qsos))
+        + "\n<eoh>\n\n"
+    )
+    return (header + "".join(adif_record(qso) for qso in qsos)).encode("utf-8")
+
+
+def synthetic_qsos(
+    count: int,
+    *,
+    rng: random.Random,
+    qsl_rate: float,
+    start: datetime,
+    span: timedelta,
+) -> list[SyntheticQSO]:
+    """``count`` QSOs with unique (timestamp, call) keys spread over ``span``."""
+    step = span / max(count, 1)
+    qsos = []
+    for index in range(count):
+        timestamp = (start + step * index).replace(microsecond=0)
+        band, freq = rng.choice(_BANDS)
+        rxqso = timestamp + timedelta(minutes=rng.randint(5, 600))
+        qsos.append(
+            SyntheticQSO(
+                call=f"{rng.choice(_PREFIXES)}{rng.randint(0, 9)}"
+                f"{''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(3))}",
+                timestamp=timestamp,
+                band=band,
+                freq=freq,
+                mode=rng.choice(_MODES),
+                gridsquare=f"{rng.choice('ABCDEFGHIJKLMNOPQR')}{rng.choice('ABCDEFGHIJKLMNOPQR')}"
+                f"{rng.randint(0, 9)}{rng.randint(0, 9)}",
+                rxqso=rxqso,
+                rxqsl=rxqso + timedelta(days=rng.randint(0, 60))
+                if rng.random() < qsl_rate
+                else None,
+            )
+        )
+    return qsos
+
+
+def with_duplicates(
+    qsos: list[SyntheticQSO], *, rate: float, rng: random.Random
+) -> list[SyntheticQSO]:
+    """Repeat ``rate`` of the records, unconfirmed, as LoTW sometimes does."""
+    records = list(qsos)
+    for qso in rng.sample(qsos, int(len(qsos) * rate)):
+        records.append(
+            SyntheticQSO(**{**qso.__dict__, "rxqsl": None})
+            if qso.rxqsl is not None
+            else qso
+        )
+    rng.shuffle(records)
+    return records
+
+
+class _ReportServer:
+    """Serve ``payload`` for the QSO stream and ``qsl_payload`` for the QSL
+    stream."""
+
+    def __init__(self):
+        self.payload = b""
+        self.qsl_payload = b""
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802
+                server.requests += 1
+                payload = server.payload if "qso_qsl=no" in self.path else server.qsl_payload
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-arrl-adif")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *_args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+    @property
+    def report_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/lotwuser/lotwreport.adi?qso_query=1"
+
+
+@contextmanager
+def local_lotw() -> Iterator[_ReportServer]:
+    """Point ``QSOS_URL`` and ``QSOS_RECEIVED_URL`` at a local server for the
+    duration."""
+    server = _ReportServer()
+    thread = Thread(target=server.httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with (
+            patch.object(qso_import, "QSOS_URL", f"{server.report_url}&qso_qslsince={{}}"),
+            patch.object(
+                qso_import,
+                "QSOS_RECEIVED_URL",
+                f"{server.report_url}&qso_qsl=no&qso_qsorxsince={{}}",
+            ),
+        ):
+            yield server
+    finally:
+        server.httpd.shutdown()
+        server.httpd.server_close()
+
+
+def run_import_benchmark(
+    size: int,
+    *,
+    duplicate_rate: float = 0.02,
+    qsl_rate: float = 0.4,
+    overlap: float = 0.1,
+    new_qsl_rate: float = 0.3,
+    growth: float = 0.02,
+    db_url: str | None = None,
+    seed: int = 0,
+) -> list[dict]:
+    """First import of ``size`` QSOs, then one incremental re-import."""
+    rng = random.Random(seed)
+    now = datetime.now(tz=timezone.utc).replace(microsecond=0, tzinfo=None)
+    history = synthetic_qsos(
+        size,
+        rng=rng,
+        qsl_rate=qsl_rate,
+        start=now - timedelta(days=3650),
+        span=timedelta(days=3640),
+    )
+    first_payload = adif_report(
+        with_duplicates(history, rate=duplicate_rate, rng=rng), last_qsl=now
+    )
+
+    resent = [
+        SyntheticQSO(
+            **{
+                **qso.__dict__,
+                "rxqsl": now - timedelta(hours=rng.randint(1, 48))
+                if qso.rxqsl is None and rng.random() < new_qsl_rate
+                else qso.rxqsl,
+            }
+        )
+        for qso in rng.sample(history, int(size * overlap))
+    ]
+    fresh = synthetic_qsos(
+        int(size * growth),
+        rng=rng,
+        qsl_rate=qsl_rate,
+        start=now - timedelta(days=10),
+        span=timedelta(days=9),
+    )
+    second_payload = adif_report(
+        with_duplicates(fresh, rate=duplicate_rate, rng=rng), last_qsl=now
+    )
+    second_qsl_payload = adif_report(
+        with_duplicates(resent, rate=duplicate_rate, rng=rng), last_qsl=now
+    )
+    del history, resent, fresh
+
+    return _run_imports(
+        [
+            # A first import only reads the QSO stream.
+            (f"first_import[{size}]", first_payload, b""),
+            (f"incremental_import[{size}]", second_payload, second_qsl_payload),
+        ],
+        db_url=db_url,
+    )
+
+
+def run_replay_benchmark(spool_path: str, *, db_url: str | None = None) -> list[dict]:
+    """First import of a report kept in the QSO import spool."""
+    payload = adif_spool.read(Path(spool_path))
+    return _run_imports(
+        [(f"replay_import[{Path(spool_path).name[:12]}]", payload, b"")], db_url=db_url
+    )
+
+
+def _run_imports(
+    imports: list[tuple[str, bytes, bytes]], *, db_url: str | None
+) -> list[dict]:
+    """Import each ``(label, payload, qsl_payload)`` in turn for one user."""
+    reports = []
+    with benchmark_app(db_url) as app, app.app_context(), local_lotw() as server:
+        with app.config.get("SESSION_MAKER").begin() as session_:
+            user = ensure_user(op="bm1bm", session=session_)
+            user.lotw_cookies = {"session": "benchmark"}
+            user.lotw_auth_state = "ok"
+            session_.add(user)
+
+        for label, payload, qsl_payload in imports:
+            server.payload = payload
+            server.qsl_payload = qsl_payload
+            report = measure(
+                label,
+                lambda: qso_import.import_qsos_for_user(op="bm1bm"),
+                engine=engine_for(app),
+                units=payload.count(b"<eor>") + qsl_payload.count(b"<eor>"),
+                unit_name="records",
+            )
+            report["payload_mb"] = round(
+                (len(payload) + len(qsl_payload)) / (1024 * 1024), 2
+            )
+            reports.append(report)
+    return reports
+
+
+def main(argv: list[str] | None = None) -> list[dict]:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma-separated QSO counts for the first import.",
+    )
+    parser.add_argument("--duplicate-rate", type=float, default=0.02)
+    parser.add_argument(
+        "--qsl-rate", type=float, default=0.4, help="Share of QSOs already confirmed."
+    )
+    parser.add_argument(
+        "--overlap",
+        type=float,
+        default=0.1,
+        help="Share of imported QSOs re-sent by the incremental report.",
+    )
+    parser.add_argument(
+        "--new-qsl-rate",
+        type=float,
+        default=0.3,
+        help="Share of re-sent, unconfirmed QSOs that are now confirmed.",
+    )
+    parser.add_argument(
+        "--growth",
+        type=float,
+        default=0.02,
+        help="New QSOs in the incremental report, as a share of the size.",
+    )
+    parser.add_argument(
+        "--db-url",
+        default=None,
+        help="Benchmark against this (empty) database instead of a temporary SQLite file.",
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Run every size in this process; peak RSS then accumulates across sizes.",
+    )
+    parser.add_argument(
+        "--replay",
+        action="append",
+        metavar="SPOOL_FILE",
+        help="Import this spooled LoTW report instead of synthetic ones; repeatable.",
+    )
+    parser.add_argument("--json", action="store_true", help="Print reports as JSON.")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        reports = []
+        for spool_path in args.replay:
+            if args.in_process:
+                reports += run_replay_benchmark(spool_path, db_url=args.db_url)
+            else:
+                reports += run_isolated(run_replay_benchmark, spool_path, db_url=args.db_url)
+            print_reports(reports[-1:], as_json=args.json)
+        return reports
+
+    options = {
+        "duplicate_rate": args.duplicate_rate,
+        "qsl_rate": args.qsl_rate,
+        "overlap": args.overlap,
+        "new_qsl_rate": args.new_qsl_rate,
+        "growth": args.growth,
+        "db_url": args.db_url,
+    }
+    reports = []
+    for size in (int(size) for size in args.sizes.split(",") if size.strip()):
+        if args.in_process:
+            reports += run_import_benchmark(size, **options)
+        else:
+            reports += run_isolated(run_import_benchmark, size, **options)
+        print_reports(reports[-2:], as_json=args.json)
+    return reports
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+from argparse import ArgumentParser
+from pathlib import Path
+import sys
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+load_dotenv(ROOT / ".env")
+
+from app import create_app  # noqa: E402
+from app.services.adif_spool import purge_expired  # noqa: E402
+
+parser = ArgumentParser(description="Delete spooled LoTW reports past retention.")
+parser.add_argument(
+    "--retention-hours",
+    type=float,
+    default=None,
+    help="Keep reports from the last N hours (default: QSO_IMPORT_SPOOL_RETENTION_HOURS).",
+)
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context():
+    print("purged:", purge_expired(retention_hours=args.retention_hours))
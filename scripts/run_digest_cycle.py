@@ -1,3 +1,4 @@
+from argparse import ArgumentParser
 from pathlib import Path
 import sys
 
@@ -13,10 +14,32 @@ from app import create_app
 from app.services.digest_notifications import dispatch_pending_digest_notifications
 from app.services.qsl_digest import run_due_qsl_digest_generation
 
+parser = ArgumentParser(description="Generate due QSL digests and dispatch them.")
+parser.add_argument(
+    "--shards",
+    type=int,
+    default=None,
+    help="Partition users into N shards processed in parallel "
+    "(default: DIGEST_GENERATION_SHARDS).",
+)
+parser.add_argument(
+    "--limit",
+    type=int,
+    default=None,
+    help="Generate digests for at most N users in total.",
+)
+parser.add_argument(
+    "--dispatch-limit",
+    type=int,
+    default=10_000,
+    help="Deliver at most N pending digest batches (default: 10000).",
+)
+args = parser.parse_args()
+
 app = create_app()
 
 with app.app_context():
-    generation = run_due_qsl_digest_generation()
-    dispatch = dispatch_pending_digest_notifications(limit=10_000)
+    generation = run_due_qsl_digest_generation(limit=args.limit, shard_count=args.shards)
+    dispatch = dispatch_pending_digest_notifications(limit=args.dispatch_limit)
     print("generation:", generation)
     print("dispatch:", dispatch)
@@ -0,0 +1,38 @@
+from argparse import ArgumentParser
+from pathlib import Path
+import sys
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+load_dotenv(ROOT / ".env")
+
+from app import create_app  # noqa: E402
+from app.services.digest_retention import run_digest_retention  # noqa: E402
+
+parser = ArgumentParser(description="Purge digest batches and deliveries past retention.")
+parser.add_argument(
+    "--retention-days",
+    type=int,
+    default=None,
+    help="Keep rows from the last N days (default: DIGEST_RETENTION_DAYS).",
+)
+parser.add_argument(
+    "--chunk-size",
+    type=int,
+    default=None,
+    help="Delete at most N rows per transaction (default: DIGEST_RETENTION_CHUNK_SIZE).",
+)
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context():
+    retention = run_digest_retention(
+        retention_days=args.retention_days,
+        chunk_size=args.chunk_size,
+    )
+    print("retention:", retention)
@@ -1,3 +1,4 @@
+from datetime import datetime, timezone
 import os
 import tempfile
 import unittest
@@ -9,7 +10,7 @@ from requests import RequestException
 from requests.cookies import RequestsCookieJar
 
 from app import create_app
-from app.database.queries import ensure_user, get_user
+from app.database.queries import ensure_notification_preference, ensure_user, get_user
 from app.lotw import LotwTransientError
 
 
@@ -94,6 +95,32 @@ class AuthIntegrationTests(unittest.TestCase):
         self.assertEqual(home_response.status_code, 302)
         self.assertTrue(home_response.headers["Location"].endswith("/qsls"))
 
+    def test_login_makes_a_skipped_digest_due_again(self):
+        op = "k1abc"
+        self._create_user(op=op, has_imported=True)
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = get_user(op=op, session=session_)
+                user.lotw_auth_state = "auth_expired"
+                preference = ensure_notification_preference(user=user, session=session_)
+                preference.qsl_digest_enabled = True
+                preference.next_digest_due_at = datetime(2026, 2, 15, 8, 0, tzinfo=timezone.utc)
+
+        self.client.get("/login")
+        with self.client.session_transaction() as flask_session:
+            csrf_token = flask_session["login_csrf_token"]
+        with patch("app.blueprints.auth.login.post", return_value=_mock_login_response()):
+            self.client.post(
+                "/login",
+                data={"login": op, "password": "secret", "csrf_token": csrf_token},
+            )
+
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = get_user(op=op, session=session_)
+                self.assertEqual(user.lotw_auth_state, "ok")
+                self.assertIsNone(user.notification_preference.next_digest_due_at)
+
     def test_transient_lotw_error_keeps_web_session(self):
         op = "k1xyz"
         self._create_user(op=op, has_imported=True)
@@ -0,0 +1,34 @@
+import unittest
+
+from benchmarks.digest import run_digest_benchmark
+from benchmarks.qso_import import run_import_benchmark
+
+
+class DigestBenchmarkTests(unittest.TestCase):
+    def test_digest_benchmark_generates_and_dispatches_every_user(self):
+        reports = run_digest_benchmark(users=6, qsos_per_user=4, qsls_per_user=2)
+        by_name = {report["benchmark"]: report for report in reports}
+
+        generation = by_name["run_due_qsl_digest_generation"]
+        self.assertEqual(generation["result"]["created"], 6)
+        self.assertGreater(generation["statements"], 0)
+
+        dispatch = by_name["dispatch_pending_digest_notifications"]
+        self.assertEqual(dispatch["result"]["sent"], 6)
+        self.assertEqual(dispatch["pushes"] + dispatch["emails"], 6)
+        self.assertIn("peak_python_mb", dispatch)
+
+    def test_import_benchmark_serves_synthetic_adif_to_the_importer(self):
+        first, incremental = run_import_benchmark(40, duplicate_rate=0.0, overlap=0.25)
+
+        self.assertEqual(first["benchmark"], "first_import[40]")
+        self.assertEqual(first["result"]["fetched"], 40)
+        self.assertEqual(first["result"]["inserted"], 40)
+        self.assertGreater(first["statements"], 0)
+
+        self.assertEqual(incremental["records"], 10)
+        self.assertEqual(incremental["result"]["fetched"], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
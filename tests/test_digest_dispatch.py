@@ -0,0 +1,305 @@
+from datetime import date, datetime, time, timedelta, timezone
+import json
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import event, select
+
+from app import create_app
+from app.database.queries import ensure_notification_preference, ensure_user
+from app.database.table_declarations import (
+    NotificationDelivery,
+    QSLDigestBatch,
+    WebPushSubscription,
+)
+from app.rate_limit import TokenBucket
+from app.services.digest_notifications import (
+    dispatch_digest_notifications_for_batch,
+    dispatch_pending_digest_notifications,
+)
+from app.services.web_push import WebPushPermanentError, WebPushTemporaryError
+
+
+class DigestDispatchTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        db_path = Path(self._temp_dir.name) / "test_digest_dispatch.db"
+        self._env = patch.dict(
+            os.environ,
+            {
+                "MOBILE_LOTW_SECRET_KEY": "test-secret-key",
+                "MOBILE_LOTW_DB_KEY": "abcdefghijklmnop",
+                "DB_URL": f"sqlite:///{db_path}",
+                "API_KEY": "test-api-key",
+                "DEPLOY_SCRIPT_PATH": "/tmp/deploy.sh",
+                "SESSION_CACHE_EXPIRATION": "30",
+                "MOBILE_LOTW_SECURE_COOKIES": "0",
+            },
+            clear=False,
+        )
+        self._env.start()
+        self.app = create_app()
+        self.app.config.update(
+            TESTING=True,
+            DIGEST_BASE_URL="https://mobilelotw.org",
+            DIGEST_PUSH_WORKERS=4,
+            DIGEST_EMAIL_WORKERS=2,
+        )
+
+    def tearDown(self):
+        self._env.stop()
+        self._temp_dir.cleanup()
+
+    def _seed_batches(self, count: int) -> dict[str, int]:
+        digest_date = date.today()
+        window_end = datetime.combine(digest_date, time(8, 0), tzinfo=timezone.utc)
+        batch_ids = {}
+        with self.app.config.get("SESSION_MAKER").begin() as session_:
+            for index in range(count):
+                op = f"k{index}abc"
+                user = ensure_user(op=op, session=session_)
+                user.subscription_status = "active"
+                user.email = f"{op}@example.com"
+                session_.add(user)
+                session_.flush()
+                preference = ensure_notification_preference(user=user, session=session_)
+                preference.qsl_digest_enabled = True
+                preference.fallback_to_email = True
+                # Even users have a push subscription, odd users only email.
+                if index % 2 == 0:
+                    session_.add(
+                        WebPushSubscription(
+                            user_id=user.id,
+                            endpoint=f"https://push{index % 4}.example/{op}",
+                            p256dh_key="abc",
+                            auth_key="def",
+                            status="active",
+                        )
+                    )
+                batch = QSLDigestBatch(
+                    user_id=user.id,
+                    digest_date=digest_date,
+                    window_start_utc=window_end - timedelta(days=1),
+                    window_end_utc=window_end,
+                    qsl_count=1,
+                    payload_json={"qso_ids": [], "items": []},
+                )
+                session_.add(batch)
+                session_.flush()
+                batch_ids[op] = batch.id
+        return batch_ids
+
+    def test_dispatches_every_batch_across_channel_pools(self):
+        with self.app.app_context():
+            self._seed_batches(count=8)
+            lock = threading.Lock()
+            pushed: list[str] = []
+            emailed: list[str] = []
+
+            def _push_sender(target, data):
+                with lock:
+                    pushed.append(json.loads(data)["op"])
+
+            def _email_sender(message):
+                with lock:
+                    emailed.append(message.get("To"))
+                return "msg"
+
+            result = dispatch_pending_digest_notifications(
+                limit=100,
+                push_sender=_push_sender,
+                email_sender=_email_sender,
+            )
+
+            self.assertEqual(result["processed"], 8)
+            self.assertEqual(result["sent"], 8)
+            self.assertEqual(sorted(pushed), ["k0abc", "k2abc", "k4abc", "k6abc"])
+            self.assertEqual(
+                sorted(emailed),
+                [f"k{index}abc@example.com" for index in (1, 3, 5, 7)],
+            )
+
+            # Everything is sent, so a second run finds nothing pending.
+            again = dispatch_pending_digest_notifications(
+                limit=100,
+                push_sender=_push_sender,
+                email_sender=_email_sender,
+            )
+            self.assertEqual(again["processed"], 0)
+
+    def test_email_fallback_shares_pooled_smtp_connections(self):
+        connections = []
+
+        class _SMTP:
+            def __init__(self, host, port, timeout):
+                self.sent = []
+                connections.append(self)
+
+            def starttls(self):
+                pass
+
+            def login(self, user, password):
+                pass
+
+            def send_message(self, message):
+                self.sent.append(message["To"])
+                return {}
+
+            def quit(self):
+                pass
+
+        self.app.config.update(
+            DIGEST_SMTP_HOST="smtp.example.com",
+            DIGEST_SMTP_FROM_EMAIL="info@mobilelotw.org",
+            DIGEST_EMAIL_WORKERS=2,
+        )
+        with self.app.app_context():
+            self._seed_batches(count=8)
+            with patch("app.services.digest_email.smtplib.SMTP", _SMTP):
+                result = dispatch_pending_digest_notifications(
+                    limit=100,
+                    push_sender=lambda *_args: None,
+                )
+
+            self.assertEqual(result["sent"], 8)
+            self.assertLessEqual(len(connections), 2)
+            self.assertEqual(sum(len(connection.sent) for connection in connections), 4)
+
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                message_ids = session_.scalars(
+                    select(NotificationDelivery.provider_message_id).where(
+                        NotificationDelivery.channel == "email",
+                        NotificationDelivery.status == "sent",
+                    )
+                ).all()
+                self.assertEqual(len(message_ids), 4)
+                self.assertTrue(all(message_ids))
+
+    def test_fresh_claims_are_not_dispatched_twice(self):
+        with self.app.app_context():
+            batch_ids = self._seed_batches(count=2)
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k0abc", session=session_)
+                session_.add(
+                    NotificationDelivery(
+                        user_id=user.id,
+                        digest_batch_id=batch_ids["k0abc"],
+                        channel="web_push",
+                        status="claimed",
+                        claimed_at=datetime.now(tz=timezone.utc),
+                    )
+                )
+
+            result = dispatch_pending_digest_notifications(
+                limit=100,
+                push_sender=lambda *_args: None,
+                email_sender=lambda _message: "msg",
+            )
+            self.assertEqual(result["processed"], 1)
+
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                claimed = session_.scalar(
+                    select(NotificationDelivery.status).where(
+                        NotificationDelivery.digest_batch_id == batch_ids["k0abc"],
+                        NotificationDelivery.channel == "web_push",
+                    )
+                )
+                self.assertEqual(claimed, "claimed")
+
+            # Once the claim goes stale another dispatcher may take it over.
+            self.app.config["DIGEST_DISPATCH_CLAIM_TTL_SECONDS"] = -1
+            result = dispatch_pending_digest_notifications(
+                limit=100,
+                push_sender=lambda *_args: None,
+                email_sender=lambda _message: "msg",
+            )
+            self.assertEqual(result["processed"], 1)
+            self.assertEqual(result["sent"], 1)
+
+    def test_multi_device_push_records_outcomes_in_one_update(self):
+        with self.app.app_context():
+            batch_ids = self._seed_batches(count=1)
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k0abc", session=session_)
+                for name in ("gone", "flaky"):
+                    session_.add(
+                        WebPushSubscription(
+                            user_id=user.id,
+                            endpoint=f"https://push.example/{name}",
+                            p256dh_key="abc",
+                            auth_key="def",
+                            status="active",
+                            failure_count=2,
+                        )
+                    )
+
+            payloads: list[str] = []
+
+            def _push_sender(target, data):
+                payloads.append(data)
+                if target.endpoint.endswith("/gone"):
+                    raise WebPushPermanentError("endpoint_gone_410")
+                if target.endpoint.endswith("/flaky"):
+                    raise WebPushTemporaryError("web_push_error_503")
+
+            statements: list[str] = []
+
+            def _capture(_conn, _cursor, statement, *_args):
+                statements.append(statement)
+
+            engine = self.app.config.get("SESSION_MAKER").kw["bind"]
+            event.listen(engine, "before_cursor_execute", _capture)
+            try:
+                result = dispatch_digest_notifications_for_batch(
+                    batch_id=batch_ids["k0abc"],
+                    push_sender=_push_sender,
+                    email_sender=lambda _message: "msg",
+                )
+            finally:
+                event.remove(engine, "before_cursor_execute", _capture)
+
+            self.assertEqual(result["push_status"], "sent")
+            self.assertEqual(len(payloads), 3)
+            self.assertEqual(len(set(payloads)), 1)
+            self.assertEqual(
+                len(
+                    [
+                        statement
+                        for statement in statements
+                        if statement.startswith("UPDATE web_push_subscriptions")
+                    ]
+                ),
+                1,
+            )
+
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                rows = {
+                    row.endpoint.rsplit("/", 1)[-1]: row
+                    for row in session_.scalars(select(WebPushSubscription))
+                }
+                self.assertEqual(rows["k0abc"].failure_count, 0)
+                self.assertIsNotNone(rows["k0abc"].last_success_at)
+                self.assertEqual(
+                    (rows["gone"].status, rows["gone"].failure_count), ("invalid", 3)
+                )
+                self.assertEqual(
+                    (rows["flaky"].status, rows["flaky"].failure_count), ("active", 3)
+                )
+                self.assertIsNone(rows["flaky"].last_success_at)
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_bucket_allows_burst_then_reports_wait(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertGreater(bucket.try_acquire(), 0)
+        self.assertFalse(bucket.acquire(tokens=2, timeout=0.01))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+from email.message import EmailMessage
+import smtplib
+import unittest
+from unittest.mock import patch
+
+from app.services.digest_email import DigestEmailSendError, SMTPConnectionPool
+
+
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP that records the session lifecycle."""
+
+    instances: list["FakeSMTP"] = []
+    fail_next_send: list[BaseException] = []
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.logins = 0
+        self.starttls_calls = 0
+        self.sent: list[str] = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        self.starttls_calls += 1
+
+    def login(self, user, password):
+        self.logins += 1
+
+    def send_message(self, message):
+        if FakeSMTP.fail_next_send:
+            raise FakeSMTP.fail_next_send.pop(0)
+        self.sent.append(message["To"])
+        return {}
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+def _message(to: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "info@mobilelotw.org"
+    message["To"] = to
+    message.set_content("hi")
+    return message
+
+
+class SMTPConnectionPoolTests(unittest.TestCase):
+    def setUp(self):
+        FakeSMTP.instances = []
+        FakeSMTP.fail_next_send = []
+
+    def _pool(self, **overrides) -> SMTPConnectionPool:
+        options = {
+            "host": "smtp.example.com",
+            "username": "user",
+            "password": "secret",
+            "smtp_factory": FakeSMTP,
+        }
+        options.update(overrides)
+        return SMTPConnectionPool(**options)
+
+    def test_reuses_one_authenticated_connection(self):
+        with self._pool(max_size=1) as pool:
+            message_ids = [pool.send(_message(f"n{index}@example.com")) for index in range(5)]
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        client = FakeSMTP.instances[0]
+        self.assertEqual((client.starttls_calls, client.logins), (1, 1))
+        self.assertEqual(len(client.sent), 5)
+        self.assertTrue(client.closed)
+        self.assertEqual(len(set(message_ids)), 5)
+        self.assertTrue(all(message_ids))
+
+    def test_reconnects_when_server_drops_connection(self):
+        with self._pool() as pool:
+            pool.send(_message("a@example.com"))
+            FakeSMTP.fail_next_send.append(smtplib.SMTPServerDisconnected("gone"))
+            pool.send(_message("b@example.com"))
+
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertEqual(FakeSMTP.instances[1].sent, ["b@example.com"])
+        self.assertEqual(pool.connections_opened, 2)
+
+    def test_rejected_message_keeps_connection(self):
+        with self._pool() as pool:
+            FakeSMTP.fail_next_send.append(
+                smtplib.SMTPRecipientsRefused({"bad@example.com": (550, b"no")})
+            )
+            with self.assertRaises(DigestEmailSendError) as context:
+                pool.send(_message("bad@example.com"))
+            pool.send(_message("good@example.com"))
+
+        self.assertIn("smtp_recipients_refused", str(context.exception))
+        self.assertEqual(len(FakeSMTP.instances), 1)
+
+    def test_recycles_connection_after_message_limit(self):
+        with self._pool(max_messages_per_connection=2) as pool:
+            for index in range(5):
+                pool.send(_message(f"n{index}@example.com"))
+
+        self.assertEqual(len(FakeSMTP.instances), 3)
+
+    def test_from_config_uses_smtplib_by_default(self):
+        config = {
+            "DIGEST_SMTP_HOST": "smtp.example.com",
+            "DIGEST_SMTP_FROM_EMAIL": "info@mobilelotw.org",
+            "DIGEST_SMTP_STARTTLS": False,
+        }
+        with patch("app.services.digest_email.smtplib.SMTP", FakeSMTP):
+            with SMTPConnectionPool.from_config(config) as pool:
+                pool.send(_message("a@example.com"))
+
+        self.assertEqual(FakeSMTP.instances[0].starttls_calls, 0)
+        self.assertEqual(FakeSMTP.instances[0].logins, 0)
+
+        with self.assertRaises(DigestEmailSendError):
+            SMTPConnectionPool.from_config({})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,7 @@ import unittest
 from pathlib import Path
 from unittest.mock import patch
 
-from sqlalchemy import select
+from sqlalchemy import select, text
 
 from app import create_app
 from app.database.queries import ensure_notification_preference, ensure_user
@@ -18,6 +18,7 @@ from app.services.digest_notifications import (
     dispatch_digest_notifications_for_batch,
     dispatch_pending_digest_notifications,
 )
+from app.services.digest_retention import run_digest_retention
 
 
 class DigestNotificationTests(unittest.TestCase):
@@ -227,6 +228,7 @@ class DigestNotificationTests(unittest.TestCase):
                         status="sent",
                     )
                 )
+                session_.get(QSLDigestBatch, old_batch_id).dispatch_status = "sent"
 
             result = dispatch_pending_digest_notifications(limit=1)
             self.assertEqual(result["processed"], 1)
@@ -240,7 +242,46 @@ class DigestNotificationTests(unittest.TestCase):
                 )
                 self.assertIsNotNone(new_batch_delivery)
 
-    def test_dispatch_pending_cleans_up_old_digest_rows(self):
+    def test_dispatch_marks_batch_sent_and_leaves_pending_queue(self):
+        with self.app.app_context():
+            batch_id = self._seed_user_and_batch(add_subscription=False)
+
+            first = dispatch_pending_digest_notifications(
+                limit=10, email_sender=lambda _message: "msg-1"
+            )
+            self.assertEqual(first["sent"], 1)
+
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                batch = session_.get(QSLDigestBatch, batch_id)
+                self.assertEqual(batch.dispatch_status, "sent")
+                self.assertIsNotNone(batch.dispatched_at)
+
+            second = dispatch_pending_digest_notifications(
+                limit=10, email_sender=lambda _message: "msg-2"
+            )
+            self.assertEqual(second["processed"], 0)
+
+    def test_pending_batches_are_found_through_partial_index(self):
+        with self.app.app_context():
+            self._seed_user_and_batch(add_subscription=False)
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                statement = (
+                    select(QSLDigestBatch.id, QSLDigestBatch.user_id)
+                    .where(QSLDigestBatch.dispatch_status == "pending")
+                    .order_by(QSLDigestBatch.generated_at.asc(), QSLDigestBatch.id.asc())
+                    .limit(10)
+                )
+                compiled = statement.compile(
+                    dialect=session_.bind.dialect,
+                    compile_kwargs={"literal_binds": True},
+                )
+                plan = " ".join(
+                    str(row[-1])
+                    for row in session_.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+                )
+                self.assertIn("ix_qsl_digest_batches_pending", plan)
+
+    def test_retention_cleans_up_old_digest_rows_outside_dispatch(self):
         with self.app.app_context():
             self.app.config["DIGEST_RETENTION_DAYS"] = 1
             old_batch_id = self._seed_user_and_batch(
@@ -260,6 +301,12 @@ class DigestNotificationTests(unittest.TestCase):
                 )
 
             dispatch_pending_digest_notifications(limit=10)
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                self.assertIsNotNone(session_.get(QSLDigestBatch, old_batch_id))
+
+            result = run_digest_retention()
+            self.assertEqual(result["deleted_batches"], 1)
+            self.assertGreaterEqual(result["deleted_deliveries"], 1)
 
             with self.app.config.get("SESSION_MAKER").begin() as session_:
                 old_batch = session_.scalar(
@@ -273,6 +320,54 @@ class DigestNotificationTests(unittest.TestCase):
                 self.assertIsNone(old_batch)
                 self.assertIsNone(old_delivery)
 
+    def test_retention_deletes_in_chunks_and_keeps_recent_rows(self):
+        with self.app.app_context():
+            old_batch_ids = [
+                self._seed_user_and_batch(
+                    add_subscription=False,
+                    digest_date=date(2020, 1, day),
+                )
+                for day in range(1, 6)
+            ]
+            recent_batch_id = self._seed_user_and_batch(
+                add_subscription=False,
+                digest_date=datetime.now(tz=timezone.utc).date(),
+            )
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                session_.add_all(
+                    [
+                        NotificationDelivery(
+                            user_id=user.id,
+                            digest_batch_id=batch_id,
+                            channel="web_push",
+                            status="sent",
+                        )
+                        for batch_id in old_batch_ids + [recent_batch_id]
+                    ]
+                )
+                session_.add(
+                    NotificationDelivery(
+                        user_id=user.id,
+                        channel="email",
+                        status="failed",
+                        created_at=datetime(2020, 1, 1, tzinfo=timezone.utc),
+                    )
+                )
+
+            result = run_digest_retention(retention_days=30, chunk_size=2)
+
+            self.assertEqual(result["deleted_batches"], 5)
+            self.assertEqual(result["deleted_deliveries"], 6)
+            self.assertIn("rows_per_second", result)
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                remaining = session_.scalars(select(QSLDigestBatch.id)).all()
+                self.assertEqual(remaining, [recent_batch_id])
+                deliveries = session_.scalars(
+                    select(NotificationDelivery.digest_batch_id)
+                ).all()
+                self.assertEqual(deliveries, [recent_batch_id])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -192,6 +192,28 @@ class DigestRoutesApiTests(unittest.TestCase):
                 self.assertIsNotNone(subscription)
                 self.assertEqual(subscription.status, "unsubscribed")
 
+    def test_web_push_subscribe_makes_digest_due_again(self):
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = get_user(op="k1abc", session=session_)
+                user.notification_preference.next_digest_due_at = datetime(
+                    2026, 2, 15, 8, 0, tzinfo=timezone.utc
+                )
+
+        response = self.client.post(
+            "/api/v1/notifications/web-push/subscribe",
+            json={
+                "endpoint": "https://example.push/sub-1",
+                "keys": {"p256dh": "abc", "auth": "def"},
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = get_user(op="k1abc", session=session_)
+                self.assertIsNone(user.notification_preference.next_digest_due_at)
+
 
 if __name__ == "__main__":
     unittest.main()
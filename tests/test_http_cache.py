@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta, timezone
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+from app import create_app
+from app.cache import _award_cache
+from app.database.queries import ensure_user
+from app.database.table_declarations import QSOReport
+
+
+class ConditionalGetTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        db_path = Path(self._temp_dir.name) / "test_http_cache.db"
+        self._env = patch.dict(
+            os.environ,
+            {
+                "MOBILE_LOTW_SECRET_KEY": "test-secret-key",
+                "MOBILE_LOTW_DB_KEY": "abcdefghijklmnop",
+                "DB_URL": f"sqlite:///{db_path}",
+                "API_KEY": "test-api-key",
+                "DEPLOY_SCRIPT_PATH": "/tmp/deploy.sh",
+                "SESSION_CACHE_EXPIRATION": "30",
+                "MOBILE_LOTW_SECURE_COOKIES": "0",
+            },
+            clear=False,
+        )
+        self._env.start()
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+        self.client = self.app.test_client()
+        _award_cache.clear()
+
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                user.qso_reports_last_update_time = datetime.now(tz=timezone.utc)
+                session_.add(user)
+                session_.flush()
+
+                base = datetime(2026, 2, 19, 12, 0, tzinfo=timezone.utc)
+                for index in range(3):
+                    session_.add(
+                        QSOReport(
+                            user_id=user.id,
+                            call=f"W{index}AW",
+                            gridsquare="FN31",
+                            latitude=41.5,
+                            longitude=-72.9,
+                            app_lotw_qso_timestamp=base + timedelta(minutes=index),
+                            app_lotw_rxqsl=base + timedelta(hours=index),
+                        )
+                    )
+
+        with self.client.session_transaction() as flask_session:
+            flask_session["logged_in"] = True
+            flask_session["op"] = "k1abc"
+
+    def tearDown(self):
+        _award_cache.clear()
+        self._env.stop()
+        self._temp_dir.cleanup()
+
+    def test_qsls_revalidates_once_rows_are_seen(self):
+        first = self.client.get("/qsls")
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.headers.get("ETag"))
+        self.assertIn("Cookie", first.headers.get("Vary"))
+
+        # Viewing marked the rows seen, so the old validator no longer matches.
+        second = self.client.get(
+            "/qsls", headers={"If-None-Match": first.headers["ETag"]}
+        )
+        self.assertEqual(second.status_code, 200)
+
+        third = self.client.get(
+            "/qsls", headers={"If-None-Match": second.headers["ETag"]}
+        )
+        self.assertEqual(third.status_code, 304)
+        self.assertEqual(third.get_data(), b"")
+
+        with patch(
+            "app.blueprints.awards.qsls.enqueue_qso_import", return_value=False
+        ) as enqueue:
+            reloaded = self.client.get(
+                "/qsls?force_reload=1",
+                headers={"If-None-Match": second.headers["ETag"]},
+            )
+        enqueue.assert_called_once_with(op="k1abc")
+        self.assertEqual(reloaded.status_code, 200)
+
+    def test_qsls_not_modified_without_touching_qso_reports(self):
+        first = self.client.get("/qsls")
+        second = self.client.get("/qsls", headers={"If-None-Match": first.headers["ETag"]})
+        statements: list[str] = []
+
+        def _capture(_conn, _cursor, statement, *_args):
+            statements.append(statement)
+
+        engine = self.app.config.get("SESSION_MAKER").kw["bind"]
+        event.listen(engine, "before_cursor_execute", _capture)
+        try:
+            third = self.client.get(
+                "/qsls", headers={"If-None-Match": second.headers["ETag"]}
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", _capture)
+
+        self.assertEqual(third.status_code, 304)
+        self.assertFalse(
+            [statement for statement in statements if "FROM qso_reports" in statement]
+        )
+
+    def test_qsls_ignores_if_modified_since(self):
+        first = self.client.get("/qsls")
+        self.assertIsNone(first.headers.get("Last-Modified"))
+
+        # Rows seen, sync status and LoTW health change the page without
+        # moving the last update time, so a date alone never earns a 304.
+        second = self.client.get(
+            "/qsls", headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+        )
+        self.assertEqual(second.status_code, 200)
+
+    def test_map_data_returns_not_modified_for_matching_etag(self):
+        first = self.client.get("/api/v1/get_map_data?json=1")
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("FN31", first.get_json())
+
+        with patch(
+            "app.blueprints.api.get_map_data.get_user_qsos_for_map_by_rxqso"
+        ) as rebuild:
+            second = self.client.get(
+                "/api/v1/get_map_data?json=1",
+                headers={"If-None-Match": first.headers["ETag"]},
+            )
+            rebuild.assert_not_called()
+        self.assertEqual(second.status_code, 304)
+
+        # The plain-text variant carries its own validator.
+        third = self.client.get(
+            "/api/v1/get_map_data",
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+        self.assertEqual(third.status_code, 200)
+
+    def test_award_page_short_circuits_before_rendering(self):
+        parsed_at = datetime(2026, 2, 19, 12, 0, tzinfo=timezone.utc)
+        _award_cache["k1abc:dxcc"] = ([], parsed_at)
+
+        first = self.client.get("/dxcc")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(
+            first.headers.get("Last-Modified"), "Thu, 19 Feb 2026 12:00:00 GMT"
+        )
+
+        with patch("app.cache.parse_award") as parse_award:
+            by_etag = self.client.get(
+                "/dxcc", headers={"If-None-Match": first.headers["ETag"]}
+            )
+            by_date = self.client.get(
+                "/dxcc",
+                headers={"If-Modified-Since": first.headers["Last-Modified"]},
+            )
+            parse_award.assert_not_called()
+        self.assertEqual(by_etag.status_code, 304)
+        self.assertEqual(by_date.status_code, 304)
+
+        _award_cache["k1abc:dxcc"] = ([], parsed_at + timedelta(minutes=5))
+        changed = self.client.get(
+            "/dxcc", headers={"If-None-Match": first.headers["ETag"]}
+        )
+        self.assertEqual(changed.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
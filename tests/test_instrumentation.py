@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+import os
+import re
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import select
+
+from app import create_app
+from app.database.queries import ensure_user
+from app.database.table_declarations import QSOReport, User
+from app.instrumentation import track_queries
+
+
+class QueryInstrumentationTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        db_path = Path(self._temp_dir.name) / "test_instrumentation.db"
+        self._env = patch.dict(
+            os.environ,
+            {
+                "MOBILE_LOTW_SECRET_KEY": "test-secret-key",
+                "MOBILE_LOTW_DB_KEY": "abcdefghijklmnop",
+                "DB_URL": f"sqlite:///{db_path}",
+                "API_KEY": "test-api-key",
+                "DEPLOY_SCRIPT_PATH": "/tmp/deploy.sh",
+                "SESSION_CACHE_EXPIRATION": "30",
+                "MOBILE_LOTW_SECURE_COOKIES": "0",
+            },
+            clear=False,
+        )
+        self._env.start()
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                user.qso_reports_last_update_time = datetime.now(tz=timezone.utc)
+                session_.add(user)
+                session_.flush()
+
+                base = datetime(2026, 2, 19, 12, 0, tzinfo=timezone.utc)
+                for index in range(30):
+                    session_.add(
+                        QSOReport(
+                            user_id=user.id,
+                            call=f"W{index}AW",
+                            app_lotw_qso_timestamp=base + timedelta(minutes=index),
+                            app_lotw_rxqsl=base + timedelta(hours=index),
+                        )
+                    )
+
+        with self.client.session_transaction() as flask_session:
+            flask_session["logged_in"] = True
+            flask_session["op"] = "k1abc"
+
+    def tearDown(self):
+        self._env.stop()
+        self._temp_dir.cleanup()
+
+    def test_qsls_stays_within_query_budget(self):
+        with track_queries() as stats:
+            response = self.client.get("/qsls")
+
+        self.assertEqual(response.status_code, 200)
+        # Independent of how many rows are on the page.
+        self.assertLessEqual(stats.statements, 10)
+        self.assertGreater(stats.db_seconds, 0)
+
+    def test_server_timing_header_reports_db_time(self):
+        response = self.client.get("/qsls")
+        self.assertNotIn("Server-Timing", response.headers)
+
+        self.app.config["SERVER_TIMING_ENABLED"] = True
+        response = self.client.get("/qsls")
+        match = re.fullmatch(
+            r'db;dur=([0-9.]+);desc="(\d+) queries"', response.headers["Server-Timing"]
+        )
+        self.assertIsNotNone(match)
+        self.assertGreater(int(match.group(2)), 0)
+
+    def test_slow_queries_are_logged_and_recorded(self):
+        self.app.config["SQL_SLOW_QUERY_MS"] = 0
+        with self.app.app_context():
+            with self.assertLogs(self.app.logger, level="WARNING") as logs:
+                with track_queries(label="job test") as stats:
+                    with self.app.config.get("SESSION_MAKER").begin() as session_:
+                        session_.scalar(select(User.id).where(User.op == "k1abc"))
+
+        self.assertEqual(stats.statements, 1)
+        self.assertEqual(len(stats.slow_queries), 1)
+        self.assertTrue(any("Slow SQL" in line and "job test" in line for line in logs.output))
+
+    def test_nested_tracking_counts_in_every_block(self):
+        with self.app.app_context():
+            with track_queries() as outer:
+                with self.app.config.get("SESSION_MAKER").begin() as session_:
+                    session_.scalar(select(User.id))
+                    with track_queries() as inner:
+                        session_.scalar(select(User.id))
+
+        self.assertEqual(inner.statements, 1)
+        self.assertEqual(outer.statements, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,274 @@
+import os
+import tempfile
+import unittest
+from io import BytesIO
+from itertools import count
+from pathlib import Path
+from threading import Event
+from unittest.mock import patch
+
+from requests import RequestException, Response
+
+from app import create_app, lotw
+from app.database.queries import ensure_user, get_user
+from app.lotw import LotwTransientError
+from app.metrics import LOTW_HEDGED_REQUESTS, LOTW_REQUESTS_REJECTED
+from app.rate_limit import CircuitBreaker
+from app.urls import DXCC_PAGE_URL, QSOS_URL
+
+
+def _response(status_code: int, body: bytes = b"<html>ok</html>") -> Response:
+    response = Response()
+    response.status_code = status_code
+    response._content = body
+    return response
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self._clock = patch("app.rate_limit.monotonic", side_effect=lambda: self.now)
+        self._clock.start()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    def tearDown(self):
+        self._clock.stop()
+
+    def test_opens_after_consecutive_failures(self):
+        self.assertFalse(self.breaker.record_failure())
+        self.assertFalse(self.breaker.record_failure())
+        self.breaker.record_success()
+        self.assertFalse(self.breaker.record_failure())
+        self.assertFalse(self.breaker.record_failure())
+        self.assertTrue(self.breaker.allow())
+
+        self.assertTrue(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_lets_one_probe_through(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+        self.now += 30
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+        self.assertTrue(self.breaker.record_success())
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_probe_reopens_circuit(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.now += 29
+        self.assertFalse(self.breaker.allow())
+        self.now += 1
+        self.assertTrue(self.breaker.allow())
+
+    def test_lost_probe_is_replaced_after_reset_timeout(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+
+
+class _LotwAppTestCase(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        db_path = Path(self._temp_dir.name) / "test_lotw_guard.db"
+        self._env = patch.dict(
+            os.environ,
+            {
+                "MOBILE_LOTW_SECRET_KEY": "test-secret-key",
+                "MOBILE_LOTW_DB_KEY": "abcdefghijklmnop",
+                "DB_URL": f"sqlite:///{db_path}",
+                "API_KEY": "test-api-key",
+                "DEPLOY_SCRIPT_PATH": "/tmp/deploy.sh",
+                "SESSION_CACHE_EXPIRATION": "30",
+                "LOTW_CIRCUIT_FAILURE_THRESHOLD": "2",
+                "LOTW_CIRCUIT_RESET_SECONDS": "60",
+            },
+            clear=False,
+        )
+        self._env.start()
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                for op in ("k1abc", "w1aw"):
+                    user = ensure_user(op=op, session=session_)
+                    user.lotw_cookies = {"lotw_session": "cookie-value"}
+                    session_.add(user)
+
+    def tearDown(self):
+        self._env.stop()
+        self._temp_dir.cleanup()
+
+
+class LotwGuardTests(_LotwAppTestCase):
+    def test_open_circuit_short_circuits_requests(self):
+        with self.app.app_context():
+            with patch("app.lotw.r_get", return_value=_response(503)) as r_get:
+                for _ in range(2):
+                    with self.assertRaises(LotwTransientError):
+                        lotw.get("https://lotw.arrl.org/lotwuser/awardaccount", op="k1abc")
+                self.assertEqual(r_get.call_count, 2)
+
+                rejected_before = LOTW_REQUESTS_REJECTED.value(reason="circuit_open")
+                with self.assertRaises(LotwTransientError) as raised:
+                    lotw.get("https://lotw.arrl.org/lotwuser/awardaccount", op="w1aw")
+                self.assertEqual(raised.exception.status_code, 503)
+                self.assertEqual(r_get.call_count, 2)
+                self.assertEqual(
+                    LOTW_REQUESTS_REJECTED.value(reason="circuit_open"), rejected_before + 1
+                )
+
+    def test_timeouts_count_towards_the_circuit_and_success_resets_it(self):
+        with self.app.app_context():
+            guard = lotw.lotw_guard()
+            with patch("app.lotw.r_get", side_effect=RequestException("timed out")):
+                with self.assertRaises(LotwTransientError):
+                    lotw.get("https://lotw.arrl.org/lotwuser/awardaccount", op="k1abc")
+            with patch("app.lotw.r_get", return_value=_response(200)):
+                lotw.get("https://lotw.arrl.org/lotwuser/awardaccount", op="k1abc")
+            with patch("app.lotw.r_get", side_effect=RequestException("timed out")):
+                with self.assertRaises(LotwTransientError):
+                    lotw.get("https://lotw.arrl.org/lotwuser/awardaccount", op="k1abc")
+
+            self.assertEqual(guard.breaker.state, CircuitBreaker.CLOSED)
+            self.assertIs(lotw.lotw_guard(), guard)
+
+    def test_page_request_limit_pages_open_the_circuit(self):
+        overload = b"<html><body>Page Request Limit!</body></html>"
+        with self.app.app_context():
+            guard = lotw.lotw_guard()
+            for _ in range(2):
+                with patch("app.lotw.r_get", return_value=_response(200, overload)):
+                    with self.assertRaises(LotwTransientError) as raised:
+                        lotw.get("https://lotw.arrl.org/lotwuser/awardaccount", op="k1abc")
+                self.assertEqual(raised.exception.status_code, 429)
+
+            self.assertEqual(guard.breaker.state, CircuitBreaker.OPEN)
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = get_user(op="k1abc", session=session_)
+                self.assertEqual(user.lotw_auth_state, "transient_error")
+                self.assertEqual(user.lotw_last_fail_reason, "http_429")
+
+    def test_per_user_limit_rejects_without_calling_lotw(self):
+        self.app.config.update(
+            LOTW_USER_RATE_PER_SECOND=0.01,
+            LOTW_USER_RATE_BURST=1,
+            LOTW_RATE_LIMIT_MAX_WAIT_SECONDS=0,
+        )
+        with self.app.app_context():
+            with patch("app.lotw.r_get", return_value=_response(200)) as r_get:
+                lotw.get("https://lotw.arrl.org/lotwuser/awardaccount", op="k1abc")
+                with self.assertRaises(LotwTransientError) as raised:
+                    lotw.get("https://lotw.arrl.org/lotwuser/awardaccount", op="k1abc")
+                lotw.get("https://lotw.arrl.org/lotwuser/awardaccount", op="w1aw")
+
+            self.assertEqual(raised.exception.status_code, 429)
+            self.assertEqual(r_get.call_count, 2)
+
+
+class RequestProfileTests(_LotwAppTestCase):
+    def test_adif_reports_stream_with_their_own_read_timeout(self):
+        report = _response(200)
+        report._content = False
+        report.raw = BytesIO(b"<eoh>\n<CALL:4>W1AW<eor>\n")
+        with self.app.app_context():
+            with patch("app.lotw.r_get", return_value=report) as r_get:
+                response = lotw.get(QSOS_URL.format("2026-01-01"), op="k1abc")
+
+        self.assertEqual(response.content, b"<eoh>\n<CALL:4>W1AW<eor>\n")
+        self.assertEqual(r_get.call_args.kwargs["timeout"], (5, 120))
+        self.assertTrue(r_get.call_args.kwargs["stream"])
+
+    def test_adif_download_past_its_deadline_is_transient(self):
+        report = _response(200)
+        report._content = False
+        report.raw = BytesIO(b"x" * 200_000)
+        self.app.config.update(LOTW_ADIF_DEADLINE_SECONDS=5)
+        with self.app.app_context():
+            with (
+                patch("app.lotw.r_get", return_value=report),
+                patch("app.lotw.monotonic", side_effect=count(0, 10)),
+            ):
+                with self.assertRaises(LotwTransientError) as raised:
+                    lotw.get(QSOS_URL.format("2026-01-01"), op="k1abc")
+
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = get_user(op="k1abc", session=session_)
+                self.assertEqual(user.lotw_auth_state, "transient_error")
+                self.assertEqual(user.lotw_last_fail_reason, "deadline_exceeded")
+
+        self.assertEqual(raised.exception.status_code, 504)
+
+    def test_adif_deadline_passed_mid_read_counts_against_the_circuit(self):
+        self.app.config.update(LOTW_ADIF_DEADLINE_SECONDS=5)
+        with self.app.app_context():
+            guard = lotw.lotw_guard()
+            for _ in range(2):
+                report = _response(200)
+                report._content = False
+                report.raw = BytesIO(b"x" * 200_000)
+                with (
+                    patch("app.lotw.r_get", return_value=report),
+                    # Within the deadline for the first chunk, past it after.
+                    patch("app.lotw.monotonic", side_effect=count(0, 3)),
+                ):
+                    with self.assertRaises(LotwTransientError):
+                        lotw.get(QSOS_URL.format("2026-01-01"), op="k1abc")
+
+            self.assertEqual(guard.breaker.state, CircuitBreaker.OPEN)
+
+    def test_award_pages_are_not_hedged_without_enough_samples(self):
+        with self.app.app_context():
+            self.app.config.update(LOTW_HEDGE_MIN_SAMPLES=10**9)
+            profile = lotw.request_profile(DXCC_PAGE_URL)
+
+        self.assertIsNone(profile.hedge_after)
+        self.assertEqual(profile.timeout, (5, 20))
+
+    def test_slow_award_page_is_hedged_past_its_p95(self):
+        release_primary = Event()
+        fast = _response(200, b"<html>hedge</html>")
+        slow = _response(200, b"<html>primary</html>")
+        slow_closed = Event()
+        slow.close = slow_closed.set
+
+        def send(url, **kwargs):
+            if r_get.call_count == 1:
+                release_primary.wait(timeout=5)
+                return slow
+            release_primary.set()
+            return fast
+
+        won_before = LOTW_HEDGED_REQUESTS.value(result="won")
+        with self.app.app_context():
+            with (
+                patch("app.lotw.LOTW_REQUEST_SECONDS.quantile", return_value=0.05),
+                patch("app.lotw.r_get", side_effect=send) as r_get,
+            ):
+                response = lotw.get(DXCC_PAGE_URL, op="k1abc")
+
+        self.assertIs(response, fast)
+        self.assertEqual(r_get.call_count, 2)
+        self.assertTrue(slow_closed.wait(timeout=5))
+        self.assertEqual(LOTW_HEDGED_REQUESTS.value(result="won"), won_before + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app import create_app
+from app.metrics import Counter, Histogram, MetricsRegistry, lotw_url_kind
+from app.urls import DXCC_PAGE_URL, QSOS_URL
+
+
+class MetricsFormatTests(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        histogram = registry.register(
+            Histogram("test_seconds", "Test latency.", labelnames=("kind",), buckets=(0.1, 1.0))
+        )
+        histogram.observe(0.05, kind="a")
+        histogram.observe(0.5, kind="a")
+        histogram.observe(5, kind="a")
+
+        text = registry.render()
+        self.assertIn("# TYPE test_seconds histogram", text)
+        self.assertIn('test_seconds_bucket{kind="a",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{kind="a",le="1"} 2', text)
+        self.assertIn('test_seconds_bucket{kind="a",le="+Inf"} 3', text)
+        self.assertIn('test_seconds_count{kind="a"} 3', text)
+        self.assertIn('test_seconds_sum{kind="a"} 5.55', text)
+
+    def test_histogram_quantile_interpolates_within_bucket(self):
+        histogram = Histogram("test_seconds", "Test latency.", buckets=(1.0, 2.0, 4.0))
+        self.assertIsNone(histogram.quantile(0.95))
+        for value in (0.5,) * 10 + (1.5,) * 8 + (3.0,) * 2:
+            histogram.observe(value)
+
+        self.assertAlmostEqual(histogram.quantile(0.5), 1.0)
+        self.assertAlmostEqual(histogram.quantile(0.95), 3.0)
+        self.assertIsNone(histogram.quantile(0.95, min_count=21))
+        histogram.observe(10.0)
+        self.assertEqual(histogram.quantile(1.0), 4.0)
+
+    def test_counter_requires_declared_labels(self):
+        counter = Counter("test_total", "Test counter.", labelnames=("outcome",))
+        counter.inc(outcome="ok")
+        counter.inc(2, outcome="ok")
+        self.assertEqual(counter.value(outcome="ok"), 3)
+        with self.assertRaises(ValueError):
+            counter.inc(status="ok")
+
+    def test_lotw_urls_map_to_low_cardinality_kinds(self):
+        self.assertEqual(lotw_url_kind(QSOS_URL.format("2026-01-01")), "adif_report")
+        self.assertEqual(lotw_url_kind(DXCC_PAGE_URL), "award_account")
+        self.assertEqual(lotw_url_kind("https://example.com/elsewhere"), "other")
+
+
+class MetricsEndpointTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        db_path = Path(self._temp_dir.name) / "test_metrics.db"
+        self._env = patch.dict(
+            os.environ,
+            {
+                "MOBILE_LOTW_SECRET_KEY": "test-secret-key",
+                "MOBILE_LOTW_DB_KEY": "abcdefghijklmnop",
+                "DB_URL": f"sqlite:///{db_path}",
+                "API_KEY": "test-api-key",
+                "DEPLOY_SCRIPT_PATH": "/tmp/deploy.sh",
+                "SESSION_CACHE_EXPIRATION": "30",
+                "MOBILE_LOTW_SECURE_COOKIES": "0",
+            },
+            clear=False,
+        )
+        self._env.start()
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self._env.stop()
+        self._temp_dir.cleanup()
+
+    def test_metrics_require_api_key(self):
+        self.assertEqual(self.client.get("/api/v1/metrics").status_code, 401)
+        response = self.client.get("/api/v1/metrics", headers={"X-API-KEY": "wrong"})
+        self.assertEqual(response.status_code, 401)
+
+    def test_metrics_render_prometheus_text(self):
+        response = self.client.get("/api/v1/metrics", headers={"X-API-KEY": "test-api-key"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        body = response.get_data(as_text=True)
+        self.assertIn("# TYPE mobile_lotw_lotw_request_duration_seconds histogram", body)
+        self.assertIn("mobile_lotw_background_queue_depth 0", body)
+        self.assertIn('mobile_lotw_background_jobs_running{job="qso_import"} 0', body)
+
+    def test_metrics_prefer_dedicated_key(self):
+        with patch.dict(os.environ, {"METRICS_API_KEY": "scrape-key"}):
+            denied = self.client.get("/api/v1/metrics", headers={"X-API-KEY": "test-api-key"})
+            allowed = self.client.get("/api/v1/metrics", headers={"X-API-KEY": "scrape-key"})
+        self.assertEqual(denied.status_code, 401)
+        self.assertEqual(allowed.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,16 +5,23 @@ import unittest
 from pathlib import Path
 from unittest.mock import patch
 
+from sqlalchemy import event
+
 from app import create_app
 from app.database.queries import (
     ensure_notification_preference,
     ensure_user,
     get_digest_batch,
+    get_enabled_digest_users,
     get_notification_preference,
     get_user,
 )
 from app.database.table_declarations import QSOReport
-from app.services.qsl_digest import compute_digest_schedule, run_due_qsl_digest_generation
+from app.services.qsl_digest import (
+    compute_digest_schedule,
+    compute_next_digest_due_at,
+    run_due_qsl_digest_generation,
+)
 
 
 class QSLDigestServiceTests(unittest.TestCase):
@@ -56,6 +63,22 @@ class QSLDigestServiceTests(unittest.TestCase):
         self.assertEqual(schedule.window_end_utc.isoformat(), "2026-02-14T14:00:00+00:00")
         self.assertEqual(schedule.window_start_utc.isoformat(), cursor.isoformat())
 
+    def test_compute_next_digest_due_at_follows_local_time(self):
+        due = compute_next_digest_due_at(
+            after_utc=datetime(2026, 3, 7, 15, 0, tzinfo=timezone.utc),
+            timezone_name="America/Chicago",
+            digest_time_local=time(8, 0),
+        )
+        # The next local 08:00 falls after the DST change.
+        self.assertEqual(due.isoformat(), "2026-03-08T13:00:00+00:00")
+
+        due = compute_next_digest_due_at(
+            after_utc=datetime(2026, 3, 9, 13, 0, tzinfo=timezone.utc),
+            timezone_name="America/Chicago",
+            digest_time_local=time(8, 0),
+        )
+        self.assertEqual(due.isoformat(), "2026-03-10T13:00:00+00:00")
+
     def test_run_due_generation_upserts_digest_batch(self):
         now_utc = datetime(2026, 2, 14, 9, 0, tzinfo=timezone.utc)
         with self.app.app_context():
@@ -100,9 +123,28 @@ class QSLDigestServiceTests(unittest.TestCase):
             self.assertEqual(first["created"], 1)
             self.assertEqual(first["updated"], 0)
 
+            # Not due again until tomorrow's digest time.
             second = run_due_qsl_digest_generation(now_utc=now_utc)
             self.assertEqual(second["created"], 0)
-            self.assertEqual(second["updated"], 1)
+            self.assertEqual(second["updated"], 0)
+            self.assertEqual(second["skipped"], 0)
+
+            # Clearing the due time (as a settings change does) re-evaluates.
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = get_user(op="k1abc", session=session_)
+                preference = get_notification_preference(
+                    user_id=user.id, session=session_
+                )
+                self.assertTrue(
+                    preference.next_digest_due_at.isoformat().startswith(
+                        "2026-02-15T08:00:00"
+                    )
+                )
+                preference.next_digest_due_at = None
+
+            third = run_due_qsl_digest_generation(now_utc=now_utc)
+            self.assertEqual(third["created"], 0)
+            self.assertEqual(third["updated"], 1)
 
             with self.app.config.get("SESSION_MAKER").begin() as session_:
                 user = get_user(op="k1abc", session=session_)
@@ -123,6 +165,183 @@ class QSLDigestServiceTests(unittest.TestCase):
                     )
                 )
 
+    def test_sharded_generation_covers_every_user_in_short_chunks(self):
+        now_utc = datetime(2026, 2, 14, 9, 0, tzinfo=timezone.utc)
+        self.app.config["DIGEST_GENERATION_CHUNK_SIZE"] = 2
+        ops = [f"k{index}abc" for index in range(5)]
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                for op in ops:
+                    user = ensure_user(op=op, session=session_)
+                    user.subscription_status = "active"
+                    user.timezone = "UTC"
+                    user.lotw_auth_state = "ok"
+                    user.lotw_cookies_b = b"encrypted-cookie-data"
+                    session_.add(user)
+                    session_.flush()
+                    preference = ensure_notification_preference(
+                        user=user, session=session_
+                    )
+                    preference.qsl_digest_enabled = True
+                    preference.qsl_digest_time_local = time(8, 0)
+
+            result = run_due_qsl_digest_generation(now_utc=now_utc, shard_count=2)
+
+            self.assertEqual(result["created"], 5)
+            self.assertEqual(
+                sorted(shard["shard"] for shard in result["shards"]), [0, 1]
+            )
+            self.assertEqual(sum(shard["users"] for shard in result["shards"]), 5)
+            self.assertTrue(all(shard["chunks"] >= 1 for shard in result["shards"]))
+
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                for op in ops:
+                    user = get_user(op=op, session=session_)
+                    self.assertIsNotNone(
+                        get_digest_batch(
+                            user_id=user.id,
+                            digest_date=datetime(2026, 2, 14).date(),
+                            session=session_,
+                        )
+                    )
+
+    def test_limit_caps_users_across_all_shards(self):
+        now_utc = datetime(2026, 2, 14, 9, 0, tzinfo=timezone.utc)
+        self.app.config["DIGEST_GENERATION_CHUNK_SIZE"] = 2
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                for index in range(6):
+                    user = ensure_user(op=f"k{index}abc", session=session_)
+                    user.subscription_status = "active"
+                    user.timezone = "UTC"
+                    user.lotw_auth_state = "ok"
+                    user.lotw_cookies_b = b"encrypted-cookie-data"
+                    session_.add(user)
+                    session_.flush()
+                    preference = ensure_notification_preference(
+                        user=user, session=session_
+                    )
+                    preference.qsl_digest_enabled = True
+                    preference.qsl_digest_time_local = time(8, 0)
+
+            result = run_due_qsl_digest_generation(now_utc=now_utc, limit=3, shard_count=3)
+
+            self.assertEqual(result["created"], 3)
+            self.assertEqual(sum(shard["users"] for shard in result["shards"]), 3)
+
+    def test_capped_runs_reach_every_due_user(self):
+        now_utc = datetime(2026, 2, 14, 9, 0, tzinfo=timezone.utc)
+        self.app.config["DIGEST_GENERATION_CHUNK_SIZE"] = 2
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                for index in range(9):
+                    user = ensure_user(op=f"k{index}abc", session=session_)
+                    user.subscription_status = "active"
+                    user.timezone = "UTC"
+                    user.lotw_auth_state = "ok"
+                    user.lotw_cookies_b = b"encrypted-cookie-data"
+                    session_.add(user)
+                    session_.flush()
+                    preference = ensure_notification_preference(
+                        user=user, session=session_
+                    )
+                    preference.qsl_digest_enabled = True
+                    preference.qsl_digest_time_local = time(8, 0)
+
+            results = [
+                run_due_qsl_digest_generation(now_utc=now_utc, limit=4, shard_count=3)
+                for _ in range(3)
+            ]
+
+            self.assertEqual(
+                [sum(shard["users"] for shard in result["shards"]) for result in results],
+                [4, 4, 1],
+            )
+            self.assertEqual(sum(result["created"] for result in results), 9)
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                self.assertEqual(
+                    get_enabled_digest_users(session=session_, due_at=now_utc), []
+                )
+
+    def test_generation_builds_batches_with_one_qsl_query(self):
+        now_utc = datetime(2026, 2, 14, 15, 0, tzinfo=timezone.utc)
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                for op, tz_name, call in (
+                    ("k1abc", "UTC", "W1AW"),
+                    ("k2abc", "America/Chicago", "N0CALL"),
+                ):
+                    user = ensure_user(op=op, session=session_)
+                    user.subscription_status = "active"
+                    user.timezone = tz_name
+                    user.lotw_auth_state = "ok"
+                    user.lotw_cookies_b = b"encrypted-cookie-data"
+                    session_.add(user)
+                    session_.flush()
+                    preference = ensure_notification_preference(
+                        user=user, session=session_
+                    )
+                    preference.qsl_digest_enabled = True
+                    preference.qsl_digest_time_local = time(8, 0)
+                    # 07:30 UTC is inside both users' windows; 13:30 UTC only
+                    # inside the Chicago user's (which ends at 14:00 UTC).
+                    for hour, minute in ((7, 30), (13, 30)):
+                        session_.add(
+                            QSOReport(
+                                user_id=user.id,
+                                call=f"{call}/{hour}",
+                                app_lotw_qso_timestamp=datetime(
+                                    2026, 2, 13, hour, tzinfo=timezone.utc
+                                ),
+                                app_lotw_rxqsl=datetime(
+                                    2026, 2, 14, hour, minute, tzinfo=timezone.utc
+                                ),
+                            )
+                        )
+
+            statements: list[str] = []
+
+            def _capture(_conn, _cursor, statement, *_args):
+                statements.append(statement)
+
+            engine = self.app.config.get("SESSION_MAKER").kw["bind"]
+            event.listen(engine, "before_cursor_execute", _capture)
+            try:
+                result = run_due_qsl_digest_generation(now_utc=now_utc)
+            finally:
+                event.remove(engine, "before_cursor_execute", _capture)
+
+            self.assertEqual(result["created"], 2)
+            qso_queries = [
+                statement for statement in statements if "FROM qso_reports" in statement
+            ]
+            self.assertEqual(len(qso_queries), 1)
+            batch_inserts = [
+                statement
+                for statement in statements
+                if statement.startswith("INSERT INTO qsl_digest_batches")
+            ]
+            self.assertEqual(len(batch_inserts), 1)
+
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                utc_user = get_user(op="k1abc", session=session_)
+                chicago_user = get_user(op="k2abc", session=session_)
+                digest_date = datetime(2026, 2, 14).date()
+                utc_batch = get_digest_batch(
+                    user_id=utc_user.id, digest_date=digest_date, session=session_
+                )
+                chicago_batch = get_digest_batch(
+                    user_id=chicago_user.id, digest_date=digest_date, session=session_
+                )
+                self.assertEqual(
+                    [item["call"] for item in utc_batch.payload_json["items"]],
+                    ["W1AW/7"],
+                )
+                self.assertEqual(
+                    [item["call"] for item in chicago_batch.payload_json["items"]],
+                    ["N0CALL/13", "N0CALL/7"],
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+import os
+import re
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import event, select
+
+from app import create_app
+from app.database.queries import ensure_user
+from app.database.table_declarations import QSOReport
+
+
+class QSLsPageTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        db_path = Path(self._temp_dir.name) / "test_qsls_page.db"
+        self._env = patch.dict(
+            os.environ,
+            {
+                "MOBILE_LOTW_SECRET_KEY": "test-secret-key",
+                "MOBILE_LOTW_DB_KEY": "abcdefghijklmnop",
+                "DB_URL": f"sqlite:///{db_path}",
+                "API_KEY": "test-api-key",
+                "DEPLOY_SCRIPT_PATH": "/tmp/deploy.sh",
+                "SESSION_CACHE_EXPIRATION": "30",
+                "MOBILE_LOTW_SECURE_COOKIES": "0",
+            },
+            clear=False,
+        )
+        self._env.start()
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                user.qso_reports_last_update_time = datetime.now(tz=timezone.utc)
+                session_.add(user)
+                session_.flush()
+
+                base = datetime(2026, 2, 19, 12, 0, tzinfo=timezone.utc)
+                for index in range(5):
+                    session_.add(
+                        QSOReport(
+                            user_id=user.id,
+                            call=f"W{index}AW",
+                            seen=index == 0,
+                            app_lotw_qso_timestamp=base + timedelta(minutes=index),
+                            app_lotw_rxqsl=base + timedelta(hours=index),
+                        )
+                    )
+
+        with self.client.session_transaction() as flask_session:
+            flask_session["logged_in"] = True
+            flask_session["op"] = "k1abc"
+
+    def tearDown(self):
+        self._env.stop()
+        self._temp_dir.cleanup()
+
+    def _engine(self):
+        return self.app.config.get("SESSION_MAKER").kw["bind"]
+
+    def test_qsls_marks_rows_seen_with_one_update(self):
+        statements: list[str] = []
+
+        def _capture(_conn, _cursor, statement, *_args):
+            statements.append(statement)
+
+        event.listen(self._engine(), "before_cursor_execute", _capture)
+        try:
+            response = self.client.get("/qsls")
+        finally:
+            event.remove(self._engine(), "before_cursor_execute", _capture)
+
+        self.assertEqual(response.status_code, 200)
+        body = response.get_data(as_text=True)
+        self.assertEqual(body.count('class="new_contact"'), 4)
+
+        updates = [
+            statement
+            for statement in statements
+            if statement.lstrip().upper().startswith("UPDATE QSO_REPORTS")
+        ]
+        self.assertEqual(len(updates), 1)
+
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                seen_flags = session_.scalars(select(QSOReport.seen)).all()
+                self.assertTrue(all(seen_flags))
+
+    def test_qsls_pages_with_before_cursor(self):
+        self.app.config["QSLS_PAGE_SIZE"] = 3
+
+        first = self.client.get("/qsls").get_data(as_text=True)
+        self.assertIn("3 Most Recent QSLs", first)
+        self.assertIn("W4AW", first)
+        self.assertNotIn("W1AW", first)
+        self.assertIn("Older QSLs", first)
+
+        older_url = re.search(r'<a href="([^"]+)">Older QSLs</a>', first).group(1)
+        second = self.client.get(older_url).get_data(as_text=True)
+        self.assertIn("Earlier QSLs", second)
+        self.assertIn("W1AW", second)
+        self.assertNotIn("W4AW", second)
+        self.assertNotIn("Older QSLs", second)
+
+
+if __name__ == "__main__":
+    unittest.main()
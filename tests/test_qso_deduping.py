@@ -1,4 +1,4 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import os
 import tempfile
 import unittest
@@ -6,9 +6,11 @@ from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import patch
 
+from sqlalchemy import event
+
 from app import create_app
 from app.database.queries import ensure_user
-from app.database.queries.qso_page import get_25_most_recent_rxqsls
+from app.database.queries.qso_page import get_25_most_recent_rxqsls, get_recent_rxqsls
 from app.database.table_declarations import QSOReport
 from app.services.qso_import import _add_reports_to_db
 
@@ -118,6 +120,77 @@ class QSODedupingTests(unittest.TestCase):
                 self.assertEqual(len(qsls), 2)
                 self.assertEqual(len(keys), 2)
 
+    def test_get_recent_rxqsls_fills_pages_despite_duplicates(self):
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                session_.add(user)
+                session_.flush()
+
+                base = datetime(2026, 2, 19, 12, 0, tzinfo=timezone.utc)
+                for index in range(30):
+                    qso_ts = base + timedelta(minutes=index)
+                    # Ten copies of each QSO used to exhaust the 250-row window.
+                    for copy in range(10):
+                        session_.add(
+                            QSOReport(
+                                user_id=user.id,
+                                call=f"W{index}AW",
+                                app_lotw_qso_timestamp=qso_ts,
+                                app_lotw_rxqsl=qso_ts + timedelta(seconds=copy),
+                            )
+                        )
+
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                first_page, cursor = get_recent_rxqsls(
+                    user=user, session=session_, limit=25
+                )
+                second_page, last_cursor = get_recent_rxqsls(
+                    user=user, session=session_, limit=25, before=cursor
+                )
+
+                self.assertEqual(len(first_page), 25)
+                self.assertEqual(first_page[0].call, "W29AW")
+                self.assertEqual(
+                    first_page[0].app_lotw_rxqsl.replace(tzinfo=timezone.utc),
+                    base + timedelta(minutes=29, seconds=9),
+                )
+                self.assertEqual(
+                    [qso.call for qso in second_page],
+                    [f"W{index}AW" for index in range(4, -1, -1)],
+                )
+                self.assertIsNone(last_cursor)
+
+    def test_get_recent_rxqsls_seeks_and_limits_in_one_query(self):
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                session_.add(user)
+                session_.flush()
+
+                statements: list[str] = []
+
+                def _capture(_conn, _cursor, statement, *_args):
+                    statements.append(statement)
+
+                engine = self.app.config.get("SESSION_MAKER").kw["bind"]
+                event.listen(engine, "before_cursor_execute", _capture)
+                try:
+                    get_recent_rxqsls(
+                        user=user,
+                        session=session_,
+                        limit=25,
+                        before=(datetime(2026, 2, 19, 12, 0), 10),
+                    )
+                finally:
+                    event.remove(engine, "before_cursor_execute", _capture)
+
+        page_queries = [statement for statement in statements if "qso_reports" in statement]
+        self.assertEqual(len(page_queries), 1)
+        self.assertNotIn("row_number", page_queries[0].lower())
+        self.assertIn("LIMIT", page_queries[0])
+
 
 if __name__ == "__main__":
     unittest.main()
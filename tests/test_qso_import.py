@@ -0,0 +1,375 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from time import time
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from requests import Response
+from sqlalchemy import select
+
+from app import create_app
+from app.database.queries import ensure_user, get_user
+from app.database.table_declarations import QSOReport
+from app.services import adif_spool, qso_import
+from app.services.qso_import import import_qsos_for_user
+from benchmarks.qso_import import SyntheticQSO, adif_report
+
+
+def _report_response(qsos: list[SyntheticQSO], last_qsl: datetime) -> Response:
+    response = Response()
+    response.status_code = 200
+    response._content = adif_report(qsos, last_qsl=last_qsl)
+    return response
+
+
+def _qso(
+    call: str,
+    rxqsl: datetime | None,
+    timestamp: datetime = datetime(2026, 1, 10, 12, 0),
+) -> SyntheticQSO:
+    return SyntheticQSO(
+        call=call,
+        timestamp=timestamp,
+        band="20M",
+        freq=14.074,
+        mode="FT8",
+        gridsquare="FN31",
+        rxqso=datetime(2026, 1, 10, 13, 0),
+        rxqsl=rxqsl,
+    )
+
+
+class QSOImportSyncStreamTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        db_path = Path(self._temp_dir.name) / "test_qso_import.db"
+        self._env = patch.dict(
+            os.environ,
+            {
+                "MOBILE_LOTW_SECRET_KEY": "test-secret-key",
+                "MOBILE_LOTW_DB_KEY": "abcdefghijklmnop",
+                "DB_URL": f"sqlite:///{db_path}",
+                "API_KEY": "test-api-key",
+                "DEPLOY_SCRIPT_PATH": "/tmp/deploy.sh",
+                "SESSION_CACHE_EXPIRATION": "30",
+            },
+            clear=False,
+        )
+        self._env.start()
+        self.app = create_app()
+        self.app.config.update(
+            TESTING=True,
+            QSO_IMPORT_SPOOL_DIR=str(Path(self._temp_dir.name) / "spool"),
+        )
+
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                user.qso_reports_last_update = date(2026, 1, 5)
+                user.lotw_cookies = {"lotw_session": "cookie-value"}
+                session_.add(user)
+
+    def tearDown(self):
+        self._env.stop()
+        self._temp_dir.cleanup()
+
+    def _import(
+        self, qsos: Response, qsls: Response | None = None, on_progress=None
+    ) -> dict[str, dict[str, list[str]]]:
+        """Run an import against canned QSO/QSL stream reports; returns the
+        query of each stream requested."""
+        queries = {}
+
+        def lotw_get(url, op, on_progress=None):
+            stream = "qso" if "qso_qsl=no" in url else "qsl"
+            queries[stream] = parse_qs(urlsplit(url).query)
+            response = qsos if stream == "qso" else qsls
+            if on_progress is not None:
+                on_progress(len(response.content), len(response.content))
+            return response
+
+        with self.app.app_context():
+            with patch("app.lotw.get", side_effect=lotw_get):
+                import_qsos_for_user("k1abc", on_progress=on_progress)
+        return queries
+
+    def _cursors(self) -> tuple[datetime | None, datetime | None]:
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = get_user(op="k1abc", session=session_)
+                cursors = (user.qso_qsl_cursor, user.qso_rx_cursor)
+        return tuple(
+            cursor.replace(tzinfo=timezone.utc) if cursor else None for cursor in cursors
+        )
+
+    def _rows(self) -> list[tuple[datetime, str, datetime | None]]:
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                return sorted(
+                    (report.app_lotw_qso_timestamp, report.call, report.app_lotw_rxqsl)
+                    for report in session_.scalars(select(QSOReport))
+                )
+
+    def _reports(self) -> dict[str, datetime | None]:
+        """``{call: rxqsl}``, after checking no QSO is stored twice."""
+        rows = self._rows()
+        keys = [(timestamp, call) for timestamp, call, _rxqsl in rows]
+        self.assertEqual(len(keys), len(set(keys)), f"duplicate QSO rows: {rows}")
+        return {call: rxqsl for _timestamp, call, rxqsl in rows}
+
+    def test_first_import_reads_only_the_qso_stream(self):
+        queries = self._import(
+            _report_response(
+                [_qso("W1AW", datetime(2026, 1, 12, 8, 30)), _qso("K9XYZ", None)],
+                last_qsl=datetime(2026, 1, 12, 8, 30),
+            )
+        )
+
+        self.assertEqual(set(queries), {"qso"})
+        self.assertEqual(queries["qso"]["qso_qsorxsince"], ["2026-01-05"])
+        self.assertEqual(
+            self._cursors(),
+            (
+                datetime(2026, 1, 12, 8, 30, tzinfo=timezone.utc),
+                datetime(2026, 1, 10, 13, 0, tzinfo=timezone.utc),
+            ),
+        )
+
+    def test_incremental_import_resumes_both_streams_with_overlap(self):
+        self._import(
+            _report_response(
+                [_qso("W1AW", datetime(2026, 1, 12, 8, 30))],
+                last_qsl=datetime(2026, 1, 12, 8, 30),
+            )
+        )
+        empty = _report_response([], last_qsl=datetime(2026, 1, 12, 8, 30))
+        queries = self._import(empty, empty)
+
+        self.assertEqual(queries["qsl"]["qso_qslsince"], ["2026-01-12 08:25:00"])
+        self.assertEqual(queries["qso"]["qso_qsorxsince"], ["2026-01-10 12:55:00"])
+
+    def test_incremental_import_merges_new_qsos_and_new_qsls(self):
+        self._import(_report_response([_qso("W1AW", None)], last_qsl=datetime(2026, 1, 1)))
+        self._import(
+            _report_response([_qso("K9XYZ", None)], last_qsl=datetime(2026, 1, 1)),
+            _report_response(
+                [_qso("W1AW", datetime(2026, 1, 14, 9, 0))],
+                last_qsl=datetime(2026, 1, 14, 9, 0),
+            ),
+        )
+
+        reports = self._reports()
+        self.assertEqual(len(self._rows()), 2)
+        self.assertEqual(set(reports), {"W1AW", "K9XYZ"})
+        self.assertEqual(reports["W1AW"], datetime(2026, 1, 14, 9, 0))
+        self.assertIsNone(reports["K9XYZ"])
+        self.assertEqual(
+            self._cursors()[0], datetime(2026, 1, 14, 9, 0, tzinfo=timezone.utc)
+        )
+
+    def test_records_resent_in_the_overlap_update_their_row(self):
+        self._import(_report_response([_qso("W1AW", None)], last_qsl=datetime(2026, 1, 1)))
+        # The overlap window re-sends W1AW on both streams, now confirmed.
+        confirmed = _report_response(
+            [_qso("W1AW", datetime(2026, 1, 14, 9, 0))],
+            last_qsl=datetime(2026, 1, 14, 9, 0),
+        )
+        self._import(confirmed, confirmed)
+
+        self.assertEqual(
+            self._rows(),
+            [(datetime(2026, 1, 10, 12, 0), "W1AW", datetime(2026, 1, 14, 9, 0))],
+        )
+
+    def test_cursor_never_moves_backwards(self):
+        self._import(
+            _report_response(
+                [_qso("W1AW", datetime(2026, 1, 12, 8, 30))],
+                last_qsl=datetime(2026, 1, 12, 8, 30),
+            )
+        )
+        self._import(
+            _report_response([], last_qsl=datetime(2026, 1, 1)),
+            _report_response(
+                [_qso("W1AW", datetime(2026, 1, 12, 8, 29))],
+                last_qsl=datetime(2026, 1, 12, 8, 29),
+            ),
+        )
+
+        self.assertEqual(
+            self._cursors()[0], datetime(2026, 1, 12, 8, 30, tzinfo=timezone.utc)
+        )
+
+    def test_import_reports_each_phase_to_its_progress_callback(self):
+        self._import(_report_response([_qso("W1AW", None)], last_qsl=datetime(2026, 1, 1)))
+        qsos = _report_response([_qso("K9XYZ", None)], last_qsl=datetime(2026, 1, 1))
+        qsls = _report_response(
+            [_qso("N0CALL", datetime(2026, 1, 14, 9, 0))],
+            last_qsl=datetime(2026, 1, 14, 9, 0),
+        )
+        events = []
+        self._import(qsos, qsls, on_progress=lambda **fields: events.append(fields))
+
+        phases = [(event["phase"], event.get("stream")) for event in events]
+        self.assertEqual(
+            list(dict.fromkeys(phases)),
+            [
+                ("downloading", "qsos"),
+                ("parsing", "qsos"),
+                ("downloading", "qsls"),
+                ("parsing", "qsls"),
+                ("writing", None),
+                ("done", None),
+            ],
+        )
+        self.assertIn(
+            {
+                "phase": "downloading",
+                "stream": "qsls",
+                "bytes": len(qsls.content),
+                "bytes_total": len(qsls.content),
+            },
+            events,
+        )
+        self.assertEqual(
+            events[-2],
+            {"phase": "writing", "rows": 2, "rows_total": 2, "inserted": 2, "updated": 0},
+        )
+        self.assertEqual(events[-1], {"phase": "done", "fetched": 2, "inserted": 2, "updated": 0})
+
+    def _fail_first_import_at_third_checkpoint(self) -> Response:
+        """Start a first import of five QSOs in checkpoints of two that fails
+        writing the third; returns the report LoTW served."""
+        self.app.config.update(QSO_IMPORT_CHECKPOINT_ROWS=2)
+        report = _report_response(
+            [
+                _qso(
+                    f"W{index}AW", None, datetime(2026, 1, 10, 12, 0) + timedelta(minutes=index)
+                )
+                for index in range(5)
+            ],
+            last_qsl=datetime(2026, 1, 1),
+        )
+        add_reports = qso_import._add_reports_to_db
+        calls = []
+
+        def fail_third_checkpoint(**kwargs):
+            calls.append(kwargs["qso_reports"])
+            if len(calls) == 3:
+                raise RuntimeError("worker restarted")
+            return add_reports(**kwargs)
+
+        with patch(
+            "app.services.qso_import._add_reports_to_db", side_effect=fail_third_checkpoint
+        ):
+            with self.assertRaises(RuntimeError):
+                self._import(report)
+        return report
+
+    def test_failed_first_import_resumes_from_its_last_checkpoint(self):
+        self._fail_first_import_at_third_checkpoint()
+
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = get_user(op="k1abc", session=session_)
+                self.assertEqual(user.qso_sync_status, "failed")
+                self.assertFalse(user.has_imported)
+                self.assertEqual((user.qso_sync_progress, user.qso_sync_total), (4, 5))
+                spool = Path(user.qso_import_spool)
+        self.assertTrue(spool.exists())
+        self.assertEqual(len(self._reports()), 4)
+
+        # The retry reads the spool instead of LoTW and writes only the rest.
+        with self.app.app_context():
+            with patch("app.lotw.get", side_effect=AssertionError("downloaded again")):
+                result = import_qsos_for_user("k1abc")
+
+        self.assertEqual((result["fetched"], result["inserted"]), (5, 1))
+        self.assertEqual(len(self._reports()), 5)
+        # Kept for QSO_IMPORT_SPOOL_RETENTION_HOURS, for replay.
+        self.assertTrue(spool.exists())
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = get_user(op="k1abc", session=session_)
+                self.assertTrue(user.has_imported)
+                self.assertEqual(user.qso_sync_status, "idle")
+                self.assertIsNone(user.qso_import_spool)
+
+    def test_first_import_restarts_without_duplicates_once_its_spool_is_gone(self):
+        report = self._fail_first_import_at_third_checkpoint()
+        self.assertEqual(len(self._rows()), 4)
+        for path in Path(self.app.config["QSO_IMPORT_SPOOL_DIR"]).iterdir():
+            path.unlink()
+
+        # Downloaded again, re-read from the first record and matched against
+        # the four rows already committed.
+        with self.app.app_context():
+            with patch("app.lotw.get", return_value=report) as lotw_get:
+                result = import_qsos_for_user("k1abc")
+        lotw_get.assert_called_once()
+
+        self.assertEqual((result["fetched"], result["inserted"]), (5, 1))
+        self.assertEqual(len(self._rows()), 5)
+        self.assertEqual(len(self._reports()), 5)
+
+    def test_failed_incremental_import_reuses_its_spooled_reports(self):
+        self._import(_report_response([_qso("W1AW", None)], last_qsl=datetime(2026, 1, 1)))
+        qsos = _report_response([_qso("K9XYZ", None)], last_qsl=datetime(2026, 1, 1))
+        qsls = _report_response(
+            [_qso("W1AW", datetime(2026, 1, 14, 9, 0))],
+            last_qsl=datetime(2026, 1, 14, 9, 0),
+        )
+
+        with patch(
+            "app.services.qso_import._add_reports_to_db",
+            side_effect=RuntimeError("database went away"),
+        ):
+            with self.assertRaises(RuntimeError):
+                self._import(qsos, qsls)
+
+        with self.app.app_context():
+            with patch("app.lotw.get", side_effect=AssertionError("downloaded again")):
+                import_qsos_for_user("k1abc")
+
+        reports = self._reports()
+        self.assertEqual(len(self._rows()), 2)
+        self.assertEqual(set(reports), {"W1AW", "K9XYZ"})
+        self.assertEqual(reports["W1AW"], datetime(2026, 1, 14, 9, 0))
+
+        # Once the import has succeeded the next one downloads afresh.
+        with self.app.app_context():
+            with patch("app.lotw.get", return_value=qsos) as lotw_get:
+                import_qsos_for_user("k1abc")
+                self.assertEqual(lotw_get.call_count, 2)
+
+    def test_identical_reports_share_one_spool_file_until_they_expire(self):
+        with self.app.app_context():
+            first = adif_spool.store(b"<eoh>\n")
+            self.assertEqual(adif_spool.store(b"<eoh>\n"), first)
+            self.assertEqual(adif_spool.read(first), b"<eoh>\n")
+            self.assertTrue(first.name.endswith(".adi.gz"))
+
+            fresh = adif_spool.store(b"<eoh>\n<CALL:4>W1AW<eor>\n")
+            stale = time() - 25 * 3600
+            os.utime(first, (stale, stale))
+
+            self.assertEqual(adif_spool.purge_expired(), 1)
+            self.assertFalse(first.exists())
+            self.assertTrue(fresh.exists())
+
+    @unittest.skipUnless(hasattr(os, "getuid"), "POSIX permissions")
+    def test_spool_is_private_to_the_app_user(self):
+        with self.app.app_context():
+            path = adif_spool.store(b"<eoh>\n")
+            adif_spool.remember(user_id=1, url="https://lotw.example/report", path=path)
+
+            self.assertEqual(adif_spool.spool_dir().stat().st_mode & 0o777, 0o700)
+            for spooled in adif_spool.spool_dir().iterdir():
+                self.assertEqual(spooled.stat().st_mode & 0o777, 0o600)
+
+
+if __name__ == "__main__":
+    unittest.main()
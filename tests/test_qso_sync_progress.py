@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+from app import background_jobs, create_app
+from app.blueprints.api import qso_sync
+from app.database.queries import ensure_user, get_user
+
+
+class QSOSyncProgressTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        db_path = Path(self._temp_dir.name) / "test_qso_sync_progress.db"
+        self._env = patch.dict(
+            os.environ,
+            {
+                "MOBILE_LOTW_SECRET_KEY": "test-secret-key",
+                "MOBILE_LOTW_DB_KEY": "abcdefghijklmnop",
+                "DB_URL": f"sqlite:///{db_path}",
+                "API_KEY": "test-api-key",
+                "DEPLOY_SCRIPT_PATH": "/tmp/deploy.sh",
+                "SESSION_CACHE_EXPIRATION": "30",
+                "MOBILE_LOTW_SECURE_COOKIES": "0",
+            },
+            clear=False,
+        )
+        self._env.start()
+        self.app = create_app()
+        self.app.config.update(TESTING=True, QSO_SYNC_PROGRESS_INTERVAL_SECONDS=0)
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                user.qso_reports_last_update_time = datetime.now(tz=timezone.utc)
+                user.qso_sync_status = "syncing"
+                user.qso_sync_progress = 5000
+                user.qso_sync_total = 12000
+                session_.add(user)
+
+        with self.client.session_transaction() as flask_session:
+            flask_session["logged_in"] = True
+            flask_session["op"] = "k1abc"
+
+    def tearDown(self):
+        background_jobs._clear_running("k1abc")
+        self._env.stop()
+        self._temp_dir.cleanup()
+
+    def _set_status(self, status: str) -> None:
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                get_user(op="k1abc", session=session_).qso_sync_status = status
+
+    def _run_import_here(self, **progress) -> None:
+        """Pretend this process is running k1abc's import, at ``progress``."""
+        with background_jobs._lock:
+            background_jobs._running_ops.add("k1abc")
+        background_jobs._record_import_progress("k1abc", **progress)
+
+    def test_reports_checkpointed_progress_without_a_local_import(self):
+        response = self.client.get("/api/v1/qso_sync/progress")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Cache-Control"], "no-store")
+        self.assertEqual(
+            response.get_json(),
+            {
+                "status": "syncing",
+                "phase": None,
+                "rows": 5000,
+                "rows_total": 12000,
+                "error": None,
+            },
+        )
+
+    def test_live_progress_overrides_the_last_checkpoint(self):
+        self._run_import_here(
+            phase="writing", rows=7200, rows_total=12000, inserted=7200, updated=0
+        )
+
+        progress = self.client.get("/api/v1/qso_sync/progress").get_json()
+
+        self.assertEqual(progress["phase"], "writing")
+        self.assertEqual((progress["rows"], progress["rows_total"]), (7200, 12000))
+        self.assertNotIn("at", progress)
+
+    def test_finished_local_run_does_not_mask_another_workers_sync(self):
+        self._run_import_here(phase="done", fetched=12000, inserted=12000, updated=0)
+        background_jobs._clear_running("k1abc")
+        # Another worker has since started over and checkpointed.
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                get_user(op="k1abc", session=session_).qso_sync_progress = 200
+
+        progress = self.client.get("/api/v1/qso_sync/progress").get_json()
+
+        self.assertEqual(progress["status"], "syncing")
+        self.assertIsNone(progress["phase"])
+        self.assertEqual((progress["rows"], progress["rows_total"]), (200, 12000))
+        self.assertNotIn("fetched", progress)
+
+    def test_each_report_replaces_the_previous_phase(self):
+        self._run_import_here(phase="downloading", stream="qsos", bytes=65536, bytes_total=None)
+        background_jobs._record_import_progress("k1abc", phase="parsing", stream="qsos")
+
+        self.assertEqual(
+            {
+                key: value
+                for key, value in background_jobs.qso_import_progress("k1abc").items()
+                if key != "at"
+            },
+            {"phase": "parsing", "stream": "qsos"},
+        )
+
+    def test_event_stream_ends_when_the_sync_does(self):
+        self._run_import_here(phase="downloading", stream="qsos", bytes=65536, bytes_total=None)
+        statuses = iter(["syncing", "syncing", "idle"])
+        progress_snapshot = qso_sync._progress_snapshot
+
+        def advancing_snapshot(op):
+            status = next(statuses)
+            self._set_status(status)
+            if status == "idle":
+                background_jobs._clear_running("k1abc")
+            return progress_snapshot(op)
+
+        with patch.object(qso_sync, "_progress_snapshot", side_effect=advancing_snapshot):
+            response = self.client.get(
+                "/api/v1/qso_sync/progress", headers={"Accept": "text/event-stream"}
+            )
+            events = response.get_data(as_text=True).split("\n\n")
+
+        self.assertEqual(response.mimetype, "text/event-stream")
+        data = [
+            json.loads(event.removeprefix("data: "))
+            for event in events
+            if event.startswith("data: ")
+        ]
+        # The unchanged second snapshot is not sent again.
+        self.assertEqual([snapshot["status"] for snapshot in data], ["syncing", "idle"])
+        self.assertEqual(data[0]["bytes"], 65536)
+        self.assertIn("event: end\ndata: {}", events)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+from datetime import datetime, timezone
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app import create_app
+from app.database.queries import callsign, callsign_prefix, ensure_user
+from app.database.table_declarations import QSOReport
+
+
+class CallsignSearchTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        db_path = Path(self._temp_dir.name) / "test_search.db"
+        self._env = patch.dict(
+            os.environ,
+            {
+                "MOBILE_LOTW_SECRET_KEY": "test-secret-key",
+                "MOBILE_LOTW_DB_KEY": "abcdefghijklmnop",
+                "DB_URL": f"sqlite:///{db_path}",
+                "API_KEY": "test-api-key",
+                "DEPLOY_SCRIPT_PATH": "/tmp/deploy.sh",
+                "SESSION_CACHE_EXPIRATION": "30",
+                "MOBILE_LOTW_SECURE_COOKIES": "0",
+            },
+            clear=False,
+        )
+        self._env.start()
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                session_.add(user)
+                session_.flush()
+                other = ensure_user(op="n0other", session=session_)
+                session_.add(other)
+                session_.flush()
+
+                for index, call in enumerate(["W1AW", "w1xyz", "K1W1A", "W1_AB"]):
+                    session_.add(
+                        QSOReport(
+                            user_id=user.id,
+                            call=call,
+                            band="20M",
+                            mode="FT8",
+                            app_lotw_qso_timestamp=datetime(
+                                2026, 2, 14, index, 0, tzinfo=timezone.utc
+                            ),
+                            app_lotw_rxqsl=datetime(
+                                2026, 2, 15, index, 0, tzinfo=timezone.utc
+                            ),
+                        )
+                    )
+                session_.add(QSOReport(user_id=other.id, call="W1OTHER"))
+
+        with self.client.session_transaction() as flask_session:
+            flask_session["logged_in"] = True
+            flask_session["op"] = "k1abc"
+
+    def tearDown(self):
+        self._env.stop()
+        self._temp_dir.cleanup()
+
+    def test_callsign_matches_substring_case_insensitively(self):
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                rows = callsign(user=user, query=" w1a ", session=session_)
+
+                self.assertEqual([row.call for row in rows], ["K1W1A", "W1AW"])
+                self.assertEqual(
+                    set(rows[0]._fields),
+                    {"id", "call", "band", "mode", "app_lotw_qso_timestamp"},
+                )
+
+    def test_callsign_treats_like_wildcards_literally(self):
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                rows = callsign(user=user, query="W1_", session=session_)
+
+                self.assertEqual([row.call for row in rows], ["W1_AB"])
+
+    def test_callsign_prefix_returns_distinct_upper_case_calls(self):
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                suggestions = callsign_prefix(user=user, prefix="w1", session=session_)
+
+                self.assertEqual(list(suggestions), ["W1AW", "W1XYZ", "W1_AB"])
+
+    def test_suggest_endpoint_returns_json(self):
+        response = self.client.get("/api/v1/search/callsign/suggest?q=k1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["suggestions"], ["K1W1A"])
+
+    def test_search_qsos_api_walks_log_with_keyset_cursor(self):
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                session_.add(QSOReport(user_id=user.id, call="JA1AAA", band="40M"))
+                session_.add(QSOReport(user_id=user.id, call="JA1BBB", band="40M"))
+
+        calls = []
+        cursor = None
+        pages = 0
+        while True:
+            url = "/api/v1/search/qsos?limit=4"
+            if cursor:
+                url += f"&cursor={cursor}"
+            payload = self.client.get(url).get_json()
+            calls.extend(item["call"] for item in payload["items"])
+            pages += 1
+            cursor = payload["next_cursor"]
+            if not cursor:
+                break
+
+        self.assertEqual(pages, 2)
+        self.assertEqual(
+            calls,
+            ["W1_AB", "K1W1A", "w1xyz", "W1AW", "JA1BBB", "JA1AAA"],
+        )
+
+    def test_search_qsos_api_applies_filters(self):
+        with self.app.app_context():
+            with self.app.config.get("SESSION_MAKER").begin() as session_:
+                user = ensure_user(op="k1abc", session=session_)
+                session_.add(
+                    QSOReport(user_id=user.id, call="W1AW", band="40M", mode="CW")
+                )
+
+        response = self.client.get(
+            "/api/v1/search/qsos?call=w1&band=20m&mode=ft8"
+            "&qsl_from=2026-02-15T01:00:00&qsl_to=2026-02-15"
+        )
+        self.assertEqual(response.status_code, 200)
+        calls = [item["call"] for item in response.get_json()["items"]]
+        self.assertEqual(calls, ["W1_AB", "K1W1A", "w1xyz"])
+
+    def test_search_qsos_api_rejects_bad_input(self):
+        response = self.client.get("/api/v1/search/qsos?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "invalid_cursor")
+
+        response = self.client.get("/api/v1/search/qsos?qso_from=yesterday")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["field"], "qso_from")
+
+    def test_search_page_renders_projected_rows(self):
+        response = self.client.post("/search/callsign", data={"query": "xyz"})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_data(as_text=True)
+        self.assertIn("w1xyz", body)
+        self.assertNotIn("W1OTHER", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import base64
+import os
+import unittest
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.services.web_push import (
+    WebPushPermanentError,
+    WebPushSender,
+    WebPushTarget,
+    WebPushTemporaryError,
+)
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _vapid_private_key() -> str:
+    key = ec.generate_private_key(ec.SECP256R1())
+    return _b64(key.private_numbers().private_value.to_bytes(32, "big"))
+
+
+def _target(target_id: int, endpoint: str) -> WebPushTarget:
+    receiver = ec.generate_private_key(ec.SECP256R1()).public_key()
+    return WebPushTarget(
+        id=target_id,
+        endpoint=endpoint,
+        p256dh_key=_b64(
+            receiver.public_bytes(
+                serialization.Encoding.X962,
+                serialization.PublicFormat.UncompressedPoint,
+            )
+        ),
+        auth_key=_b64(os.urandom(16)),
+    )
+
+
+class _Response:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.text = ""
+        self.headers = {}
+
+
+class _RecordingSession:
+    def __init__(self, statuses: list[int]):
+        self.statuses = statuses
+        self.posts: list[tuple[str, dict]] = []
+        self.closed = False
+
+    def post(self, url, timeout=None, data=None, headers=None):
+        self.posts.append((url, dict(headers)))
+        return _Response(self.statuses.pop(0) if self.statuses else 201)
+
+    def close(self):
+        self.closed = True
+
+
+class WebPushSenderTests(unittest.TestCase):
+    def setUp(self):
+        self.sessions: list[_RecordingSession] = []
+        self.statuses: list[int] = []
+
+        def _session_factory():
+            session = _RecordingSession(self.statuses)
+            self.sessions.append(session)
+            return session
+
+        self.sender = WebPushSender(
+            vapid_private_key=_vapid_private_key(),
+            vapid_subject="mailto:info@mobilelotw.org",
+            session_factory=_session_factory,
+        )
+
+    def test_reuses_jwt_and_session_per_push_service(self):
+        payload = {"title": "New LoTW QSLs"}
+        for index in range(3):
+            self.sender(_target(index, f"https://fcm.example/push/{index}"), payload)
+        self.sender(_target(9, "https://updates.example/wpush/9"), payload)
+
+        self.assertEqual(len(self.sessions), 2)
+        fcm_posts = self.sessions[0].posts
+        self.assertEqual(len(fcm_posts), 3)
+        self.assertEqual(
+            len({headers["authorization"] for _, headers in fcm_posts}), 1
+        )
+        other_auth = self.sessions[1].posts[0][1]["authorization"]
+        self.assertNotEqual(other_auth, fcm_posts[0][1]["authorization"])
+        self.assertEqual(fcm_posts[0][1]["content-encoding"], "aes128gcm")
+
+        self.sender.close()
+        self.assertTrue(all(session.closed for session in self.sessions))
+
+    def test_refreshes_jwt_near_expiry(self):
+        self.sender.jwt_lifetime_seconds = 60
+        self.sender.jwt_refresh_margin_seconds = 120
+        first = self.sender.vapid_headers("https://fcm.example")
+        second = self.sender.vapid_headers("https://fcm.example")
+        self.assertIsNot(first, second)
+
+    def test_maps_push_service_errors(self):
+        self.statuses.extend([410, 500])
+        with self.assertRaises(WebPushPermanentError):
+            self.sender(_target(1, "https://fcm.example/push/1"), {})
+        with self.assertRaises(WebPushTemporaryError):
+            self.sender(_target(2, "https://fcm.example/push/2"), {})
+
+    def test_requires_vapid_configuration(self):
+        with self.assertRaises(WebPushTemporaryError):
+            WebPushSender.from_config({})
+
+
+if __name__ == "__main__":
+    unittest.main()